@@ -1,28 +1,60 @@
+import logging
+import time
+_imports_started = time.perf_counter()
+
 from flask import Flask
 from flask_cors import CORS
 from config import config
-from database import init_db
+from database import init_db, release_db
+from services.preview_cache import preview_cache
+from services.startup import startup_timings
+from services.transcription_service import transcription_service
 from routes.projects import projects_bp
 from routes.transcribe import transcribe_bp
 from routes.system import system_bp
 from routes.export import export_bp
+from routes.search import search_bp
+from routes.uploads import uploads_bp
+
+# Module loggers (logging.getLogger(__name__)) write here unless the host configured logging already
+logging.basicConfig(level=config.LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
+
+# The inference stack (faster-whisper, CTranslate2) is imported on first use, not here
+startup_timings.record("imports", time.perf_counter() - _imports_started)
 
 def create_app():
+    started = time.perf_counter()
     app = Flask(__name__)
-    CORS(app)
+    # Pagination cursors travel in a header the browser must be allowed to read
+    CORS(app, expose_headers=['X-Next-Cursor', 'X-File-Hash'])
     
     # Initialize DB
-    init_db()
+    with startup_timings.phase("database"):
+        init_db()
+    
+    # Request threads hand their SQLite connection back to the pool when done
+    app.teardown_appcontext(release_db)
+    
+    # Expired preview files are removed in the background
+    preview_cache.start_cleanup()
     
     # Register Blueprints
     app.register_blueprint(projects_bp, url_prefix='/api/projects')
     app.register_blueprint(transcribe_bp, url_prefix='/api/transcribe')
     app.register_blueprint(system_bp, url_prefix='/api/system')
     app.register_blueprint(export_bp, url_prefix='/api/export')
+    app.register_blueprint(search_bp, url_prefix='/api/search')
+    app.register_blueprint(uploads_bp, url_prefix='/api/uploads')
+    
+    startup_timings.record("create_app", time.perf_counter() - started)
+    
+    # Optional: preload models while the server already accepts requests
+    transcription_service.start_warmup(config.WARMUP_MODELS)
     
     return app
 
 if __name__ == '__main__':
     app = create_app()
-    print(f"Starting backend on port {config.PORT}...")
+    logger.info("Starting backend on port %d...", config.PORT)
     app.run(host=config.HOST, port=config.PORT, debug=config.DEBUG)
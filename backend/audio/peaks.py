@@ -0,0 +1,144 @@
+"""
+Waveform peak pyramid: min/max pairs of the 16 kHz mono signal at several
+zoom levels, stored in a compact binary file so the editor can draw any
+window of a long recording without downloading the media.
+
+File layout (little endian):
+    magic b"NWPK", version u16, level count u16,
+    sample rate u32, samples per peak at level 0 u32, factor between levels u32,
+    peaks per level u32 * level count,
+    then each level as int8 pairs (min, max) scaled to -127..127.
+"""
+import os
+import struct
+import wave
+import numpy as np
+
+from audio.processor import SAMPLE_RATE
+
+MAGIC = b"NWPK"
+VERSION = 1
+# Level 0 holds 100 peaks per second; each level above is LEVEL_FACTOR times coarser
+BASE_SAMPLES_PER_PEAK = SAMPLE_RATE // 100
+LEVEL_FACTOR = 4
+MAX_LEVELS = 6
+# No level coarser than needed to show the whole recording in this many peaks
+MIN_PEAKS = 256
+
+_HEADER = struct.Struct("<4sHHIII")
+
+
+def _scale(values):
+    return np.clip(np.round(values * 127), -127, 127).astype(np.int8)
+
+
+def _level0(audio):
+    """Min/max of every block of BASE_SAMPLES_PER_PEAK samples (float32 in -1..1)"""
+    full = len(audio) // BASE_SAMPLES_PER_PEAK
+    # A view over the whole blocks: no copy of the (possibly hours-long) signal
+    blocks = audio[:full * BASE_SAMPLES_PER_PEAK].reshape(full, BASE_SAMPLES_PER_PEAK)
+    mins, maxs = blocks.min(axis=1), blocks.max(axis=1)
+    tail = audio[full * BASE_SAMPLES_PER_PEAK:]
+    if len(tail):
+        # The last, partial block covers only the samples it has
+        mins = np.append(mins, tail.min())
+        maxs = np.append(maxs, tail.max())
+    return mins, maxs
+
+
+def _build_levels(mins, maxs):
+    levels = [(mins, maxs)]
+    while len(levels) < MAX_LEVELS and len(levels[-1][0]) > MIN_PEAKS:
+        prev_min, prev_max = levels[-1]
+        count = -(-len(prev_min) // LEVEL_FACTOR)
+        pad = count * LEVEL_FACTOR - len(prev_min)
+        # Padding with the neutral element keeps the last, partial block correct
+        next_min = np.pad(prev_min, (0, pad), constant_values=127).reshape(count, LEVEL_FACTOR).min(axis=1)
+        next_max = np.pad(prev_max, (0, pad), constant_values=-127).reshape(count, LEVEL_FACTOR).max(axis=1)
+        levels.append((next_min, next_max))
+    return levels
+
+
+def compute_peaks(audio):
+    """Peak pyramid of in-memory samples, as a list of (min, max) int8 arrays"""
+    mins, maxs = _level0(np.asarray(audio, dtype=np.float32))
+    return _build_levels(_scale(mins), _scale(maxs))
+
+
+def compute_peaks_from_wav(wav_path, frames_per_read=BASE_SAMPLES_PER_PEAK * 6000):
+    """Same as `compute_peaks` for a 16-bit mono WAV, read in chunks"""
+    mins, maxs = [], []
+    with wave.open(str(wav_path), "rb") as wav:
+        while True:
+            frames = wav.readframes(frames_per_read)
+            if not frames:
+                break
+            chunk = np.frombuffer(frames, dtype=np.int16).astype(np.float32) / 32768.0
+            chunk_min, chunk_max = _level0(chunk)
+            mins.append(_scale(chunk_min))
+            maxs.append(_scale(chunk_max))
+    if not mins:
+        return _build_levels(np.zeros(0, dtype=np.int8), np.zeros(0, dtype=np.int8))
+    return _build_levels(np.concatenate(mins), np.concatenate(maxs))
+
+
+def write_peaks(path, levels):
+    # Written aside and renamed, so readers never see a partial file
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(levels), SAMPLE_RATE, BASE_SAMPLES_PER_PEAK, LEVEL_FACTOR))
+        f.write(struct.pack(f"<{len(levels)}I", *[len(mins) for mins, _ in levels]))
+        for mins, maxs in levels:
+            pairs = np.empty(len(mins) * 2, dtype=np.int8)
+            pairs[0::2] = mins
+            pairs[1::2] = maxs
+            f.write(pairs.tobytes())
+    os.replace(tmp_path, path)
+
+
+def read_header(f):
+    magic, version, level_count, sample_rate, base, factor = _HEADER.unpack(f.read(_HEADER.size))
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Unsupported peaks file")
+    counts = list(struct.unpack(f"<{level_count}I", f.read(4 * level_count)))
+    return {"sample_rate": sample_rate, "base": base, "factor": factor, "counts": counts}
+
+
+def read_peaks_window(path, level=None, start=0.0, end=None, max_points=2000):
+    """
+    Reads only the peaks between `start` and `end` seconds. Without an explicit
+    `level`, picks the finest one that fits the window in `max_points` peaks.
+    Returns the level metadata and the flat [min, max, min, max, ...] list.
+    """
+    with open(path, "rb") as f:
+        header = read_header(f)
+        counts = header["counts"]
+        rates = [header["sample_rate"] / (header["base"] * header["factor"] ** i) for i in range(len(counts))]
+        duration = counts[0] / rates[0] if counts else 0.0
+        end = duration if end is None else min(end, duration)
+        start = max(0.0, min(start, end))
+
+        if level is None:
+            level = len(counts) - 1
+            for i, rate in enumerate(rates):
+                if (end - start) * rate <= max_points:
+                    level = i
+                    break
+        if not 0 <= level < len(counts):
+            raise ValueError(f"Level must be between 0 and {len(counts) - 1}")
+
+        first = int(start * rates[level])
+        last = min(counts[level], int(np.ceil(end * rates[level])))
+        offset = f.tell() + sum(counts[:level]) * 2 + first * 2
+        f.seek(offset)
+        data = np.frombuffer(f.read(max(0, last - first) * 2), dtype=np.int8)
+
+    return {
+        "level": level,
+        "levels": len(counts),
+        "peaks_per_second": rates[level],
+        "from": first / rates[level],
+        "to": last / rates[level],
+        "duration": duration,
+        "peaks": data.tolist()
+    }
@@ -1,5 +1,111 @@
+import logging
 import subprocess
 import os
+import sys
+import tempfile
+import threading
+import time
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+
+# Samples read from ffmpeg's stdout per chunk (one minute of 16kHz audio)
+DECODE_CHUNK_SAMPLES = 60 * SAMPLE_RATE
+
+def current_rss_mb():
+    """Resident set size of this process right now, in MB (None where unsupported)"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+def children_peak_rss_mb():
+    """
+    Highest resident set size reached by any finished child process (ffmpeg),
+    in MB (None where unsupported). The kernel keeps a single high-water mark
+    for all children, so it only tells about one run when that run raised it.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+class RssSampler:
+    """
+    Measures the memory a block of code needs: the RSS of this process is
+    sampled in the background while the block runs, and the peak and final
+    values are reported relative to the RSS at entry. ffmpeg runs in a child
+    process, so its own peak comes from `children_peak_rss_mb`.
+    """
+
+    def __init__(self, interval=0.02):
+        self.interval = interval
+        self.start_mb = None
+        self.peak_mb = None
+        self.end_mb = None
+        self.children_before_mb = None
+        self.children_peak_mb = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.children_before_mb = children_peak_rss_mb()
+        self.start_mb = self.peak_mb = current_rss_mb()
+        if self.start_mb is not None:
+            self._thread = threading.Thread(target=self._sample, name="rss-sampler", daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.end_mb = current_rss_mb()
+        self._observe(self.end_mb)
+        self.children_peak_mb = children_peak_rss_mb()
+        return False
+
+    def _observe(self, rss):
+        if rss is not None and (self.peak_mb is None or rss > self.peak_mb):
+            self.peak_mb = rss
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self._observe(current_rss_mb())
+
+    @property
+    def peak_delta_mb(self):
+        """Highest RSS seen while the block ran, above the RSS at entry"""
+        if self.start_mb is None:
+            return None
+        return round(self.peak_mb - self.start_mb, 1)
+
+    @property
+    def retained_delta_mb(self):
+        """RSS still held after the block (e.g. the decoded samples)"""
+        if self.start_mb is None or self.end_mb is None:
+            return None
+        return round(self.end_mb - self.start_mb, 1)
+
+    def summary(self):
+        parts = []
+        if self.start_mb is not None:
+            parts.append(f"RSS peak +{self.peak_delta_mb} MB, retained +{self.retained_delta_mb} MB")
+        if self.children_peak_mb is not None:
+            # Only attributable to this run if it raised the children's high-water mark
+            bound = "" if self.children_peak_mb > (self.children_before_mb or 0) else "<= "
+            parts.append(f"ffmpeg peak RSS {bound}{self.children_peak_mb:.1f} MB")
+        return ", ".join(parts) or "memory not measured"
 
 def prepare_audio(video_file, output_wav, normalize=False):
     """
@@ -7,7 +113,7 @@ def prepare_audio(video_file, output_wav, normalize=False):
     Optionally applies dynamic audio normalization if `normalize` is True.
     Uses FFmpeg via subprocess.
     """
-    print(f"Preparing audio from {video_file} to {output_wav} (normalize={normalize})...")
+    logger.info("Preparing audio from %s to %s (normalize=%s)...", video_file, output_wav, normalize)
     
     # Ensure ffmpeg is in PATH or specify the absolute path
     cmd = [
@@ -25,34 +131,129 @@ def prepare_audio(video_file, output_wav, normalize=False):
         
     cmd.append(output_wav)
     
+    start = time.perf_counter()
     try:
         subprocess.run(cmd, check=True, capture_output=True)
-        print("Audio extraction completed.")
+        logger.info("Audio extraction completed in %.2fs.", time.perf_counter() - start)
     except subprocess.CalledProcessError as e:
-        print(f"FFmpeg Error: {e.stderr.decode()}")
+        logger.error("FFmpeg Error: %s", e.stderr.decode(errors='replace'))
         raise RuntimeError("Unable to extract audio from the provided file. Ensure FFmpeg is installed.")
 
-def generate_preview_audio(video_file, output_wav, normalize=False):
+def decode_audio(video_file, normalize=False):
     """
-    Extracts the first 30 seconds of audio for preview purposes.
+    Decodes audio straight into memory: ffmpeg writes raw 16kHz mono s16le to
+    stdout and the samples are returned as a float32 NumPy array in [-1, 1],
+    ready for `WhisperModel.transcribe`. No temporary WAV is written.
+
+    The PCM is read in fixed-size int16 chunks and each chunk is converted into
+    the float32 result and released in turn, so memory peaks at about the size
+    of the result plus the PCM, instead of several full-length copies.
     """
+    logger.info("Decoding audio from %s in memory (normalize=%s)...", video_file, normalize)
+    
     cmd = [
         'ffmpeg',
-        '-y',
-        '-t', '30', # only process the first 30 seconds
+        '-nostdin',
         '-i', video_file,
+        '-f', 's16le',
         '-acodec', 'pcm_s16le',
-        '-ar', '16000',
+        '-ar', str(SAMPLE_RATE),
         '-ac', '1'
     ]
     
     if normalize:
         cmd.extend(['-af', 'dynaudnorm'])
         
-    cmd.append(output_wav)
+    cmd.append('pipe:1')
+    
+    start = time.perf_counter()
+    # stderr goes to a file: an unread pipe would block ffmpeg once full
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr)
+        try:
+            chunks = _read_pcm_chunks(process.stdout)
+        finally:
+            process.stdout.close()
+            returncode = process.wait()
+        if returncode != 0:
+            stderr.seek(0)
+            logger.error("FFmpeg Error: %s", stderr.read().decode(errors='replace'))
+            raise RuntimeError("Unable to extract audio from the provided file. Ensure FFmpeg is installed.")
+    
+    audio = np.empty(sum(len(chunk) for chunk in chunks), dtype=np.float32)
+    offset = 0
+    for index, chunk in enumerate(chunks):
+        np.multiply(chunk, np.float32(1 / 32768.0), out=audio[offset:offset + len(chunk)])
+        offset += len(chunk)
+        chunks[index] = None # each chunk is freed once converted
+    logger.info("Audio decoding completed in %.2fs (%.1fs of audio).", time.perf_counter() - start, len(audio) / SAMPLE_RATE)
+    return audio
+
+def _read_pcm_chunks(stream):
+    """Reads s16le samples from `stream` into int16 arrays of DECODE_CHUNK_SAMPLES (the last one shorter)"""
+    chunks = []
+    while True:
+        chunk = np.empty(DECODE_CHUNK_SAMPLES, dtype=np.int16)
+        view = memoryview(chunk).cast('B')
+        filled = 0
+        while filled < len(view):
+            read = stream.readinto(view[filled:])
+            if not read:
+                break
+            filled += read
+        # An odd trailing byte is not a whole sample
+        samples = filled // 2
+        if samples:
+            chunks.append(chunk if samples == DECODE_CHUNK_SAMPLES else chunk[:samples].copy())
+        if filled < len(view):
+            return chunks
+
+def create_audio_proxy(video_file, output_path, bitrate='64k'):
+    """
+    Encodes a low-bitrate mono AAC copy of the audio track (no video), with the
+    index at the start of the file so players can seek before downloading it all.
+    """
+    cmd = [
+        'ffmpeg',
+        '-nostdin',
+        '-y',
+        '-i', video_file,
+        '-vn', # drop the video stream
+        '-ac', '1',
+        '-c:a', 'aac',
+        '-b:a', bitrate,
+        '-movflags', '+faststart',
+        '-f', 'mp4',
+        output_path
+    ]
+    
+    start = time.perf_counter()
+    try:
+        subprocess.run(cmd, check=True, capture_output=True)
+        logger.info("Audio proxy created in %.2fs: %s", time.perf_counter() - start, output_path)
+    except subprocess.CalledProcessError as e:
+        logger.error("FFmpeg Proxy Error: %s", e.stderr.decode(errors='replace'))
+        raise RuntimeError("Unable to create the audio proxy.")
+
+def generate_preview_pair(video_file, raw_wav, normalized_wav, seconds=30):
+    """
+    Extracts the first `seconds` of audio for preview purposes, both as is and
+    with dynamic normalization, in a single ffmpeg run: the decoded stream is
+    split in two with `asplit` and only one branch goes through `dynaudnorm`.
+    """
+    cmd = [
+        'ffmpeg',
+        '-nostdin',
+        '-y',
+        '-t', str(seconds), # only process the first seconds
+        '-i', video_file,
+        '-filter_complex', '[0:a]asplit=2[raw][pre];[pre]dynaudnorm[norm]',
+        '-map', '[raw]', '-acodec', 'pcm_s16le', '-ar', '16000', '-ac', '1', raw_wav,
+        '-map', '[norm]', '-acodec', 'pcm_s16le', '-ar', '16000', '-ac', '1', normalized_wav
+    ]
     
     try:
         subprocess.run(cmd, check=True, capture_output=True)
     except subprocess.CalledProcessError as e:
-        print(f"FFmpeg Preview Error: {e.stderr.decode()}")
+        logger.error("FFmpeg Preview Error: %s", e.stderr.decode(errors='replace'))
         raise RuntimeError("Unable to generate audio preview.")
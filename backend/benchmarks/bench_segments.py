@@ -0,0 +1,89 @@
+"""
+Measures `get_segments` latency on a database holding many segments across
+many projects, with and without the schema indexes.
+
+    python benchmarks/bench_segments.py --total 10000000 --per-project 2000
+
+The database is built once in a temporary directory (or at --db, reused if it exists).
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+
+
+def populate(total, per_project):
+    projects = max(1, total // per_project)
+    conn = database.get_db()
+    print(f"Inserting {total:,} segments across {projects:,} projects...")
+    started = time.perf_counter()
+    with database.transaction():
+        conn.executemany(
+            "INSERT INTO projects (id, name, created_at, status) VALUES (?, ?, ?, 'completed')",
+            [(f"p{i}", f"p{i}.mp3", f"2024-01-01T00:00:{i % 60:02d}") for i in range(projects)]
+        )
+    # Segments are interleaved across projects, as they are when several jobs run at once
+    batch = []
+    for n in range(total):
+        project = n % projects
+        start = (n // projects) * 2.0
+        batch.append((f"p{project}", start, start + 2.0, "lorem ipsum dolor sit amet", "Speaker 1"))
+        if len(batch) == 100_000:
+            with database.transaction():
+                conn.executemany("INSERT INTO segments (project_id, start, end, text, speaker) VALUES (?, ?, ?, ?, ?)", batch)
+            batch = []
+    if batch:
+        with database.transaction():
+            conn.executemany("INSERT INTO segments (project_id, start, end, text, speaker) VALUES (?, ?, ?, ?, ?)", batch)
+    print(f"Populated in {time.perf_counter() - started:.1f}s")
+    return projects
+
+
+def measure(projects, samples):
+    timings = []
+    for _ in range(samples):
+        project_id = f"p{random.randrange(projects)}"
+        started = time.perf_counter()
+        database.get_segments(project_id)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "p50_ms": round(statistics.median(timings), 2),
+        "p95_ms": round(timings[int(len(timings) * 0.95) - 1], 2),
+        "max_ms": round(timings[-1], 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--total", type=int, default=10_000_000, help="segments stored across all projects")
+    parser.add_argument("--per-project", type=int, default=2000)
+    parser.add_argument("--samples", type=int, default=50)
+    parser.add_argument("--db", help="database file to build or reuse")
+    args = parser.parse_args()
+
+    database.DB_PATH = args.db or os.path.join(tempfile.mkdtemp(), "bench.db")
+    reuse = os.path.exists(database.DB_PATH)
+    database.init_db()
+    if reuse:
+        projects = database.get_db().execute("SELECT COUNT(*) FROM projects").fetchone()[0]
+    else:
+        projects = populate(args.total, args.per_project)
+
+    print(f"With indexes:    {measure(projects, args.samples)}")
+    conn = database.get_db()
+    conn.execute("DROP INDEX idx_segments_project_start")
+    print(f"Without indexes: {measure(projects, max(3, args.samples // 10))}")
+    # Restore the schema so a reused database stays at its version
+    conn.execute("CREATE INDEX idx_segments_project_start ON segments (project_id, start)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Helpers shared by the benchmarks: synthetic media, timing summaries and the
+JSON result files (with the comparison against a previous run).
+"""
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+import wave
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.compute_profiles import SAMPLE_RATE, calibration_clip
+
+# Metric name endings and whether a larger value is better
+LOWER_IS_BETTER = ("_seconds", "_ms", "rtf")
+HIGHER_IS_BETTER = ("_per_second", "x_realtime")
+
+
+def synthetic_audio(seconds, seed=0):
+    """Speech-like 16 kHz mono float32 signal; `seed` varies the noise, so the media hash"""
+    audio = calibration_clip(seconds)
+    if seed:
+        audio = audio + 0.001 * np.random.default_rng(seed).standard_normal(len(audio)).astype(np.float32)
+    return audio
+
+
+def write_wav(path, audio, sample_rate=SAMPLE_RATE, channels=1):
+    pcm = (np.clip(audio, -1, 1) * 32767).astype(np.int16)
+    if channels > 1:
+        pcm = np.repeat(pcm[:, None], channels, axis=1).reshape(-1)
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm.tobytes())
+    return path
+
+
+def synthetic_media(path, seconds, seed=0):
+    """A 44.1 kHz stereo WAV, like a camera recording: extraction has to resample and downmix it"""
+    audio = synthetic_audio(seconds, seed)
+    target = np.arange(int(seconds * 44100)) / 44100
+    resampled = np.interp(target, np.arange(len(audio)) / SAMPLE_RATE, audio).astype(np.float32)
+    return write_wav(path, resampled, sample_rate=44100, channels=2)
+
+
+def has_ffmpeg():
+    return shutil.which("ffmpeg") is not None
+
+
+def timed(fn, *args, **kwargs):
+    """(result, elapsed seconds) of one call"""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def summarize_ms(timings):
+    """p50/p95/max of durations given in seconds, reported in milliseconds"""
+    timings = sorted(t * 1000 for t in timings)
+    return {
+        "p50_ms": round(statistics.median(timings), 2),
+        "p95_ms": round(timings[max(0, int(len(timings) * 0.95) - 1)], 2),
+        "max_ms": round(timings[-1], 2),
+    }
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "ffmpeg": has_ffmpeg(),
+    }
+
+
+def write_results(path, results):
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+
+
+def _flatten(data, prefix=""):
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(results, baseline, tolerance):
+    """
+    Metrics of `results` worse than `baseline` by more than `tolerance` (0.1 = 10%).
+    Only metrics with a known direction (see LOWER_IS_BETTER / HIGHER_IS_BETTER) count.
+    Returns (name, baseline value, new value, relative change) tuples.
+    """
+    old, new = _flatten(baseline.get("stages", {})), _flatten(results.get("stages", {}))
+    regressions = []
+    for name, value in new.items():
+        previous = old.get(name)
+        if not previous:
+            continue
+        change = (value - previous) / previous
+        if name.endswith(LOWER_IS_BETTER) and change > tolerance:
+            regressions.append((name, previous, value, change))
+        elif name.endswith(HIGHER_IS_BETTER) and change < -tolerance:
+            regressions.append((name, previous, value, change))
+    return regressions
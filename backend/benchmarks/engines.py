@@ -0,0 +1,85 @@
+"""
+Engines for the pipeline benchmarks: a stub with a fixed speed, usable
+anywhere, and real Whisper models when they are already downloaded.
+"""
+import time
+import wave
+
+from common import SAMPLE_RATE
+
+
+def _duration(audio):
+    if isinstance(audio, str):
+        with wave.open(audio, "rb") as wav:
+            return wav.getnframes() / wav.getframerate()
+    return len(audio) / SAMPLE_RATE
+
+
+class StubEngine:
+    """
+    Stand-in for WhisperInference that takes `rtf` seconds per second of
+    audio and emits a segment every `segment_seconds`, reporting progress
+    like the real engine. It isolates the cost of everything around inference.
+    """
+
+    def __init__(self, rtf=0.05, segment_seconds=4.0):
+        self.rtf = rtf
+        self.segment_seconds = segment_seconds
+        self.log_callback = None
+
+    def _segments(self, duration):
+        segments = []
+        start = 0.0
+        while start < duration:
+            end = min(duration, start + self.segment_seconds)
+            segments.append({
+                'id': str(len(segments)),
+                'start': start,
+                'end': end,
+                'text': f"Synthetic segment {len(segments)} of the benchmark clip.",
+                'confidence': -0.2,
+                'speaker': 'Speaker 1'
+            })
+            start = end
+        return segments
+
+    def _result(self, segments):
+        return {
+            'text': ' '.join(seg['text'] for seg in segments),
+            'segments': segments,
+            'language': 'en',
+            'language_probability': 0.99
+        }
+
+    def transcribe(self, audio_file, language=None, diarization=False, progress_callback=None, log_callback=None):
+        duration = _duration(audio_file)
+        segments = self._segments(duration)
+        for seg in segments:
+            time.sleep((seg['end'] - seg['start']) * self.rtf)
+            if progress_callback:
+                progress_callback(min(0.3 + seg['end'] / duration * 0.65, 0.95), [seg])
+        return self._result(segments)
+
+    def transcribe_batch(self, audios, languages=None, beam_size=5):
+        durations = [_duration(audio) for audio in audios]
+        time.sleep(sum(durations) * self.rtf)
+        return [self._result(self._segments(duration)) for duration in durations]
+
+
+def load_engine(name, stub_rtf=0.05):
+    """
+    "stub", or a Whisper model name loaded on CPU from data/models only
+    (never downloaded). Raises if the model is not available.
+    """
+    if name == "stub":
+        return StubEngine(rtf=stub_rtf)
+    from models.whisper_wrapper import WhisperInference
+    from services.compute_profiles import compute_profiles
+    profile = compute_profiles.heuristic(name)
+    return WhisperInference(
+        model_name=name,
+        device="cpu",
+        compute_type=profile["compute_type"] if profile["device"] == "cpu" else "int8",
+        cpu_threads=profile["cpu_threads"] if profile["device"] == "cpu" else 0,
+        local_files_only=True
+    )
@@ -0,0 +1,264 @@
+"""
+Offline benchmark of the transcription pipeline, stage by stage, on synthetic media.
+
+    python benchmarks/run.py --output results.json
+    python benchmarks/run.py --stages export,database --segments 100000 --baseline results.json
+
+Stages: prepare (ffmpeg extraction), inference (real-time factor of the stub
+engine and of the Whisper models in --engines that are already downloaded),
+database (segment writes and reads), export (every generate_* on --segments
+segments) and api (concurrent uploads through the HTTP server, stub engine).
+Stages that need ffmpeg are skipped without it. Nothing is downloaded and no
+GPU is used. With --baseline, metrics slower than the baseline by more than
+--tolerance are listed and the exit status is 1.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from common import (
+    compare, environment, has_ffmpeg, summarize_ms, synthetic_audio, synthetic_media, timed, write_results, write_wav
+)
+from engines import StubEngine, load_engine
+
+import database
+
+STAGES = ["prepare", "inference", "database", "export", "api"]
+
+
+def _segments(count):
+    return [{
+        'id': str(i),
+        'start': i * 2.0,
+        'end': i * 2.0 + 1.8,
+        'text': f"Segment {i}: the quarterly results were discussed, with a few \"quoted\" remarks, commas and accents (perché).",
+        'speaker': f"Speaker {i % 3 + 1}"
+    } for i in range(count)]
+
+
+def bench_prepare(args, workdir):
+    if not has_ffmpeg():
+        return {"skipped": "ffmpeg not found"}
+    from audio.processor import RssSampler, decode_audio, prepare_audio
+
+    media = synthetic_media(os.path.join(workdir, "camera.wav"), args.audio_seconds)
+    result = {"audio_seconds": args.audio_seconds}
+    for name, normalize in (("prepare_audio", False), ("prepare_audio_normalized", True)):
+        with RssSampler() as memory:
+            _, elapsed = timed(prepare_audio, str(media), os.path.join(workdir, f"{name}.wav"), normalize)
+        result[name] = {"elapsed_seconds": round(elapsed, 3), "x_realtime": round(args.audio_seconds / elapsed, 1),
+                        "rss_peak_delta_mb": memory.peak_delta_mb}
+    with RssSampler() as memory:
+        _, elapsed = timed(decode_audio, str(media))
+    result["decode_audio"] = {"elapsed_seconds": round(elapsed, 3), "x_realtime": round(args.audio_seconds / elapsed, 1),
+                              "rss_peak_delta_mb": memory.peak_delta_mb}
+    return result
+
+
+def bench_inference(args, workdir):
+    audio = synthetic_audio(args.audio_seconds)
+    result = {"audio_seconds": args.audio_seconds}
+    for name in ["stub"] + [engine for engine in args.engines if engine != "stub"]:
+        try:
+            engine, load_seconds = timed(load_engine, name, args.stub_rtf)
+        except Exception as e:
+            result[name] = {"skipped": f"not available offline ({type(e).__name__})"}
+            continue
+        # Warm-up: first-call allocations are not part of the steady state
+        engine.transcribe(audio[:32000], language="en")
+        transcript, elapsed = timed(engine.transcribe, audio, language="en")
+        result[name] = {
+            "load_seconds": round(load_seconds, 3),
+            "elapsed_seconds": round(elapsed, 3),
+            "rtf": round(elapsed / args.audio_seconds, 4),
+            "segments": len(transcript["segments"]),
+        }
+    return result
+
+
+def bench_database(args, workdir):
+    database.DB_PATH = os.path.join(workdir, "bench.db")
+    database.init_db()
+    segments = _segments(args.segments)
+    database.create_project("bench", "bench.wav", None, "bench.wav", "stub", "en")
+    database.create_project("stream", "stream.wav", None, "stream.wav", "stub", "en")
+
+    _, save = timed(database.save_segments, "bench", segments)
+    reads = [timed(database.get_segments, "bench")[1] for _ in range(5)]
+    _, iterate = timed(lambda: sum(1 for _ in database.iter_segments("bench")))
+    # Streaming pattern of a running job: small committed batches
+    _, append = timed(lambda: [database.append_segments("stream", segments[i:i + 20]) for i in range(0, min(len(segments), 10_000), 20)])
+    rows = database.get_segments("bench")
+    revision = database.get_project("bench")["revision"]
+    ops = [{"op": "update", "id": row["id"], "text": row["text"] + " edited"} for row in random.Random(0).sample(rows, min(100, len(rows)))]
+    _, patch = timed(database.apply_segment_ops, "bench", revision, ops)
+    searches = [timed(database.search_segments, word)[1] for word in ("quarterly", "remarks", "perche", "segment 99")]
+    database.close_db()
+
+    return {
+        "segments": len(segments),
+        "save_segments": {"elapsed_seconds": round(save, 3), "rows_per_second": round(len(segments) / save)},
+        "get_segments": summarize_ms(reads),
+        "iter_segments": {"elapsed_seconds": round(iterate, 3), "rows_per_second": round(len(segments) / iterate)},
+        "append_segments": {"elapsed_seconds": round(append, 3), "rows_per_second": round(min(len(segments), 10_000) / append)},
+        "apply_segment_ops": {"elapsed_seconds": round(patch, 4), "ops": len(ops)},
+        "search_segments": summarize_ms(searches),
+    }
+
+
+def bench_export(args, workdir):
+    from transcribe import export
+
+    segments = _segments(args.segments)
+    result = {"segments": len(segments)}
+    for name in ("srt", "vtt", "txt", "csv", "json", "mcp"):
+        output, elapsed = timed(getattr(export, f"generate_{name}"), segments)
+        result[name] = {
+            "elapsed_seconds": round(elapsed, 3),
+            "segments_per_second": round(len(segments) / elapsed),
+            "output_mb": round(len(output.encode("utf-8")) / 2**20, 2),
+        }
+    return result
+
+
+def _post_media(url, path, fields):
+    boundary = uuid.uuid4().hex
+    parts = [f'--{boundary}\r\nContent-Disposition: form-data; name="{key}"\r\n\r\n{value}\r\n'.encode() for key, value in fields.items()]
+    with open(path, "rb") as f:
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{os.path.basename(path)}"\r\n'
+            f'Content-Type: audio/wav\r\n\r\n'.encode() + f.read() + b"\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n".encode())
+    request = urllib.request.Request(url, data=b"".join(parts), headers={"Content-Type": f"multipart/form-data; boundary={boundary}"})
+    with urllib.request.urlopen(request) as response:
+        return json.load(response)
+
+
+def _get_json(url):
+    with urllib.request.urlopen(url) as response:
+        return json.load(response)
+
+
+def bench_api(args, workdir):
+    if not has_ffmpeg():
+        return {"skipped": "ffmpeg not found"}
+    from pathlib import Path
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    from config import config
+    from services.engine_pool import EnginePool
+    from services.media_store import media_store
+    from services.preview_cache import preview_cache
+    from services.transcription_service import transcription_service
+    from services.uploads import uploads
+
+    # Everything written by the server stays in the work directory
+    cache = Path(workdir) / "cache"
+    cache.mkdir()
+    config.UPLOAD_FOLDER = cache
+    config.AUDIO_PROXY_ENABLED = False
+    media_store.folder = cache / "objects"
+    uploads.folder = cache / "uploads"
+    preview_cache.folder = cache / "previews"
+    database.DB_PATH = os.path.join(workdir, "api.db")
+    transcription_service.engine_pool = EnginePool(
+        lambda *_args, **_kwargs: StubEngine(rtf=args.stub_rtf), memory_budget_mb=config.ENGINE_POOL_MEMORY_MB
+    )
+
+    from app import create_app
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server("127.0.0.1", 0, create_app(), threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}/api"
+
+    # Distinct files: identical media would be served by the result cache
+    files = [write_wav(os.path.join(workdir, f"upload_{i}.wav"), synthetic_audio(args.clip_seconds, seed=i + 1)) for i in range(args.uploads)]
+
+    def run_job(path):
+        started = time.perf_counter()
+        job = _post_media(f"{base}/transcribe", path, {"model": "stub", "language": "en", "use_cache": "false"})
+        uploaded = time.perf_counter()
+        while True:
+            status = _get_json(f"{base}/transcribe/{job['job_id']}")
+            if status["status"] in ("completed", "failed"):
+                return uploaded - started, time.perf_counter() - started, status["status"]
+            time.sleep(0.05)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        jobs = list(executor.map(run_job, files))
+    wall = time.perf_counter() - started
+    server.shutdown()
+
+    completed = [job for job in jobs if job[2] == "completed"]
+    return {
+        "uploads": args.uploads,
+        "concurrency": args.concurrency,
+        "clip_seconds": args.clip_seconds,
+        "failed": len(jobs) - len(completed),
+        "wall_seconds": round(wall, 3),
+        "jobs_per_second": round(len(completed) / wall, 3),
+        "audio_x_realtime": round(len(completed) * args.clip_seconds / wall, 1),
+        "upload": summarize_ms([job[0] for job in jobs]),
+        "job": summarize_ms([job[1] for job in jobs]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--stages", default=",".join(STAGES), help="comma-separated subset of: " + ", ".join(STAGES))
+    parser.add_argument("--output", help="JSON file for the results (default: printed)")
+    parser.add_argument("--baseline", help="results of a previous run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="relative slowdown reported as a regression")
+    parser.add_argument("--engines", default="tiny", help="Whisper models to time besides the stub, if downloaded")
+    parser.add_argument("--stub-rtf", type=float, default=0.05, help="seconds the stub engine takes per second of audio")
+    parser.add_argument("--audio-seconds", type=float, default=60.0, help="length of the clip for extraction and inference")
+    parser.add_argument("--segments", type=int, default=100_000, help="segments for the database and export stages")
+    parser.add_argument("--uploads", type=int, default=16, help="files uploaded in the api stage")
+    parser.add_argument("--concurrency", type=int, default=4, help="parallel clients in the api stage")
+    parser.add_argument("--clip-seconds", type=float, default=45.0, help="length of each uploaded file")
+    args = parser.parse_args()
+    args.engines = [engine.strip() for engine in args.engines.split(",") if engine.strip()]
+
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+
+    results = {"environment": environment(), "stages": {}}
+    with tempfile.TemporaryDirectory() as workdir:
+        for stage in stages:
+            print(f"Running {stage}...", file=sys.stderr)
+            stage_dir = os.path.join(workdir, stage)
+            os.makedirs(stage_dir)
+            results["stages"][stage] = globals()[f"bench_{stage}"](args, stage_dir)
+
+    if args.output:
+        write_results(args.output, results)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for name, before, after, change in regressions:
+            print(f"REGRESSION {name}: {before} -> {after} ({change:+.0%})", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print("No regressions.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,81 @@ class Config:
     DEBUG = True
     PORT = 5000
     HOST = "127.0.0.1"
+    # Level of the backend's log records (DEBUG, INFO, WARNING, ...)
+    LOG_LEVEL = os.environ.get("WHISPER_LOG_LEVEL", "INFO").upper()
+
+    # Job scheduler: number of jobs processed at the same time, plus separate
+    # caps for the ffmpeg extraction stage and the Whisper inference stage
+    MAX_CONCURRENT_JOBS = int(os.environ.get("WHISPER_MAX_CONCURRENT_JOBS", 2))
+    MAX_CONCURRENT_EXTRACTIONS = int(os.environ.get("WHISPER_MAX_CONCURRENT_EXTRACTIONS", 2))
+    MAX_CONCURRENT_INFERENCES = int(os.environ.get("WHISPER_MAX_CONCURRENT_INFERENCES", 1))
+
+    # Engine pool: loaded models are kept in memory up to this budget (LRU eviction).
+    # ENGINE_NUM_WORKERS > 1 lets CTranslate2 serve parallel jobs on the same model
+    # (0: chosen by the compute profile).
+    ENGINE_POOL_MEMORY_MB = int(os.environ.get("WHISPER_ENGINE_POOL_MEMORY_MB", 6144))
+    ENGINE_NUM_WORKERS = int(os.environ.get("WHISPER_ENGINE_NUM_WORKERS", 0))
+
+    # Compute profile (device, precision, threads, workers) of each model. Left to
+    # "auto"/0 they are chosen from the detected hardware, or taken from the
+    # calibration saved in COMPUTE_PROFILES_PATH (`flask system calibrate <model>`).
+    COMPUTE_DEVICE = os.environ.get("WHISPER_DEVICE", "auto")
+    COMPUTE_TYPE = os.environ.get("WHISPER_COMPUTE_TYPE", "auto")
+    CPU_THREADS = int(os.environ.get("WHISPER_CPU_THREADS", 0))
+    COMPUTE_PROFILES_PATH = DATA_DIR / "compute_profiles.json"
+
+    # Models loaded in the background right after startup (comma-separated, e.g. "medium"),
+    # so the first transcription does not wait for a cold load
+    WARMUP_MODELS = [m.strip() for m in os.environ.get("WHISPER_WARMUP_MODELS", "").split(",") if m.strip()]
+
+    # Result cache: identical media + parameters reuse a previous transcription
+    RESULT_CACHE_ENABLED = os.environ.get("WHISPER_RESULT_CACHE", "true").lower() == "true"
+    RESULT_CACHE_MAX_MB = int(os.environ.get("WHISPER_RESULT_CACHE_MAX_MB", 256))
+    # Rendered exports (SRT, VTT...) kept in memory, keyed by project revision
+    EXPORT_CACHE_MAX_MB = int(os.environ.get("WHISPER_EXPORT_CACHE_MAX_MB", 64))
+    # Bulk ZIP exports: renders running in parallel, and projects per archive
+    EXPORT_WORKERS = int(os.environ.get("WHISPER_EXPORT_WORKERS", min(4, os.cpu_count() or 1)))
+    EXPORT_BULK_MAX_PROJECTS = int(os.environ.get("WHISPER_EXPORT_BULK_MAX_PROJECTS", 1000))
+
+    # Uploaded media, stored once per content hash and shared by projects
+    MEDIA_FOLDER = UPLOAD_FOLDER / "objects"
+
+    # Audio-only playback proxy (AAC), shared by all projects with the same media hash.
+    # Smaller uploads are played directly.
+    AUDIO_PROXY_ENABLED = os.environ.get("WHISPER_AUDIO_PROXY", "true").lower() == "true"
+    AUDIO_PROXY_BITRATE = os.environ.get("WHISPER_AUDIO_PROXY_BITRATE", "64k")
+    AUDIO_PROXY_MIN_MB = int(os.environ.get("WHISPER_AUDIO_PROXY_MIN_MB", 10))
+    PROXY_FOLDER = UPLOAD_FOLDER / "proxies"
+
+    # Normalization A/B previews, cached by media hash and removed when unused for a while
+    PREVIEW_FOLDER = UPLOAD_FOLDER / "previews"
+    PREVIEW_SECONDS = int(os.environ.get("WHISPER_PREVIEW_SECONDS", 30))
+    PREVIEW_TTL_HOURS = float(os.environ.get("WHISPER_PREVIEW_TTL_HOURS", 24))
+
+    # Resumable chunked uploads: partial files are kept in UPLOAD_SESSION_FOLDER and
+    # dropped when not resumed within the TTL. UPLOAD_CHUNK_MB is the size suggested to clients.
+    UPLOAD_SESSION_FOLDER = UPLOAD_FOLDER / "uploads"
+    UPLOAD_SESSION_TTL_HOURS = float(os.environ.get("WHISPER_UPLOAD_SESSION_TTL_HOURS", 24))
+    UPLOAD_CHUNK_MB = int(os.environ.get("WHISPER_UPLOAD_CHUNK_MB", 8))
+
+    # Audio extraction: "memory" pipes PCM from ffmpeg straight to the model,
+    # "file" writes a temporary 16kHz WAV (also used as fallback)
+    AUDIO_DECODE_MODE = os.environ.get("WHISPER_AUDIO_DECODE_MODE", "memory")
+
+    # Long-file mode (CPU only): recordings longer than LONG_FILE_MIN_SECONDS are
+    # split at silences and transcribed in parallel by up to LONG_FILE_WORKERS processes,
+    # each with its own model copy counted against ENGINE_POOL_MEMORY_MB
+    MODELS_DIR = DATA_DIR / "models"
+    LONG_FILE_MIN_SECONDS = int(os.environ.get("WHISPER_LONG_FILE_MIN_SECONDS", 1800))
+    LONG_FILE_CHUNK_SECONDS = int(os.environ.get("WHISPER_LONG_FILE_CHUNK_SECONDS", 300))
+    LONG_FILE_WORKERS = int(os.environ.get("WHISPER_LONG_FILE_WORKERS", max(1, (os.cpu_count() or 1) // 4)))
+
+    # Cross-job batching (opt-in): clips up to BATCH_MAX_CLIP_SECONDS (one Whisper window)
+    # arriving within BATCH_WINDOW_MS are transcribed together, without VAD or temperature
+    # fallback. It trades some accuracy for throughput; BATCH_MAX_SIZE=1 (default) disables it.
+    BATCH_WINDOW_MS = int(os.environ.get("WHISPER_BATCH_WINDOW_MS", 500))
+    BATCH_MAX_SIZE = int(os.environ.get("WHISPER_BATCH_MAX_SIZE", 1))
+    BATCH_MAX_CLIP_SECONDS = min(30, int(os.environ.get("WHISPER_BATCH_MAX_CLIP_SECONDS", 30)))
     
     # Assicurati che le cartelle esistano
     UPLOAD_FOLDER.mkdir(parents=True, exist_ok=True)
@@ -1,20 +1,230 @@
+import logging
 import sqlite3
 import os
+import base64
+import html
 import json
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
+from functools import wraps
+
+logger = logging.getLogger(__name__)
 
 DB_PATH = os.path.join(os.path.dirname(__file__), '../data/whisperapp.db')
 
-def get_db():
-    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    conn = sqlite3.connect(DB_PATH, timeout=30)
-    conn.execute('PRAGMA journal_mode=WAL') # Enable Write-Ahead Logging
+# Applied once per connection
+MMAP_SIZE = 256 * 1024 * 1024
+CACHE_SIZE_KB = 64 * 1024
+
+SEGMENT_FIELDS = ('start', 'end', 'text', 'speaker')
+
+# Columns returned by project listings; `full_text` can be large and is opt-in
+PROJECT_FIELDS = (
+    'id', 'name', 'created_at', 'status', 'file_path', 'file_name', 'model', 'language',
+    'detected_language', 'language_probability', 'diarization', 'progress', 'error',
+    'file_hash', 'normalized', 'revision'
+)
+
+# Idle connections kept for reuse by request threads (Werkzeug starts a thread per request)
+POOL_SIZE = 8
+
+_local = threading.local()
+_stats_lock = threading.Lock()
+_query_stats = {}
+_connections_opened = 0
+_connections_reused = 0
+_pool_lock = threading.Lock()
+_pool = [] # (path, connection) pairs, most recently released last
+
+# Held from the ingestion of a stored media file until a project references it,
+# and while an unreferenced file is deleted: a new upload deduplicated onto an
+# object cannot lose it to the deletion of the object's last project
+media_lock = threading.RLock()
+
+class RevisionConflict(Exception):
+    """The project was modified since the revision the client based its changes on"""
+    def __init__(self, current_revision):
+        super().__init__(f"Project is at revision {current_revision}")
+        self.current_revision = current_revision
+
+def _connect(path):
+    global _connections_opened
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Autocommit mode: writes are grouped explicitly by `transaction()`.
+    # A pooled connection moves between threads, one at a time.
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
     conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL') # Enable Write-Ahead Logging
+    conn.execute('PRAGMA synchronous=NORMAL') # Safe with WAL, avoids an fsync per commit
+    conn.execute(f'PRAGMA mmap_size={MMAP_SIZE}')
+    conn.execute(f'PRAGMA cache_size=-{CACHE_SIZE_KB}')
+    conn.execute('PRAGMA foreign_keys=ON') # Makes ON DELETE CASCADE effective
+    with _stats_lock:
+        _connections_opened += 1
     return conn
 
+def get_db():
+    """
+    Returns the calling thread's connection, taken from the pool of idle
+    connections (or opened) on first use and then reused by the thread.
+    Connections are keyed by DB_PATH so that switching database (tests) reconnects.
+    """
+    global _connections_reused
+    conn = getattr(_local, 'conn', None)
+    if conn is not None and _local.path != DB_PATH:
+        conn.close()
+        conn = None
+    if conn is None:
+        with _pool_lock:
+            while _pool:
+                path, pooled = _pool.pop()
+                if path == DB_PATH:
+                    conn = pooled
+                    _connections_reused += 1
+                    break
+                pooled.close()
+        if conn is None:
+            conn = _connect(DB_PATH)
+        _local.conn = conn
+        _local.path = DB_PATH
+        _local.depth = 0
+    return conn
+
+def release_db(exc=None):
+    """
+    Returns the calling thread's connection to the pool, or closes it if the
+    pool is full. Called when a request ends (`teardown_appcontext`), so
+    short-lived request threads share a few connections instead of each
+    opening its own.
+    """
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        return
+    _local.conn = None
+    _local.depth = 0
+    if conn.in_transaction:
+        # Left open by an error: the next user must start clean
+        conn.rollback()
+    with _pool_lock:
+        if _local.path == DB_PATH and len(_pool) < POOL_SIZE:
+            _pool.append((_local.path, conn))
+            return
+    conn.close()
+
+def close_db():
+    """Closes the calling thread's connection, if any, and the idle pooled ones."""
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+    with _pool_lock:
+        while _pool:
+            _pool.pop()[1].close()
+
+@contextmanager
+def transaction():
+    """
+    Groups statements in a single write transaction, committed on exit and
+    rolled back on error. Nested uses join the outermost transaction.
+    """
+    conn = get_db()
+    if _local.depth:
+        _local.depth += 1
+        try:
+            yield conn
+        finally:
+            _local.depth -= 1
+        return
+    # IMMEDIATE takes the write lock up front, so a read followed by a write cannot fail with SQLITE_BUSY
+    conn.execute('BEGIN IMMEDIATE')
+    _local.depth = 1
+    try:
+        yield conn
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    finally:
+        _local.depth = 0
+
+def _timed(func):
+    """Records the latency of every call of a database function"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            with _stats_lock:
+                entry = _query_stats.setdefault(func.__name__, [0, 0.0, 0.0])
+                entry[0] += 1
+                entry[1] += elapsed
+                entry[2] = max(entry[2], elapsed)
+    return wrapper
+
+def get_query_stats():
+    """Call count and latency (ms) per database function since startup"""
+    with _stats_lock:
+        checkouts = _connections_opened + _connections_reused
+        return {
+            "connections_opened": _connections_opened,
+            "connections_reused": _connections_reused,
+            # Share of the connections handed out that came from the pool
+            "connection_reuse_rate": round(_connections_reused / checkouts, 3) if checkouts else 0.0,
+            "queries": {
+                name: {
+                    "calls": calls,
+                    "avg_ms": round(total / calls * 1000, 3),
+                    "max_ms": round(longest * 1000, 3),
+                    "total_ms": round(total * 1000, 1)
+                }
+                for name, (calls, total, longest) in sorted(_query_stats.items())
+            }
+        }
+
+def reset_query_stats():
+    with _stats_lock:
+        _query_stats.clear()
+
+def _with_str_ids(rows):
+    # The frontend expects segment ids as strings
+    result = []
+    for row in rows:
+        d = dict(row)
+        d['id'] = str(d['id'])
+        result.append(d)
+    return result
+
+def _segment_rows(project_id, segments):
+    rows = []
+    for seg in segments:
+        # Protection: if seg is a string (rare but possible error), transform it into a dict
+        if isinstance(seg, str):
+            seg = {'text': seg, 'start': 0, 'end': 0, 'speaker': 'Unknown'}
+        rows.append((project_id, seg.get('start', 0), seg.get('end', 0), seg.get('text', ''), seg.get('speaker', '')))
+    return rows
+
 def init_db():
+    """Brings the schema up to date by applying the migrations newer than `PRAGMA user_version`."""
     conn = get_db()
-    c = conn.cursor()
+    current = conn.execute('PRAGMA user_version').fetchone()[0]
+    for version, migration in enumerate(MIGRATIONS, 1):
+        if version <= current:
+            continue
+        with transaction() as conn:
+            migration(conn.cursor())
+            # Part of the transaction: a failed migration leaves the version untouched
+            conn.execute(f'PRAGMA user_version = {version}')
+        logger.info("Database migrated to schema version %d", version)
+
+def _migrate_base_schema(c):
+    """
+    Version 1: the schema as it was before versioning. Databases created back
+    then may lack some columns, so they are added if missing.
+    """
     c.execute('''
         CREATE TABLE IF NOT EXISTS projects (
             id TEXT PRIMARY KEY,
@@ -32,7 +242,8 @@ def init_db():
             progress REAL,
             error TEXT,
             file_hash TEXT,
-            normalized BOOLEAN DEFAULT 0
+            normalized BOOLEAN DEFAULT 0,
+            revision INTEGER DEFAULT 0
         )
     ''')
     
@@ -48,6 +259,8 @@ def init_db():
         c.execute('ALTER TABLE projects ADD COLUMN file_hash TEXT')
     if 'normalized' not in columns:
         c.execute('ALTER TABLE projects ADD COLUMN normalized BOOLEAN DEFAULT 0')
+    if 'revision' not in columns:
+        c.execute('ALTER TABLE projects ADD COLUMN revision INTEGER DEFAULT 0')
         
     c.execute('''
         CREATE TABLE IF NOT EXISTS segments (
@@ -60,132 +273,494 @@ def init_db():
             FOREIGN KEY (project_id) REFERENCES projects (id) ON DELETE CASCADE
         )
     ''')
-    conn.commit()
-    conn.close()
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS result_cache (
+            cache_key TEXT PRIMARY KEY,
+            file_hash TEXT,
+            model TEXT,
+            language TEXT,
+            normalized BOOLEAN,
+            engine_version TEXT,
+            detected_language TEXT,
+            language_probability REAL,
+            full_text TEXT,
+            segments TEXT,
+            size_bytes INTEGER,
+            created_at TEXT,
+            last_used_at TEXT,
+            hits INTEGER DEFAULT 0
+        )
+    ''')
 
-def create_project(project_id, name, file_path, file_name, model, language, diarization=False, file_hash=None, normalized=False):
-    conn = get_db()
-    c = conn.cursor()
+def _migrate_indexes(c):
+    """Version 2: indexes for the per-project lookups, and removal of orphaned segments."""
+    # Foreign keys were not enforced before: drop segments of projects deleted long ago
+    c.execute('DELETE FROM segments WHERE project_id NOT IN (SELECT id FROM projects)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_segments_project_start ON segments (project_id, start)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_projects_created_at ON projects (created_at)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_projects_file_hash ON projects (file_hash)')
+
+def _migrate_listing_index(c):
+    """Version 3: (created_at, id) index for keyset pagination of the project list."""
+    c.execute('DROP INDEX IF EXISTS idx_projects_created_at')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_projects_created_id ON projects (created_at, id)')
+
+def _migrate_search_index(c):
+    """
+    Version 4: FTS5 index over segment text. It is an external-content table
+    (the text is not stored twice) kept in sync by triggers, so every write
+    path, cascades included, updates it.
+    """
     c.execute('''
-        INSERT INTO projects (id, name, created_at, status, file_path, file_name, model, language, diarization, progress, file_hash, normalized)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (project_id, name, datetime.now().isoformat(), 'queued', file_path, file_name, model, language, diarization, 0.0, file_hash, normalized))
-    conn.commit()
-    conn.close()
+        CREATE VIRTUAL TABLE IF NOT EXISTS segments_fts USING fts5(
+            text, content='segments', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+        )
+    ''')
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS segments_fts_insert AFTER INSERT ON segments BEGIN
+            INSERT INTO segments_fts (rowid, text) VALUES (new.id, new.text);
+        END
+    ''')
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS segments_fts_delete AFTER DELETE ON segments BEGIN
+            INSERT INTO segments_fts (segments_fts, rowid, text) VALUES ('delete', old.id, old.text);
+        END
+    ''')
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS segments_fts_update AFTER UPDATE OF text ON segments BEGIN
+            INSERT INTO segments_fts (segments_fts, rowid, text) VALUES ('delete', old.id, old.text);
+            INSERT INTO segments_fts (rowid, text) VALUES (new.id, new.text);
+        END
+    ''')
+    c.execute("INSERT INTO segments_fts (segments_fts) VALUES ('rebuild')")
+
+def _migrate_media_refs(c):
+    """Version 5: file_path index, used to count the projects sharing a stored media file."""
+    columns = [row[1] for row in c.execute('PRAGMA table_info(projects)')]
+    if 'file_path' not in columns:
+        c.execute('ALTER TABLE projects ADD COLUMN file_path TEXT')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_projects_file_path ON projects (file_path)')
+
+def _migrate_stage_timings(c):
+    """Version 6: per-stage timings of the last transcription of each project, as JSON."""
+    c.execute('ALTER TABLE projects ADD COLUMN stage_timings TEXT')
+
+# Applied in order; the position in the list (1-based) is the schema version
+MIGRATIONS = [
+    _migrate_base_schema,
+    _migrate_indexes,
+    _migrate_listing_index,
+    _migrate_search_index,
+    _migrate_media_refs,
+    _migrate_stage_timings,
+]
 
+@_timed
+def create_project(project_id, name, file_path, file_name, model, language, diarization=False, file_hash=None, normalized=False):
+    with transaction() as conn:
+        conn.execute('''
+            INSERT INTO projects (id, name, created_at, status, file_path, file_name, model, language, diarization, progress, file_hash, normalized)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (project_id, name, datetime.now().isoformat(), 'queued', file_path, file_name, model, language, diarization, 0.0, file_hash, normalized))
+
+@_timed
 def update_project_metadata(project_id, detected_language, language_probability, full_text):
-    conn = get_db()
-    c = conn.cursor()
-    c.execute('''
-        UPDATE projects 
-        SET detected_language = ?, language_probability = ?, full_text = ? 
-        WHERE id = ?
-    ''', (detected_language, language_probability, full_text, project_id))
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        conn.execute('''
+            UPDATE projects 
+            SET detected_language = ?, language_probability = ?, full_text = ? 
+            WHERE id = ?
+        ''', (detected_language, language_probability, full_text, project_id))
+
+@_timed
+def update_project_timings(project_id, timings):
+    with transaction() as conn:
+        conn.execute('UPDATE projects SET stage_timings = ? WHERE id = ?', (json.dumps(timings), project_id))
 
+@_timed
 def update_project_status(project_id, status, progress=None, error=None):
-    conn = get_db()
-    c = conn.cursor()
-    if progress is not None:
-        c.execute('UPDATE projects SET status = ?, progress = ? WHERE id = ?', (status, progress, project_id))
-    elif error is not None:
-        c.execute('UPDATE projects SET status = ?, error = ? WHERE id = ?', (status, error, project_id))
-    else:
-        c.execute('UPDATE projects SET status = ? WHERE id = ?', (status, project_id))
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        if progress is not None:
+            conn.execute('UPDATE projects SET status = ?, progress = ? WHERE id = ?', (status, progress, project_id))
+        elif error is not None:
+            conn.execute('UPDATE projects SET status = ?, error = ? WHERE id = ?', (status, error, project_id))
+        else:
+            conn.execute('UPDATE projects SET status = ? WHERE id = ?', (status, project_id))
 
+@_timed
 def save_segments(project_id, segments):
     if not isinstance(segments, list):
-        print(f"Error: segments is not a list, it is {type(segments)}")
+        logger.error("Error: segments is not a list, it is %s", type(segments))
         return
 
-    conn = get_db()
     try:
-        c = conn.cursor()
-        c.execute('DELETE FROM segments WHERE project_id = ?', (project_id,))
-        for seg in segments:
-            # Protection: if seg is a string (rare but possible error), transform it into a dict
-            if isinstance(seg, str):
-                seg = {'text': seg, 'start': 0, 'end': 0, 'speaker': 'Unknown'}
-            
-            c.execute('''
+        with transaction() as conn:
+            conn.execute('DELETE FROM segments WHERE project_id = ?', (project_id,))
+            conn.executemany('''
                 INSERT INTO segments (project_id, start, end, text, speaker)
                 VALUES (?, ?, ?, ?, ?)
-            ''', (project_id, seg.get('start', 0), seg.get('end', 0), seg.get('text', ''), seg.get('speaker', '')))
-        conn.commit()
+            ''', _segment_rows(project_id, segments))
+            # A full rewrite invalidates the revision open editors are based on
+            conn.execute('UPDATE projects SET revision = revision + 1 WHERE id = ?', (project_id,))
     except Exception as e:
-        print(f"Error during save_segments: {e}")
-        conn.rollback()
+        logger.error("Error during save_segments: %s", e)
+
+@_timed
+def apply_segment_ops(project_id, base_revision, ops):
+    """
+    Applies per-segment `insert`, `update` and `delete` operations in one
+    transaction, if the project is still at `base_revision`.
+    Returns the new revision and the ids assigned to inserted segments
+    (keyed by the `client_id` of each insert).
+    Raises RevisionConflict on a stale revision, ValueError on an invalid op.
+    """
+    inserted = {}
+    with transaction() as conn:
+        row = conn.execute('SELECT revision FROM projects WHERE id = ?', (project_id,)).fetchone()
+        if row is None:
+            raise ValueError("Project not found")
+        if (row['revision'] or 0) != base_revision:
+            raise RevisionConflict(row['revision'] or 0)
+
+        for op in ops:
+            kind = op.get('op')
+            if kind == 'insert':
+                seg = op.get('segment') or {}
+                c = conn.execute('''
+                    INSERT INTO segments (project_id, start, end, text, speaker)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', _segment_rows(project_id, [seg])[0])
+                inserted[str(op.get('client_id', len(inserted)))] = str(c.lastrowid)
+            elif kind == 'update':
+                changes = {field: op[field] for field in SEGMENT_FIELDS if field in op}
+                if not changes:
+                    continue
+                assignments = ', '.join(f'{field} = ?' for field in changes)
+                c = conn.execute(f'UPDATE segments SET {assignments} WHERE id = ? AND project_id = ?',
+                                 (*changes.values(), op.get('id'), project_id))
+                if c.rowcount == 0:
+                    raise ValueError(f"Unknown segment {op.get('id')}")
+            elif kind == 'delete':
+                c = conn.execute('DELETE FROM segments WHERE id = ? AND project_id = ?', (op.get('id'), project_id))
+                if c.rowcount == 0:
+                    raise ValueError(f"Unknown segment {op.get('id')}")
+            else:
+                raise ValueError(f"Unknown operation {kind!r}")
+
+        revision = (row['revision'] or 0) + 1
+        conn.execute('UPDATE projects SET revision = ? WHERE id = ?', (revision, project_id))
+    return revision, inserted
+
+@_timed
+def append_segments(project_id, segments):
+    """
+    Appends segments produced during transcription in a single committed batch.
+    Returns the stored rows (with their ids), in insertion order.
+    """
+    if not segments:
+        return []
+    try:
+        with transaction() as conn:
+            conn.executemany('''
+                INSERT INTO segments (project_id, start, end, text, speaker)
+                VALUES (?, ?, ?, ?, ?)
+            ''', _segment_rows(project_id, segments))
+            # Only one writer appends to a project, so its newest rows are the ones just inserted
+            rows = conn.execute('SELECT * FROM segments WHERE project_id = ? ORDER BY id DESC LIMIT ?', (project_id, len(segments))).fetchall()
+            conn.execute('UPDATE projects SET revision = revision + 1 WHERE id = ?', (project_id,))
+    except Exception as e:
+        logger.error("Error during append_segments: %s", e)
+        return []
+    return _with_str_ids(reversed(rows))
+
+@_timed
+def get_segments_after(project_id, cursor=0):
+    """
+    Segments stored after the given cursor (a segment id), in insertion order,
+    and whether the segments were replaced since the cursor was handed out.
+    The cursor row is then gone: every segment is returned, and the caller
+    drops what it had.
+    """
+    conn = get_db()
+    # One read snapshot: a replacement cannot slip between the check and the read
+    conn.execute('BEGIN')
+    try:
+        reset = bool(cursor) and conn.execute(
+            'SELECT 1 FROM segments WHERE id = ? AND project_id = ?', (cursor, project_id)
+        ).fetchone() is None
+        rows = conn.execute(
+            'SELECT * FROM segments WHERE project_id = ? AND id > ? ORDER BY id ASC', (project_id, 0 if reset else cursor)
+        ).fetchall()
     finally:
-        conn.close()
+        conn.execute('COMMIT')
+    return _with_str_ids(rows), reset
 
+@_timed
 def get_project(project_id):
-    conn = get_db()
-    c = conn.cursor()
-    c.execute('SELECT * FROM projects WHERE id = ?', (project_id,))
-    row = c.fetchone()
-    conn.close()
-    return dict(row) if row else None
+    row = get_db().execute('SELECT * FROM projects WHERE id = ?', (project_id,)).fetchone()
+    if not row:
+        return None
+    project = dict(row)
+    if project.get('stage_timings'):
+        project['stage_timings'] = json.loads(project['stage_timings'])
+    return project
 
-def get_projects():
-    conn = get_db()
-    c = conn.cursor()
-    c.execute('SELECT * FROM projects ORDER BY created_at DESC')
-    rows = c.fetchall()
-    conn.close()
-    return [dict(row) for row in rows]
+def _project_filters(status=None, created_from=None, created_to=None):
+    clauses, params = [], []
+    if status:
+        statuses = [status] if isinstance(status, str) else list(status)
+        clauses.append(f"status IN ({', '.join('?' for _ in statuses)})")
+        params.extend(statuses)
+    if created_from:
+        clauses.append('created_at >= ?')
+        params.append(created_from)
+    if created_to:
+        # Inclusive: a date-only bound keeps the whole day
+        clauses.append('created_at < date(?, \'+1 day\')' if len(created_to) == 10 else 'created_at <= ?')
+        params.append(created_to)
+    return clauses, params
+
+def encode_project_cursor(created_at, project_id):
+    return base64.urlsafe_b64encode(json.dumps([created_at, project_id]).encode('utf-8')).decode('ascii')
+
+def decode_project_cursor(cursor):
+    """Raises ValueError on a malformed cursor"""
+    try:
+        created_at, project_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    return created_at, project_id
+
+@_timed
+def get_media_paths_by_hash(file_hash):
+    """Stored media files with the given content hash (newest project first)"""
+    rows = get_db().execute(
+        'SELECT file_path FROM projects WHERE file_hash = ? AND file_path IS NOT NULL ORDER BY created_at DESC',
+        (file_hash,)
+    ).fetchall()
+    return [row['file_path'] for row in rows]
 
+@_timed
+def list_projects(limit=50, cursor=None, status=None, created_from=None, created_to=None, include_text=False):
+    """
+    One page of projects, newest first, using keyset pagination on (created_at, id):
+    the cost of a page does not depend on how deep into the list it is.
+    `full_text` is left out unless `include_text` is set.
+    Returns the rows and the cursor of the next page (None on the last page).
+    """
+    clauses, params = _project_filters(status, created_from, created_to)
+    if cursor:
+        clauses.append('(created_at, id) < (?, ?)')
+        params.extend(decode_project_cursor(cursor))
+    fields = ', '.join(PROJECT_FIELDS + (('full_text',) if include_text else ()))
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+    rows = get_db().execute(
+        f'SELECT {fields} FROM projects {where} ORDER BY created_at DESC, id DESC LIMIT ?',
+        (*params, limit + 1)
+    ).fetchall()
+
+    projects = [dict(row) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = projects[-1]
+        next_cursor = encode_project_cursor(last['created_at'], last['id'])
+    return projects, next_cursor
+
+@_timed
+def count_projects(status=None, created_from=None, created_to=None):
+    clauses, params = _project_filters(status, created_from, created_to)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+    return get_db().execute(f'SELECT COUNT(*) FROM projects {where}', params).fetchone()[0]
+
+@_timed
 def get_segments(project_id):
-    conn = get_db()
-    c = conn.cursor()
-    c.execute('SELECT * FROM segments WHERE project_id = ? ORDER BY start ASC', (project_id,))
-    rows = c.fetchall()
-    conn.close()
-    # Ensure id is returned as string for frontend compatibility if needed, but frontend expects string id for segment
-    # Actually frontend expects segment id to be string or number, let's map it to string
-    result = []
-    for row in rows:
-        d = dict(row)
-        d['id'] = str(d['id'])
-        result.append(d)
-    return result
+    rows = get_db().execute('SELECT * FROM segments WHERE project_id = ? ORDER BY start ASC', (project_id,)).fetchall()
+    return _with_str_ids(rows)
+
+def iter_segments(project_id, batch_size=500):
+    """
+    Yields a project's segments (ordered by start) from a server-side cursor,
+    `batch_size` rows at a time, so long transcripts are never fully loaded.
+    Uses its own connection: the caller may be a streamed response that
+    outlives the request.
+    """
+    conn = _connect(DB_PATH)
+    try:
+        cursor = conn.execute('SELECT * FROM segments WHERE project_id = ? ORDER BY start ASC', (project_id,))
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from _with_str_ids(rows)
+    finally:
+        conn.close()
+
+@_timed
+def count_segments(project_id):
+    return get_db().execute('SELECT COUNT(*) FROM segments WHERE project_id = ?', (project_id,)).fetchone()[0]
+
+def _release_media(file_path):
+    """Removes a media file once no project references it (files are shared by content hash)"""
+    if not file_path:
+        return
+    with media_lock:
+        if get_db().execute('SELECT 1 FROM projects WHERE file_path = ? LIMIT 1', (file_path,)).fetchone():
+            return
+        if os.path.exists(file_path):
+            try:
+                os.remove(file_path)
+            except Exception as e:
+                logger.error("Error during file deletion %s: %s", file_path, e)
 
+@_timed
 def update_project_file(project_id, file_path, file_name, file_hash=None):
-    conn = get_db()
-    c = conn.cursor()
-    c.execute('''
-        UPDATE projects 
-        SET file_path = ?, file_name = ?, file_hash = ? 
-        WHERE id = ?
-    ''', (file_path, file_name, file_hash, project_id))
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        row = conn.execute('SELECT file_path FROM projects WHERE id = ?', (project_id,)).fetchone()
+        conn.execute('''
+            UPDATE projects 
+            SET file_path = ?, file_name = ?, file_hash = ? 
+            WHERE id = ?
+        ''', (file_path, file_name, file_hash, project_id))
 
+    if row and row['file_path'] != file_path:
+        _release_media(row['file_path'])
+
+@_timed
 def delete_project(project_id):
-    conn = get_db()
-    c = conn.cursor()
-    
-    # Retrieve file path before deleting the project
-    c.execute('SELECT file_path FROM projects WHERE id = ?', (project_id,))
-    row = c.fetchone()
-    if row and row['file_path'] and os.path.exists(row['file_path']):
-        try:
-            os.remove(row['file_path'])
-        except Exception as e:
-            print(f"Error during file deletion {row['file_path']}: {e}")
+    with transaction() as conn:
+        # Retrieve file path before deleting the project
+        row = conn.execute('SELECT file_path FROM projects WHERE id = ?', (project_id,)).fetchone()
+        # Segments follow through ON DELETE CASCADE
+        conn.execute('DELETE FROM projects WHERE id = ?', (project_id,))
 
-    c.execute('DELETE FROM projects WHERE id = ?', (project_id,))
-    c.execute('DELETE FROM segments WHERE project_id = ?', (project_id,))
-    conn.commit()
-    conn.close()
+    if row:
+        _release_media(row['file_path'])
     return True
 
+@_timed
+def get_media_references():
+    """Stored media files with their hash and the number of projects using each"""
+    rows = get_db().execute('''
+        SELECT file_path, file_hash, COUNT(*) AS refs FROM projects
+        WHERE file_path IS NOT NULL GROUP BY file_path
+    ''').fetchall()
+    return [dict(row) for row in rows]
+
+@_timed
+def relink_media(old_path, new_path):
+    """Points every project using `old_path` to `new_path`"""
+    with transaction() as conn:
+        return conn.execute('UPDATE projects SET file_path = ? WHERE file_path = ?', (new_path, old_path)).rowcount
+
+@_timed
 def clear_all_data():
-    conn = get_db()
-    c = conn.cursor()
-    c.execute('DELETE FROM projects')
-    c.execute('DELETE FROM segments')
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        conn.execute('DELETE FROM projects')
+        conn.execute('DELETE FROM segments')
+
+@_timed
+def get_cached_result(cache_key):
+    """Returns a cached transcription (segments decoded) and marks it as recently used"""
+    with transaction() as conn:
+        row = conn.execute('SELECT * FROM result_cache WHERE cache_key = ?', (cache_key,)).fetchone()
+        if row:
+            conn.execute('UPDATE result_cache SET last_used_at = ?, hits = hits + 1 WHERE cache_key = ?',
+                         (datetime.now().isoformat(), cache_key))
+    if not row:
+        return None
+    result = dict(row)
+    result['segments'] = json.loads(result['segments'] or '[]')
+    return result
+
+@_timed
+def store_cached_result(cache_key, file_hash, model, language, normalized, engine_version,
+                        detected_language, language_probability, full_text, segments, max_bytes):
+    """Stores a transcription result, evicting least recently used entries beyond `max_bytes`"""
+    payload = json.dumps([
+        {'start': seg.get('start', 0), 'end': seg.get('end', 0), 'text': seg.get('text', ''), 'speaker': seg.get('speaker', '')}
+        for seg in segments
+    ], ensure_ascii=False)
+    size_bytes = len(payload.encode('utf-8')) + len((full_text or '').encode('utf-8'))
+    if size_bytes > max_bytes:
+        return False
+
+    now = datetime.now().isoformat()
+    try:
+        with transaction() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO result_cache (cache_key, file_hash, model, language, normalized, engine_version,
+                    detected_language, language_probability, full_text, segments, size_bytes, created_at, last_used_at, hits)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0)
+            ''', (cache_key, file_hash, model, language, normalized, engine_version,
+                  detected_language, language_probability, full_text, payload, size_bytes, now, now))
+
+            total = conn.execute('SELECT COALESCE(SUM(size_bytes), 0) FROM result_cache').fetchone()[0]
+            if total > max_bytes:
+                rows = conn.execute('SELECT cache_key, size_bytes FROM result_cache ORDER BY last_used_at ASC').fetchall()
+                for row in rows:
+                    if total <= max_bytes:
+                        break
+                    conn.execute('DELETE FROM result_cache WHERE cache_key = ?', (row['cache_key'],))
+                    total -= row['size_bytes']
+    except Exception as e:
+        logger.error("Error during store_cached_result: %s", e)
+        return False
+    return True
+
+@_timed
+def clear_result_cache():
+    with transaction() as conn:
+        conn.execute('DELETE FROM result_cache')
+
+def _fts_query(text):
+    """
+    Turns free text into an FTS5 query: every word must match (quoted, so
+    FTS syntax characters are taken literally), the last one as a prefix.
+    """
+    words = [word.replace('"', '""') for word in text.split()]
+    if not words:
+        raise ValueError("Empty search query")
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+# Private-use characters delimiting matches in snippet(), replaced once the text is escaped
+_MATCH_START, _MATCH_END = '\ue000', '\ue001'
+
+def _highlight(snippet):
+    escaped = html.escape(snippet or '')
+    return escaped.replace(_MATCH_START, '<mark>').replace(_MATCH_END, '</mark>')
+
+@_timed
+def search_segments(query, limit=20, offset=0, project_id=None):
+    """
+    Segments matching `query`, best matches first (BM25), with the project they
+    belong to and an HTML snippet: the transcript text is escaped and the
+    matched words are wrapped in <mark>.
+    """
+    sql = f'''
+        SELECT s.id, s.project_id, p.name AS project_name, s.start, s.end, s.speaker,
+               snippet(segments_fts, 0, '{_MATCH_START}', '{_MATCH_END}', '…', 16) AS snippet,
+               bm25(segments_fts) AS score
+        FROM segments_fts
+        JOIN segments s ON s.id = segments_fts.rowid
+        JOIN projects p ON p.id = s.project_id
+        WHERE segments_fts MATCH ?
+    '''
+    params = [_fts_query(query)]
+    if project_id:
+        sql += ' AND s.project_id = ?'
+        params.append(project_id)
+    sql += ' ORDER BY rank LIMIT ? OFFSET ?'
+    params.extend([limit, offset])
+    hits = _with_str_ids(get_db().execute(sql, params).fetchall())
+    for hit in hits:
+        hit['snippet'] = _highlight(hit['snippet'])
+    return hits
+
+@_timed
+def rebuild_search_index():
+    """Re-indexes every segment; returns the number of segments indexed"""
+    with transaction() as conn:
+        conn.execute("INSERT INTO segments_fts (segments_fts) VALUES ('rebuild')")
+        return conn.execute('SELECT COUNT(*) FROM segments').fetchone()[0]
@@ -1,34 +1,100 @@
-import torch
+"""
+GPU detection without torch: CTranslate2 (already needed for inference)
+counts the CUDA devices, and nvidia-smi, when installed, gives their name
+and memory. Importing this module costs nothing.
+"""
+import shutil
+import subprocess
+import time
+from models.memory import model_memory_mb
+
+# nvidia-smi takes tens of milliseconds: the status endpoint reuses a recent answer
+_SMI_TTL_SECONDS = 5.0
+_smi_cache = {"at": 0.0, "info": None}
+
+def cuda_device_count():
+    try:
+        import ctranslate2
+        return ctranslate2.get_cuda_device_count()
+    except Exception:
+        return 0
+
+def _query_nvidia_smi():
+    """Name, memory (MB) and compute capability of GPU 0, or None"""
+    now = time.monotonic()
+    if now - _smi_cache["at"] < _SMI_TTL_SECONDS:
+        return _smi_cache["info"]
+    info = None
+    if shutil.which("nvidia-smi"):
+        try:
+            output = subprocess.run(
+                ["nvidia-smi", "--query-gpu=name,memory.total,memory.free,compute_cap", "--format=csv,noheader,nounits", "--id=0"],
+                capture_output=True, text=True, timeout=5, check=True
+            ).stdout.strip()
+            name, total, free, capability = [field.strip() for field in output.split(",")]
+            info = {
+                "name": name,
+                "total_mb": float(total),
+                "free_mb": float(free),
+                "capability": tuple(int(part) for part in capability.split(".")),
+            }
+        except (subprocess.SubprocessError, OSError, ValueError):
+            info = None
+    _smi_cache.update(at=now, info=info)
+    return info
 
 def get_gpu_info():
     """Returns GPU availability and specs"""
-    cuda_available = torch.cuda.is_available()
-    
-    if not cuda_available:
+    if cuda_device_count() == 0:
         return {'available': False, 'device': None}
-        
-    device_name = torch.cuda.get_device_name(0)
     
-    # Get total and free memory in GB
-    try:
-        vram_total = torch.cuda.get_device_properties(0).total_memory / (1024**3)
-        vram_free = torch.cuda.mem_get_info()[0] / (1024**3)
-    except Exception:
-        vram_total = 0
-        vram_free = 0
+    smi = _query_nvidia_smi()
+    if smi is None:
+        # Usable by CTranslate2, but without nvidia-smi the specs are unknown
+        return {'available': True, 'device': 'CUDA GPU', 'vram_total_gb': 0, 'vram_free_gb': 0, 'compute_capability': None}
         
     return {
         'available': True,
-        'device': device_name,
-        'vram_total_gb': round(vram_total, 2),
-        'vram_free_gb': round(vram_free, 2),
-        'compute_capability': torch.cuda.get_device_capability(0)
+        'device': smi['name'],
+        'vram_total_gb': round(smi['total_mb'] / 1024, 2),
+        'vram_free_gb': round(smi['free_mb'] / 1024, 2),
+        'compute_capability': smi['capability']
     }
 
+# Precisions tried in order of preference on each device, the fastest first
+COMPUTE_TYPE_PREFERENCE = {
+    'cuda': ['float16', 'int8_float16', 'int8', 'float32'],
+    'cpu': ['int8', 'int8_float32', 'float32'],
+}
+
+def supported_compute_types(device):
+    """Precisions CTranslate2 can run on `device` with this build and hardware"""
+    try:
+        import ctranslate2
+        return set(ctranslate2.get_supported_compute_types(device))
+    except Exception:
+        return {'float32'}
+
 def optimize_for_whisper(model_size, vram_gb):
-    if vram_gb < 4:
-        return 'cpu', 'float32'
-    elif vram_gb < 8:
+    """
+    Device and precision for a model given the GPU memory (0 without GPU).
+    float16 needs roughly the model size plus room for activations; int8
+    halves the weights. Models that do not fit go to the CPU with int8.
+    """
+    model_gb = model_memory_mb(model_size) / 1024
+    if vram_gb >= model_gb * 1.5 + 1:
+        return 'cuda', 'float16'
+    elif vram_gb >= model_gb * 0.75 + 1:
         return 'cuda', 'int8'
     else:
-        return 'cuda', 'float16'
+        return 'cpu', 'int8'
+
+def pick_compute_type(device, preferred):
+    """`preferred` if supported, else the next supported precision in preference order"""
+    supported = supported_compute_types(device)
+    order = COMPUTE_TYPE_PREFERENCE[device]
+    start = order.index(preferred) if preferred in order else 0
+    for compute_type in order[start:] + order[:start]:
+        if compute_type in supported:
+            return compute_type
+    return 'float32'
@@ -0,0 +1,229 @@
+"""
+Long-file mode: the audio is cut at silences found by the VAD, the chunks are
+transcribed in parallel by a pool of worker processes (each with its own copy
+of the model) and the segments are merged back on the original timeline.
+"""
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+
+# Share of the shorter segment two segments must have in common to be the same words
+SEAM_OVERLAP_RATIO = 0.5
+
+# Model loaded once per worker process by `_init_worker`
+_worker_model = None
+
+
+def find_split_points(speech_spans, total_samples, target_samples, search_samples):
+    """
+    Picks cut positions (in samples) roughly every `target_samples`, preferring
+    the middle of the silence gap closest to each target within `search_samples`.
+    Falls back to a hard cut when no silence is found in the search window.
+    """
+    gaps = []
+    previous_end = 0
+    for span in speech_spans:
+        if span['start'] > previous_end:
+            gaps.append((previous_end + span['start']) // 2)
+        previous_end = max(previous_end, span['end'])
+    if previous_end < total_samples:
+        gaps.append((previous_end + total_samples) // 2)
+
+    cuts = []
+    previous_cut = 0
+    while total_samples - previous_cut > target_samples + search_samples:
+        ideal = previous_cut + target_samples
+        candidates = [g for g in gaps if previous_cut < g and abs(g - ideal) <= search_samples]
+        cut = min(candidates, key=lambda g: abs(g - ideal)) if candidates else ideal
+        cuts.append(cut)
+        previous_cut = cut
+    return cuts
+
+
+def plan_chunks(audio, chunk_seconds, overlap_seconds=1.0, search_seconds=30.0):
+    """
+    Splits `audio` into chunks. Each chunk owns the range between two cuts and
+    is padded by `overlap_seconds` on both sides, so that words straddling a
+    hard cut are still heard in full by one of the two chunks.
+    Returns dicts with the sample slice and the owned range in seconds.
+    """
+    from faster_whisper.vad import get_speech_timestamps
+
+    total = len(audio)
+    speech_spans = get_speech_timestamps(audio)
+    cuts = find_split_points(
+        speech_spans,
+        total,
+        int(chunk_seconds * SAMPLE_RATE),
+        int(search_seconds * SAMPLE_RATE)
+    )
+    bounds = [0] + cuts + [total]
+    overlap = int(overlap_seconds * SAMPLE_RATE)
+
+    chunks = []
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        padded_start = max(0, start - overlap)
+        chunks.append({
+            'start_sample': padded_start,
+            'end_sample': min(total, end + overlap),
+            'owned_start': start / SAMPLE_RATE,
+            'owned_end': end / SAMPLE_RATE,
+        })
+    return chunks
+
+
+def owned_segments(owned_start, owned_end, segments, is_last=False):
+    """Segments whose midpoint falls in the range owned by a chunk."""
+    owned = []
+    for seg in segments:
+        middle = (seg['start'] + seg['end']) / 2
+        if owned_start <= middle < owned_end or (is_last and middle >= owned_end):
+            owned.append(seg)
+    return owned
+
+
+def _repeats(previous, seg):
+    """
+    True if `seg` covers mostly the same time as `previous`: the same words
+    recognised on both sides of a seam, with slightly different timing or
+    wording, so their midpoints landed in different chunks.
+    """
+    shared = min(previous['end'], seg['end']) - max(previous['start'], seg['start'])
+    shortest = min(previous['end'] - previous['start'], seg['end'] - seg['start'])
+    return shared > 0 and shared >= SEAM_OVERLAP_RATIO * shortest
+
+
+def chunk_segments(previous, owned_start, owned_end, segments, is_last=False):
+    """
+    The segments a chunk contributes after `previous`, the last segment kept
+    from the chunks before it (None for the first): those it owns, in time
+    order, minus the ones repeating `previous` across the seam.
+    """
+    kept = []
+    for seg in sorted(owned_segments(owned_start, owned_end, segments, is_last), key=lambda seg: seg['start']):
+        if previous is not None and _repeats(previous, seg):
+            continue
+        kept.append(seg)
+    return kept
+
+
+def merge_chunk_segments(chunk_results):
+    """
+    Merges per-chunk segments (already on the absolute timeline), given in
+    chunk order. A segment is kept only by the chunk that owns its midpoint,
+    and one overlapping the last segment of the previous chunk is dropped,
+    which removes the duplicates produced in the overlap around each seam.
+    """
+    result = []
+    last_index = len(chunk_results) - 1
+    for i, (owned_start, owned_end, segments) in enumerate(chunk_results):
+        result.extend(chunk_segments(result[-1] if result else None, owned_start, owned_end, segments, is_last=i == last_index))
+    for i, seg in enumerate(result):
+        seg['id'] = str(i)
+    return result
+
+
+def _init_worker(model_name, device, compute_type, cpu_threads, download_root):
+    global _worker_model
+    from faster_whisper import WhisperModel
+    _worker_model = WhisperModel(
+        model_name,
+        device=device,
+        compute_type=compute_type,
+        cpu_threads=cpu_threads,
+        download_root=download_root
+    )
+
+
+def _transcribe_chunk(index, audio, offset, language):
+    segments_generator, info = _worker_model.transcribe(
+        audio,
+        language=language,
+        beam_size=5,
+        vad_filter=True
+    )
+    segments = [{
+        'start': segment.start + offset,
+        'end': segment.end + offset,
+        'text': segment.text.strip(),
+        'confidence': segment.avg_logprob,
+        'speaker': 'Speaker 1'
+    } for segment in segments_generator]
+    return index, segments, info.language, info.language_probability
+
+
+def transcribe_parallel(audio, model_name, device, compute_type, download_root, language=None,
+                        workers=2, cpu_threads=0, chunk_seconds=300, progress_callback=None, log_callback=None):
+    """
+    Transcribes a long in-memory recording with a process pool.
+    Returns the same structure as `WhisperInference.transcribe`.
+    """
+    def log(msg):
+        logger.info(msg)
+        if log_callback:
+            log_callback(msg)
+
+    chunks = plan_chunks(audio, chunk_seconds)
+    log(f"Long-file mode: {len(chunks)} chunks of ~{chunk_seconds}s across {workers} worker processes.")
+
+    results = {}
+    languages = {}
+    merged = []
+    # Chunks finish in any order; segments are merged (and streamed) in chunk order
+    next_index = 0
+    # "spawn" avoids forking a multi-threaded server process
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(chunks)),
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(model_name, device, compute_type, cpu_threads, download_root)
+    ) as executor:
+        futures = [
+            executor.submit(
+                _transcribe_chunk,
+                i,
+                audio[chunk['start_sample']:chunk['end_sample']],
+                chunk['start_sample'] / SAMPLE_RATE,
+                language
+            )
+            for i, chunk in enumerate(chunks)
+        ]
+        for done, future in enumerate(as_completed(futures), 1):
+            index, segments, chunk_language, probability = future.result()
+            results[index] = segments
+            duration = chunks[index]['owned_end'] - chunks[index]['owned_start']
+            weight, best = languages.get(chunk_language, (0.0, 0.0))
+            languages[chunk_language] = (weight + duration, max(best, probability))
+            log(f"Chunk {done}/{len(chunks)} transcribed ({len(segments)} segments).")
+
+            # Every chunk now contiguous with the merged prefix is appended to it
+            new_segments = []
+            while next_index in results:
+                chunk = chunks[next_index]
+                kept = chunk_segments(merged[-1] if merged else None, chunk['owned_start'], chunk['owned_end'],
+                                      results.pop(next_index), is_last=next_index == len(chunks) - 1)
+                merged.extend(kept)
+                new_segments.extend(kept)
+                next_index += 1
+
+            if progress_callback:
+                # Only the newly merged segments are passed: callers persist incrementally
+                progress_callback(0.3 + (done / len(chunks)) * 0.65, new_segments)
+
+    segments = merged
+    for i, seg in enumerate(segments):
+        seg['id'] = str(i)
+    # The language spoken for most of the recording wins
+    detected_language, (_, probability) = max(languages.items(), key=lambda item: item[1][0])
+
+    return {
+        'text': ' '.join(seg['text'] for seg in segments),
+        'segments': segments,
+        'language': detected_language,
+        'language_probability': probability
+    }
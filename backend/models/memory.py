@@ -0,0 +1,27 @@
+"""
+Approximate memory footprint of the Whisper models, shared by the hardware
+checks (does a model fit the GPU?) and the engine pool (what to evict).
+"""
+
+# Approximate resident size of each model at float16/int8_float16 precision (MB).
+# Used only for placement and eviction decisions, so rough figures are good enough.
+MODEL_MEMORY_MB = {
+    'tiny': 150,
+    'base': 300,
+    'small': 900,
+    'medium': 2600,
+    'large-v1': 4800,
+    'large-v2': 4800,
+    'large-v3': 4800,
+}
+
+# Relative to float16
+COMPUTE_TYPE_FACTOR = {
+    'float32': 2.0,
+    'int8': 0.5,
+    'int8_float32': 0.5,
+}
+
+def model_memory_mb(model_name: str) -> int:
+    """Size at float16; English-only variants weigh the same, unknown models are assumed large"""
+    return MODEL_MEMORY_MB.get(model_name.replace('.en', ''), 3000)
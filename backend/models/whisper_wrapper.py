@@ -1,21 +1,33 @@
+import logging
 import os
-from faster_whisper import WhisperModel
-import torch
+from importlib.metadata import version
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Part of the result cache key: a new engine release invalidates cached transcripts.
+# Read from the package metadata: faster-whisper itself is imported only to load a model.
+ENGINE_VERSION = f"faster-whisper-{version('faster-whisper')}"
 
 class WhisperInference:
-    def __init__(self, model_name="medium", device="cuda", compute_type="float16", log_callback=None):
+    def __init__(self, model_name="medium", device="auto", compute_type="default", log_callback=None, num_workers=1, cpu_threads=0, local_files_only=False):
         """
         model_name: tiny, base, small, medium, large-v3
-        device: cuda, cpu
-        compute_type: float32 (CPU), float16 (GPU), int8 (quantized)
+        device: cuda, cpu, auto
+        compute_type: float32, float16 (GPU), int8 / int8_float32 (quantized), default (as the model was saved)
+        num_workers: number of transcriptions CTranslate2 may run in parallel on this model
+        cpu_threads: threads per worker on CPU (0 = CTranslate2 default)
+        local_files_only: fail instead of downloading a model that is not in data/models
         """
         self.model_name = model_name
         self.device = device
         self.compute_type = compute_type
+        self.num_workers = num_workers
+        self.cpu_threads = cpu_threads
         self.log_callback = log_callback
         
         def log(msg):
-            print(msg)
+            logger.info(msg)
             if self.log_callback:
                 self.log_callback(msg)
         
@@ -24,27 +36,35 @@ class WhisperInference:
         os.makedirs(model_dir, exist_ok=True)
         
         log(f"Loading {model_name} model on {device} with {compute_type}...")
+        from faster_whisper import WhisperModel
         self.model = WhisperModel(
             model_name, 
             device=device, 
             compute_type=compute_type,
-            download_root=model_dir
+            download_root=model_dir,
+            num_workers=num_workers,
+            cpu_threads=cpu_threads,
+            local_files_only=local_files_only
         )
         log("Model loaded successfully.")
 
     def transcribe(self, audio_file, language=None, diarization=False, progress_callback=None, log_callback=None):
         """
-        Executes transcription. Advanced diarization is disabled in this version 
+        Executes transcription. `audio_file` is a path or a 16kHz float32 NumPy array.
+        Advanced diarization is disabled in this version 
         to keep the app 100% offline without HuggingFace dependencies.
         """
         def log(msg):
-            print(msg)
+            logger.info(msg)
             if log_callback:
                 log_callback(msg)
             elif self.log_callback:
                 self.log_callback(msg)
                 
-        log(f"Starting transcription of {audio_file}...")
+        if isinstance(audio_file, str):
+            log(f"Starting transcription of {audio_file}...")
+        else:
+            log(f"Starting transcription of {len(audio_file) / 16000:.1f}s of in-memory audio...")
         
         # Transcription with faster-whisper
         segments_generator, info = self.model.transcribe(
@@ -74,7 +94,8 @@ class WhisperInference:
             if progress_callback and info.duration > 0:
                 # Calculate progress based on audio duration (from 30% to 95%)
                 progress = 0.3 + (segment.end / info.duration) * 0.65
-                progress_callback(min(progress, 0.95), list(segments))
+                # Only the new segment is passed: callers persist incrementally
+                progress_callback(min(progress, 0.95), [seg_dict])
 
         if diarization:
             log("NOTE: Advanced Speaker Diarization (pyannote) has been disabled to keep the app 100% offline.")
@@ -87,3 +108,98 @@ class WhisperInference:
             'language_probability': getattr(info, 'language_probability', 0.0)
         }
 
+    def transcribe_batch(self, audios, languages=None, beam_size=5):
+        """
+        Transcribes several short clips (at most one 30s Whisper window each) with a
+        single batched encoder pass and a single batched decoding call.
+        `audios` are 16kHz float32 arrays, `languages` a list of codes or None (auto).
+        Returns one result dict per clip, shaped like `transcribe()`.
+        Unlike `transcribe()`, no VAD filter or temperature fallback is applied.
+        """
+        import ctranslate2
+        from faster_whisper.audio import pad_or_trim
+        from faster_whisper.tokenizer import Tokenizer
+
+        model = self.model
+        extractor = model.feature_extractor
+        languages = list(languages) if languages else [None] * len(audios)
+
+        features = np.stack([
+            pad_or_trim(extractor(audio)[:, :extractor.nb_max_frames], extractor.nb_max_frames)
+            for audio in audios
+        ]).astype(np.float32)
+        encoder_output = model.model.encode(ctranslate2.StorageView.from_array(np.ascontiguousarray(features)))
+
+        probabilities = [1.0] * len(audios)
+        if not model.model.is_multilingual:
+            languages = ['en'] * len(audios)
+        elif any(language is None for language in languages):
+            detected = model.model.detect_language(encoder_output)
+            for i, candidates in enumerate(detected):
+                if languages[i] is None:
+                    token, probabilities[i] = candidates[0]
+                    languages[i] = token[2:-2]
+
+        tokenizers = [
+            Tokenizer(model.hf_tokenizer, model.model.is_multilingual, task="transcribe", language=language)
+            for language in languages
+        ]
+        results = model.model.generate(
+            encoder_output,
+            [tokenizer.sot_sequence for tokenizer in tokenizers],
+            beam_size=beam_size,
+            max_length=model.max_length,
+            return_scores=True,
+            return_no_speech_prob=True,
+            suppress_blank=True,
+            suppress_tokens=[-1],
+            max_initial_timestamp_index=int(round(1.0 / model.time_precision))
+        )
+
+        outputs = []
+        for audio, language, probability, tokenizer, result in zip(audios, languages, probabilities, tokenizers, results):
+            tokens = result.sequences_ids[0]
+            avg_logprob = result.scores[0] * len(tokens) / (len(tokens) + 1)
+            duration = len(audio) / 16000
+            segments = []
+            # Same silence rule as faster-whisper's no_speech_threshold/log_prob_threshold
+            if not (result.no_speech_prob > 0.6 and avg_logprob < -1.0):
+                for start, end, text_tokens in _split_by_timestamps(tokens, tokenizer.timestamp_begin, model.time_precision, duration):
+                    text = tokenizer.decode(text_tokens).strip()
+                    if text:
+                        segments.append({
+                            'id': str(len(segments)),
+                            'start': start,
+                            'end': end,
+                            'text': text,
+                            'confidence': avg_logprob,
+                            'speaker': 'Speaker 1'
+                        })
+            outputs.append({
+                'text': ' '.join(seg['text'] for seg in segments),
+                'segments': segments,
+                'language': language,
+                'language_probability': probability
+            })
+        return outputs
+
+
+def _split_by_timestamps(tokens, timestamp_begin, time_precision, duration):
+    """Splits a decoded token sequence into (start, end, text_tokens) at timestamp tokens."""
+    pieces = []
+    start = None
+    current = []
+    for token in tokens:
+        if token < timestamp_begin:
+            current.append(token)
+            continue
+        time = min((token - timestamp_begin) * time_precision, duration)
+        if start is not None and current:
+            pieces.append((start, time, current))
+            current = []
+            start = None
+        else:
+            start = time
+    if current:
+        pieces.append((start or 0.0, duration, current))
+    return pieces
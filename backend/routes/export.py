@@ -1,19 +1,90 @@
-from flask import Blueprint, jsonify, request
-from database import get_project, get_segments
-import traceback
+import logging
+from flask import Blueprint, Response, jsonify, request
+from database import get_project, iter_segments, count_segments, list_projects, release_db
+from services.export_cache import export_cache
+from config import config
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+import io
+import os
+import zipfile
+
+logger = logging.getLogger(__name__)
 
 # Import the generation functions
 from transcribe.export import (
-    generate_srt, 
-    generate_vtt, 
-    generate_txt, 
-    generate_csv, 
-    generate_json, 
-    generate_mcp
+    iter_srt,
+    iter_vtt,
+    iter_txt,
+    iter_csv,
+    iter_json,
+    iter_mcp
 )
 
 export_bp = Blueprint('export', __name__)
 
+CONTENT_TYPES = {
+    'srt': 'application/x-subrip',
+    'vtt': 'text/vtt',
+    'txt': 'text/plain',
+    'csv': 'text/csv',
+    'json': 'application/json',
+    'mcp': 'application/json'
+}
+
+# Formats whose output depends on `include_speakers`
+SPEAKER_FORMATS = ('srt', 'vtt', 'txt', 'csv')
+
+def _cache_key(project_id, project, fmt, include_speakers):
+    filename = project.get('file_name') or f'project_{project_id}'
+    return (project_id, project.get('revision') or 0, fmt, bool(include_speakers) and fmt in SPEAKER_FORMATS, filename)
+
+def _mcp_counts(project_id):
+    # First pass over the cursor: the MCP metadata precedes the text
+    count = characters = 0
+    for seg in iter_segments(project_id):
+        characters += len(seg['text'].strip()) + (1 if count else 0)
+        count += 1
+    return count, characters
+
+def _render(project_id, fmt, include_speakers, filename):
+    """Streams the export as text chunks, reading the segments through a cursor"""
+    segments = iter_segments(project_id)
+    match fmt:
+        case 'srt':
+            return iter_srt(segments, speaker_labels=include_speakers)
+        case 'vtt':
+            return iter_vtt(segments, speaker_labels=include_speakers)
+        case 'txt':
+            return iter_txt(segments, speaker_labels=include_speakers)
+        case 'csv':
+            return iter_csv(segments, speaker_labels=include_speakers)
+        case 'json':
+            return iter_json(segments)
+        case 'mcp':
+            count, characters = _mcp_counts(project_id)
+            return iter_mcp(segments, filename=filename, segments_count=count, total_characters=characters)
+
+def _render_released(project_id, project, fmt, include_speakers):
+    """`_render_bytes` on a bulk-export worker, whose connection goes back to the pool after each file"""
+    try:
+        return _render_bytes(project_id, project, fmt, include_speakers)
+    finally:
+        release_db()
+
+def _render_bytes(project_id, project, fmt, include_speakers):
+    """The complete export, from the cache when the revision was already rendered"""
+    key = _cache_key(project_id, project, fmt, include_speakers)
+    cached = export_cache.get(key)
+    if cached is not None:
+        return cached
+    if count_segments(project_id) == 0:
+        raise LookupError("No segments found for this project")
+    data = "".join(_render(project_id, fmt, include_speakers, key[4])).encode('utf-8')
+    export_cache.put(key, data)
+    return data
+
 @export_bp.route('', methods=['POST'])
 def export_transcription():
     try:
@@ -24,37 +95,177 @@ def export_transcription():
         job_id = data['job_id']
         fmt = data['format'].lower()
         include_speakers = data.get('include_speakers', True)
+        if fmt not in CONTENT_TYPES:
+            return jsonify({"error": f"Unsupported format: {fmt}"}), 400
         
         project = get_project(job_id)
         if not project:
             return jsonify({"error": "Project not found"}), 404
-            
-        segments = get_segments(job_id)
-        if not segments:
-            return jsonify({"error": "No segments found for this project"}), 404
-            
-        filename = project.get('file_name', f'project_{job_id}')
         
-        # Generate content based on format
-        match fmt:
-            case 'srt':
-                content = generate_srt(segments, speaker_labels=include_speakers)
-            case 'vtt':
-                content = generate_vtt(segments, speaker_labels=include_speakers)
-            case 'txt':
-                content = generate_txt(segments, speaker_labels=include_speakers)
-            case 'csv':
-                content = generate_csv(segments, speaker_labels=include_speakers)
-            case 'json':
-                content = generate_json(segments)
-            case 'mcp':
-                content = generate_mcp(segments, filename=filename)
-            case _:
-                return jsonify({"error": f"Unsupported format: {fmt}"}), 400
-            
-        return jsonify({"content": content})
+        try:
+            content = _render_bytes(job_id, project, fmt, include_speakers)
+        except LookupError as e:
+            return jsonify({"error": str(e)}), 404
+        return jsonify({"content": content.decode('utf-8')})
         
     except Exception as e:
-        print(f"Error during export: {e}")
-        traceback.print_exc()
+        logger.exception("Error during export: %s", e)
         return jsonify({"error": str(e)}), 500
+
+def _attachment(filename):
+    """Content-Disposition with an ASCII fallback and the UTF-8 name (RFC 6266)"""
+    fallback = filename.encode('ascii', 'replace').decode('ascii').replace('?', '_').replace('"', '')
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename)}"
+
+@export_bp.route('/<project_id>/download', methods=['GET'])
+def download_transcription(project_id):
+    """
+    Streams an export as a file download, reading the segments through a
+    cursor: memory use does not grow with the length of the transcript.
+    Renders are cached per project revision; a matching If-None-Match gets a 304.
+    """
+    fmt = request.args.get('format', 'srt').lower()
+    include_speakers = request.args.get('include_speakers', 'true').lower() != 'false'
+    if fmt not in CONTENT_TYPES:
+        return jsonify({"error": f"Unsupported format: {fmt}"}), 400
+
+    project = get_project(project_id)
+    if not project:
+        return jsonify({"error": "Project not found"}), 404
+
+    key = _cache_key(project_id, project, fmt, include_speakers)
+    etag = export_cache.etag(key)
+    headers = {
+        'Content-Disposition': _attachment(f"{os.path.splitext(key[4])[0]}.{fmt}"),
+        # Clients may keep the file but must revalidate it
+        'Cache-Control': 'no-cache'
+    }
+    if request.if_none_match.contains(etag):
+        response = Response(status=304, headers=headers)
+    else:
+        cached = export_cache.get(key)
+        if cached is not None:
+            body = cached
+        else:
+            if count_segments(project_id) == 0:
+                return jsonify({"error": "No segments found for this project"}), 404
+            chunks = (chunk.encode('utf-8') for chunk in _render(project_id, fmt, include_speakers, key[4]))
+            body = export_cache.capture(key, chunks)
+        response = Response(body, content_type=f"{CONTENT_TYPES[fmt]}; charset=utf-8", headers=headers)
+    response.set_etag(etag)
+    return response
+
+class _ZipStream(io.RawIOBase):
+    """Write-only sink for ZipFile: what was written so far is drained and sent"""
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+def _archive_name(project, fmt, used):
+    base = os.path.splitext(project.get('file_name') or f"project_{project['id']}")[0]
+    name = f"{base}.{fmt}"
+    if name in used:
+        # Same source file name transcribed more than once
+        name = f"{base} ({project['id'][:8]}).{fmt}"
+    used.add(name)
+    return name
+
+def _bulk_archive(projects, formats, include_speakers, errors, workers):
+    """
+    Yields a ZIP archive piece by piece. Renders run on a thread pool, at most
+    a few ahead of the one being written, so memory stays bounded; entries are
+    written in request order. Failures are listed in `errors.txt`.
+    """
+    stream = _ZipStream()
+    tasks = iter([(project, fmt) for project in projects for fmt in formats])
+    used_names = set()
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bulk-export")
+    pending = deque()
+
+    def submit_next():
+        task = next(tasks, None)
+        if task:
+            project, fmt = task
+            pending.append((project, fmt, executor.submit(_render_released, project['id'], project, fmt, include_speakers)))
+
+    try:
+        with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            for _ in range(workers * 2):
+                submit_next()
+            while pending:
+                project, fmt, future = pending.popleft()
+                submit_next()
+                try:
+                    data = future.result()
+                except Exception as e:
+                    errors.append(f"{project['id']} ({fmt}): {e}")
+                    continue
+                archive.writestr(_archive_name(project, fmt, used_names), data)
+                yield stream.drain()
+            if errors:
+                archive.writestr("errors.txt", "\n".join(errors) + "\n")
+        yield stream.drain()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+@export_bp.route('/bulk', methods=['POST'])
+def bulk_export():
+    """
+    Exports several projects in several formats as one streamed ZIP.
+    Body: `{"project_ids": [...]}` or `{"filter": {"status", "from", "to"}}`,
+    plus `"formats": [...]` and optionally `"include_speakers"`.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Request body must be a JSON object"}), 400
+    formats = data.get('formats')
+    if not isinstance(formats, list) or not formats or any(str(fmt).lower() not in CONTENT_TYPES for fmt in formats):
+        return jsonify({"error": f"formats must be a non-empty subset of {sorted(CONTENT_TYPES)}"}), 400
+    formats = [str(fmt).lower() for fmt in formats]
+    include_speakers = data.get('include_speakers', True)
+    # Same reading as the download query parameter: only "false" turns labels off
+    include_speakers = include_speakers.lower() != 'false' if isinstance(include_speakers, str) else bool(include_speakers)
+
+    errors = []
+    if 'project_ids' in data:
+        if not isinstance(data['project_ids'], list) or not all(isinstance(project_id, str) for project_id in data['project_ids']):
+            return jsonify({"error": "project_ids must be a list of strings"}), 400
+        projects = []
+        for project_id in data['project_ids'][:config.EXPORT_BULK_MAX_PROJECTS + 1]:
+            project = get_project(project_id)
+            if project:
+                projects.append(project)
+            else:
+                errors.append(f"{project_id}: Project not found")
+    elif 'filter' in data:
+        filters = data['filter'] or {}
+        if not isinstance(filters, dict):
+            return jsonify({"error": "filter must be an object"}), 400
+        projects, _ = list_projects(
+            limit=config.EXPORT_BULK_MAX_PROJECTS + 1,
+            status=filters.get('status'),
+            created_from=filters.get('from'),
+            created_to=filters.get('to')
+        )
+    else:
+        return jsonify({"error": "Missing data (project_ids or filter required)"}), 400
+
+    if len(projects) + len(errors) > config.EXPORT_BULK_MAX_PROJECTS:
+        return jsonify({"error": f"Too many projects (max {config.EXPORT_BULK_MAX_PROJECTS})"}), 400
+
+    return Response(
+        _bulk_archive(projects, formats, include_speakers, errors, max(1, config.EXPORT_WORKERS)),
+        mimetype='application/zip',
+        headers={'Content-Disposition': _attachment("transcriptions.zip")}
+    )
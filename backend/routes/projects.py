@@ -1,15 +1,55 @@
-from flask import Blueprint, jsonify, request, send_file
-from database import get_projects, get_project, get_segments, delete_project, save_segments, update_project_file
+from flask import Blueprint, current_app, jsonify, request, send_file
+from database import list_projects, count_projects, get_project, get_segments, delete_project, save_segments, update_project_file, apply_segment_ops, RevisionConflict
 import os
+import json
 import hashlib
-from werkzeug.utils import secure_filename
 from config import config
+from services.export_cache import export_cache
+from services.audio_proxy import audio_proxies
+from services.uploads import UploadError
+from routes.uploads import receive_media
+from audio.peaks import read_peaks_window
+from services.peak_builder import peak_builder
+from services.transcription_service import transcription_service
 
 projects_bp = Blueprint('projects', __name__)
 
+MAX_PAGE_SIZE = 500
+
+def _listing_filters():
+    status = request.args.get('status')
+    return {
+        "status": status.split(',') if status else None,
+        "created_from": request.args.get('from'),
+        "created_to": request.args.get('to')
+    }
+
 @projects_bp.route('', methods=['GET'])
-def list_projects():
-    return jsonify(get_projects())
+def project_list():
+    """
+    One page of projects, newest first. The cursor of the next page, if any,
+    is returned in the `X-Next-Cursor` header. `from` and `to` bound the
+    creation date inclusively; a date-only `to` includes that whole day.
+    """
+    limit = request.args.get('limit', 50, type=int)
+    include = request.args.get('include', '').split(',')
+    try:
+        projects, next_cursor = list_projects(
+            limit=max(1, min(limit, MAX_PAGE_SIZE)),
+            cursor=request.args.get('cursor'),
+            include_text='full_text' in include,
+            **_listing_filters()
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    response = jsonify(projects)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+@projects_bp.route('/count', methods=['GET'])
+def project_count():
+    return jsonify({"count": count_projects(**_listing_filters())})
 
 @projects_bp.route('/<project_id>', methods=['GET'])
 def project_details(project_id):
@@ -17,12 +57,27 @@ def project_details(project_id):
     if not project:
         return jsonify({"error": "Project not found"}), 404
     
-    segments = get_segments(project_id)
-    return jsonify({**project, "segments": segments})
+    project = {**project, "audio_proxy": audio_proxies.get(project.get('file_hash')) is not None}
+    # The revision changes with every segment write, so the row identifies the whole response
+    etag = hashlib.sha1(json.dumps(project, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        segments = get_segments(project_id)
+        response = jsonify({**project, "segments": segments})
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 @projects_bp.route('/<project_id>', methods=['DELETE'])
 def remove_project(project_id):
+    # A job still waiting in the queue would otherwise run on a deleted project
+    transcription_service.cancel_job(project_id)
     if delete_project(project_id):
+        export_cache.invalidate(project_id)
+        peaks_path = config.UPLOAD_FOLDER / f"{project_id}.peaks"
+        if peaks_path.exists():
+            peaks_path.unlink()
         return jsonify({"success": True})
     return jsonify({"error": "Failed to delete project"}), 400
 
@@ -31,7 +86,59 @@ def get_media(project_id):
     project = get_project(project_id)
     if not project or not project.get('file_path'):
         return jsonify({"error": "File not found"}), 404
-    return send_file(project['file_path'])
+    # Stored media is named by hash: the type comes from the original file name
+    return send_file(project['file_path'], download_name=project.get('file_name') or None, conditional=True)
+
+@projects_bp.route('/<project_id>/peaks', methods=['GET'])
+def get_peaks(project_id):
+    """
+    Waveform min/max peaks between `from` and `to` seconds, at `level` (0 is
+    the finest) or at the finest level that fits in `points` peaks.
+    Projects without peaks get them built in the background: 202 until ready.
+    """
+    project = get_project(project_id)
+    if not project:
+        return jsonify({"error": "Project not found"}), 404
+    
+    peaks_path = config.UPLOAD_FOLDER / f"{project_id}.peaks"
+    if not peaks_path.exists():
+        if not project.get('file_path') or not os.path.exists(project['file_path']):
+            return jsonify({"error": "File not found"}), 404
+        error = peak_builder.pop_error(project_id)
+        if error:
+            return jsonify({"error": f"Failed to decode media: {error}"}), 500
+        peak_builder.schedule(project_id, peaks_path, project['file_path'], normalize=bool(project.get('normalized')))
+        response = jsonify({"status": "pending"})
+        response.headers['Retry-After'] = '2'
+        return response, 202
+    try:
+        window = read_peaks_window(
+            peaks_path,
+            level=request.args.get('level', type=int),
+            start=request.args.get('from', 0.0, type=float),
+            end=request.args.get('to', type=float),
+            max_points=max(1, min(request.args.get('points', 2000, type=int), 100_000))
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(window)
+
+@projects_bp.route('/<project_id>/proxy', methods=['GET'])
+def get_audio_proxy(project_id):
+    """
+    Low-bitrate audio-only copy of the media for playback, with Range support.
+    While it is not ready (or for small uploads) clients should use `/media`.
+    """
+    project = get_project(project_id)
+    if not project:
+        return jsonify({"error": "Project not found"}), 404
+    proxy = audio_proxies.get(project.get('file_hash'))
+    if proxy is None:
+        if project.get('file_path') and os.path.exists(project['file_path']):
+            audio_proxies.schedule(project['file_path'], project.get('file_hash'))
+        return jsonify({"error": "Audio proxy not available"}), 404
+    # conditional=True answers Range requests with 206 partial content
+    return send_file(proxy, mimetype='audio/mp4', conditional=True)
 
 @projects_bp.route('/<project_id>/segments', methods=['POST'])
 def update_segments(project_id):
@@ -40,30 +147,48 @@ def update_segments(project_id):
         return jsonify({"error": "Missing data"}), 400
     
     save_segments(project_id, data['segments'])
-    return jsonify({"success": True})
+    project = get_project(project_id)
+    return jsonify({"success": True, "revision": project['revision'] if project else None})
+
+@projects_bp.route('/<project_id>/segments', methods=['PATCH'])
+def patch_segments(project_id):
+    """
+    Applies only the segments that changed: `{"revision": n, "ops": [...]}`.
+    Returns 409 with the current revision if the project changed meanwhile.
+    """
+    data = request.json
+    if not data or 'ops' not in data or not isinstance(data['ops'], list):
+        return jsonify({"error": "Missing data"}), 400
+    try:
+        base_revision = int(data.get('revision', 0))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid revision"}), 400
+
+    if not get_project(project_id):
+        return jsonify({"error": "Project not found"}), 404
+    try:
+        revision, inserted = apply_segment_ops(project_id, base_revision, data['ops'])
+    except RevisionConflict as e:
+        return jsonify({"error": "Project was modified by another editor", "revision": e.current_revision}), 409
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"success": True, "revision": revision, "inserted": inserted})
 
 @projects_bp.route('/<project_id>/reupload', methods=['POST'])
 def reupload_media(project_id):
-    if 'file' not in request.files:
-        return jsonify({"error": "No file uploaded"}), 400
-        
     project = get_project(project_id)
     if not project:
         return jsonify({"error": "Project not found"}), 404
-        
-    file = request.files['file']
-    filename = secure_filename(file.filename)
-    file_path = config.UPLOAD_FOLDER / f"{project_id}_{filename}"
-    file.save(str(file_path))
     
-    # Calcola l'hash
-    hasher = hashlib.sha256()
-    with open(file_path, 'rb') as f:
-        for chunk in iter(lambda: f.read(65536), b""):
-            hasher.update(chunk)
-    file_hash = hasher.hexdigest()
+    try:
+        with receive_media(project_id) as (filename, file_path, file_hash):
+            update_project_file(project_id, str(file_path), filename, file_hash)
+    except UploadError as e:
+        return jsonify({"error": str(e)}), e.status
     
-    update_project_file(project_id, str(file_path), filename, file_hash)
+    audio_proxies.schedule(str(file_path), file_hash)
+    # Recomputed from the new media on the next request
+    peak_builder.invalidate(project_id, config.UPLOAD_FOLDER / f"{project_id}.peaks")
     
     return jsonify({
         "success": True, 
@@ -0,0 +1,31 @@
+import click
+from flask import Blueprint, jsonify, request
+from database import search_segments, rebuild_search_index
+
+search_bp = Blueprint('search', __name__)
+
+MAX_PAGE_SIZE = 100
+
+@search_bp.route('', methods=['GET'])
+def search():
+    """
+    Full-text search across all transcripts (or one, with `project_id`).
+    Hits are ranked and carry the segment timecodes, to seek the player.
+    """
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"error": "Missing query"}), 400
+    limit = max(1, min(request.args.get('limit', 20, type=int), MAX_PAGE_SIZE))
+    offset = max(0, request.args.get('offset', 0, type=int))
+
+    results = search_segments(query, limit=limit + 1, offset=offset, project_id=request.args.get('project_id'))
+    return jsonify({
+        "results": results[:limit],
+        "next_offset": offset + limit if len(results) > limit else None
+    })
+
+@search_bp.cli.command('rebuild-index')
+def rebuild_index_command():
+    """Rebuilds the full-text index from the stored segments."""
+    count = rebuild_search_index()
+    click.echo(f"Search index rebuilt: {count} segments indexed.")
@@ -1,7 +1,16 @@
-from flask import Blueprint, jsonify
+import click
+from flask import Blueprint, Response, jsonify
 from gpu.cuda_check import get_gpu_info
 from config import config
-from services.transcription_service import transcription_service
+from services.transcription_service import transcription_service, TranscriptionService
+from services.export_cache import export_cache
+from services.audio_proxy import audio_proxies
+from services.peak_builder import peak_builder
+from services.media_store import media_store
+from services.compute_profiles import compute_profiles
+from services.startup import startup_timings
+from services.metrics import PrometheusText, pipeline_metrics
+from database import clear_result_cache, get_query_stats
 import shutil
 import os
 
@@ -20,15 +29,94 @@ def get_system_status():
         "vram_mb_free": int(gpu_info.get('vram_free_gb', 0) * 1024),
         "disk_gb_total": total // (2**30),
         "disk_gb_free": free // (2**30),
-        "queue_length": len([j for j in transcription_service.jobs.values() if j['status'] in ['queued', 'running']])
+        "queue_length": transcription_service.scheduler.queued_count(),
+        "running_jobs": transcription_service.scheduler.running_count(),
+        "engine_pool": transcription_service.engine_pool.stats(),
+        "batching": transcription_service.batcher.stats(),
+        "database": get_query_stats(),
+        "export_cache": export_cache.stats(),
+        "audio_proxy": audio_proxies.stats(),
+        "peaks": peak_builder.stats(),
+        "compute_profiles": compute_profiles.stats(),
+        "startup": {"phases": startup_timings.stats(), "warmup": transcription_service.warmup},
+        "pipeline": pipeline_metrics.stats()
     })
 
+@system_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Prometheus text format: per-stage job timings, inference speed, queue,
+    engine pool, batching and database query latency since startup.
+    """
+    out = PrometheusText()
+    histograms = pipeline_metrics.histograms()
+    for stage, histogram in sorted(histograms["stages"].items()):
+        out.histogram("stage_duration_seconds", "Time spent by finished jobs in each pipeline stage.", histogram, {"stage": stage})
+    for status, histogram in sorted(histograms["jobs"].items()):
+        out.histogram("job_duration_seconds", "Time from submission to the end of a job, by outcome.", histogram, {"status": status})
+    out.histogram("inference_realtime_factor", "Inference seconds per second of audio of completed jobs.", histograms["realtime_factor"])
+    out.counter("audio_seconds", "Seconds of audio transcribed by completed jobs.", histograms["audio_seconds_total"])
+
+    scheduler = transcription_service.scheduler.stats()
+    out.gauge("jobs_queued", "Jobs waiting for a worker.", scheduler["queued"])
+    out.gauge("jobs_running", "Jobs being processed.", scheduler["running"])
+
+    pool = transcription_service.engine_pool.stats()
+    out.gauge("engine_pool_loaded", "Engines loaded in the pool.", len(pool["loaded"]))
+    out.gauge("engine_pool_memory_used_megabytes", "Estimated memory of the loaded engines.", pool["memory_mb_used"])
+    out.gauge("engine_pool_memory_budget_megabytes", "Memory budget of the engine pool.", pool["memory_mb_budget"])
+    for name in ("hits", "misses", "evictions", "loads"):
+        out.counter(f"engine_pool_{name}", f"Engine pool {name}.", pool[name])
+    out.counter("engine_pool_load_seconds", "Time spent loading engines.", pool["load_seconds_total"])
+
+    batching = transcription_service.batcher.stats()
+    out.gauge("batch_pending_clips", "Short clips waiting to be batched.", batching["pending"])
+    out.counter("batches", "Batches of short clips transcribed.", batching["batches"])
+    out.counter("batched_clips", "Short clips transcribed in batches.", batching["clips"])
+
+    database = get_query_stats()
+    out.counter("db_connections_opened", "SQLite connections opened.", database["connections_opened"])
+    out.counter("db_connections_reused", "SQLite connections handed out again from the pool.", database["connections_reused"])
+    for function, query in database["queries"].items():
+        out.counter("db_query_calls", "Calls of each database function.", query["calls"], {"function": function})
+    for function, query in database["queries"].items():
+        out.counter("db_query_seconds", "Time spent in each database function.", query["total_ms"] / 1000, {"function": function})
+    for function, query in database["queries"].items():
+        out.gauge("db_query_max_seconds", "Slowest call of each database function.", query["max_ms"] / 1000, {"function": function})
+    return Response(out.render(), content_type=PrometheusText.CONTENT_TYPE)
+
+@system_bp.route('/storage', methods=['GET'])
+def get_storage_report():
+    """Media storage usage and the space saved by sharing identical uploads."""
+    return jsonify(media_store.report())
+
+@system_bp.cli.command('reclaim-media')
+@click.option('--dry-run', is_flag=True, help="Only report what would be freed.")
+def reclaim_media_command(dry_run):
+    """Moves older uploads into the media store, merging duplicates."""
+    result = media_store.reclaim(dry_run=dry_run)
+    verb = "Would free" if dry_run else "Freed"
+    click.echo(f"{verb} {result['freed_bytes'] / 2**20:.1f} MB: {result['moved']} files moved, {result['orphans_removed']} orphaned objects removed.")
+
 @system_bp.route('/cache', methods=['DELETE'])
 def clear_cache():
     try:
         for item in config.UPLOAD_FOLDER.iterdir():
             if item.is_file(): item.unlink()
             elif item.is_dir(): shutil.rmtree(item)
+        clear_result_cache()
+        export_cache.clear()
         return jsonify({"success": True})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+@system_bp.cli.command('calibrate')
+@click.argument('model')
+@click.option('--seconds', default=30.0, help="Length of the synthetic calibration clip.")
+def calibrate_command(model, seconds):
+    """Times the compute settings supported here and saves the fastest for MODEL."""
+    profile = compute_profiles.calibrate(model, TranscriptionService._load_engine, clip_seconds=seconds, log=click.echo)
+    click.echo(
+        f"{model}: {profile['device']}/{profile['compute_type']}, {profile['cpu_threads']} threads, "
+        f"{profile['num_workers']} workers ({profile['realtime_factor']:.3f}x real time)."
+    )
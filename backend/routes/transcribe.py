@@ -1,80 +1,173 @@
-from flask import Blueprint, jsonify, request, send_file
+from flask import Blueprint, Response, jsonify, request, send_file
 from werkzeug.utils import secure_filename
 from config import config
-from database import create_project
+from database import create_project, get_project, get_segments, get_segments_after, get_media_paths_by_hash, release_db
 from services.transcription_service import transcription_service
+from services.audio_proxy import audio_proxies
+from services.preview_cache import preview_cache
+from services.uploads import UploadError, save_stream
+from routes.uploads import receive_media
 import uuid
-import hashlib
+import json
 import os
 
-from audio.processor import generate_preview_audio
 
 transcribe_bp = Blueprint('transcribe', __name__)
 
-@transcribe_bp.route('/preview', methods=['POST'])
+def _stored_media(file_hash):
+    """Path of an already uploaded copy of the media, if any is still on disk"""
+    for path in get_media_paths_by_hash(file_hash):
+        if os.path.exists(path):
+            return path
+    return None
+
+def _send_preview(path, file_hash):
+    response = send_file(
+        str(path),
+        mimetype="audio/wav",
+        as_attachment=True,
+        download_name="preview.wav"
+    )
+    # Lets the client ask for the other variant by hash, without uploading again
+    response.headers['X-File-Hash'] = file_hash
+    return response
+
+@transcribe_bp.route('/preview', methods=['GET', 'POST'])
 def generate_preview():
-    if 'file' not in request.files:
-        return jsonify({"error": "No file"}), 400
-        
-    file = request.files['file']
-    normalize = request.form.get('normalize', 'false') == 'true'
+    """
+    First 30 seconds of audio, raw or normalized (`normalize`), for A/B listening.
+    The source is an uploaded `file`, or media already on the server given by
+    `file_hash` or `project_id`. Both variants are cached by content hash.
+    """
+    params = request.values
+    normalize = params.get('normalize', 'false') == 'true'
+    
+    if 'file' in request.files:
+        file = request.files['file']
+        filename = secure_filename(file.filename)
+        upload_path = config.UPLOAD_FOLDER / f"preview_in_{uuid.uuid4()}_{filename}"
+        try:
+            file_hash, _ = save_stream(file.stream, upload_path)
+            preview = preview_cache.get_or_create(file_hash, normalize, lambda: str(upload_path))
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+        finally:
+            if upload_path.exists():
+                upload_path.unlink()
+        return _send_preview(preview, file_hash)
     
-    filename = secure_filename(file.filename)
-    preview_id = str(uuid.uuid4())
-    upload_path = config.UPLOAD_FOLDER / f"preview_in_{preview_id}_{filename}"
-    output_path = config.UPLOAD_FOLDER / f"preview_out_{preview_id}.wav"
+    file_hash = params.get('file_hash')
+    media_path = None
+    if params.get('project_id'):
+        project = get_project(params['project_id'])
+        if not project:
+            return jsonify({"error": "Project not found"}), 404
+        file_hash, media_path = project.get('file_hash'), project.get('file_path')
+    if not file_hash:
+        return jsonify({"error": "No file"}), 400
     
-    file.save(str(upload_path))
+    def source():
+        if media_path and os.path.exists(media_path):
+            return media_path
+        return _stored_media(file_hash)
     
     try:
-        generate_preview_audio(str(upload_path), str(output_path), normalize)
-        return send_file(
-            str(output_path),
-            mimetype="audio/wav",
-            as_attachment=True,
-            download_name="preview.wav"
-        )
+        preview = preview_cache.get_or_create(file_hash, normalize, source)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        if upload_path.exists():
-            upload_path.unlink()
-        # Non eliminiamo output_path qui subito, send_file potrebbe fallire. 
-        # In Flask in genere usiamo "after_request" o un background task per pulire, 
-        # ma possiamo lasciarlo e pulire con uno script cron (cartella UPLOADS).
+    if preview is None:
+        return jsonify({"error": "Media not found, upload the file"}), 404
+    return _send_preview(preview, file_hash)
 
 @transcribe_bp.route('/', methods=['POST'])
 @transcribe_bp.route('', methods=['POST'])
 def start_transcription():
-    if 'file' not in request.files:
-        return jsonify({"error": "No file"}), 400
-        
-    file = request.files['file']
     model = request.form.get('model', 'medium')
     language = request.form.get('language', 'auto')
     diarization = request.form.get('diarization', 'false') == 'true'
     normalized = request.form.get('normalize', 'false') == 'true'
+    use_cache = request.form.get('use_cache', 'true') == 'true'
+    try:
+        priority = int(request.form.get('priority', 0))
+    except ValueError:
+        return jsonify({"error": "priority must be an integer"}), 400
     
     job_id = str(uuid.uuid4())
-    filename = secure_filename(file.filename)
-    file_path = config.UPLOAD_FOLDER / f"{job_id}_{filename}"
-    file.save(str(file_path))
-    
-    # Hash
-    hasher = hashlib.sha256()
-    with open(file_path, 'rb') as f:
-        for chunk in iter(lambda: f.read(65536), b""):
-            hasher.update(chunk)
-    file_hash = hasher.hexdigest()
+    try:
+        with receive_media(job_id) as (filename, file_path, file_hash):
+            create_project(job_id, filename, str(file_path), filename, model, language, diarization, file_hash, normalized)
+    except UploadError as e:
+        return jsonify({"error": str(e)}), e.status
     
-    create_project(job_id, filename, str(file_path), filename, model, language, diarization, file_hash, normalized)
-    transcription_service.start_job(job_id, str(file_path), model, language, diarization, normalized)
+    audio_proxies.schedule(str(file_path), file_hash)
+    status = transcription_service.start_job(
+        job_id, str(file_path), model, language, diarization, normalized, priority,
+        file_hash=file_hash, use_cache=use_cache
+    )
     
-    return jsonify({"job_id": job_id, "status": "queued"}), 202
+    return jsonify({
+        "job_id": job_id,
+        "status": status,
+        "queue_position": transcription_service.scheduler.position(job_id)
+    }), 202
 
 @transcribe_bp.route('/<job_id>', methods=['GET'])
 def get_status(job_id):
     status = transcription_service.get_job_status(job_id)
     if not status:
         return jsonify({"error": "Not found"}), 404
-    return jsonify(status)
+    
+    # Segments are returned incrementally: pass back `cursor` as `since`.
+    # `reset` means the segments were rewritten (e.g. the final result
+    # replaced the streamed ones): the list is complete and replaces the client's
+    since = request.args.get('since', 0, type=int)
+    segments, reset = get_segments_after(job_id, since)
+    cursor = int(segments[-1]['id']) if segments else (0 if reset else since)
+    return jsonify({**status, "segments": segments, "cursor": cursor, "reset": reset})
+
+def _sse(event_id, event_type, data):
+    return f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@transcribe_bp.route('/<job_id>/events', methods=['GET'])
+def stream_events(job_id):
+    """
+    Server-Sent Events stream of a job: `status`, `log` and `segments` deltas.
+    A reconnecting client resumes from its Last-Event-ID; a new client (or one
+    that fell behind the retained history) first receives a `snapshot` event.
+    """
+    if not transcription_service.get_job_status(job_id):
+        return jsonify({"error": "Not found"}), 404
+    
+    bus = transcription_service.events
+    last_id = request.headers.get('Last-Event-ID', type=int)
+    if last_id is None:
+        last_id = request.args.get('last_event_id', type=int)
+    
+    def generate():
+        cursor = last_id
+        if cursor is None or not bus.can_resume(job_id, cursor):
+            # Segments flushed after this point may appear twice: clients dedupe by id
+            cursor = bus.last_event_id(job_id)
+            try:
+                snapshot = {**transcription_service.get_job_status(job_id), "segments": get_segments(job_id)}
+            finally:
+                # The stream outlives the request teardown: give the connection back now
+                release_db()
+            yield _sse(cursor, "snapshot", snapshot)
+        if not bus.has_job(job_id):
+            # Finished before this server started: the snapshot is all there is
+            return
+        while True:
+            events, closed = bus.wait(job_id, cursor, timeout=15)
+            if not events and not closed:
+                yield ": keep-alive\n\n"
+            for event_id, event_type, data in events:
+                cursor = event_id
+                yield _sse(event_id, event_type, data)
+            if closed:
+                return
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
@@ -0,0 +1,102 @@
+from contextlib import contextmanager
+from flask import Blueprint, jsonify, request
+from werkzeug.utils import secure_filename
+from config import config
+from database import media_lock
+from services.media_store import media_store
+from services.uploads import UploadError, save_stream, uploads
+
+uploads_bp = Blueprint('uploads', __name__)
+
+def _error(e):
+    body = {"error": str(e)}
+    if e.offset is not None:
+        body["offset"] = e.offset
+    return jsonify(body), e.status
+
+@contextmanager
+def receive_media(prefix):
+    """
+    Stores the media of a request in the content-addressed media store: either
+    the multipart `file`, hashed while it is written, or a finalized chunked
+    upload given by `upload_id`. Identical content is kept only once.
+    Yields (filename, path, sha256); raises UploadError. The stored file must
+    be referenced by a project inside the `with` block, which holds
+    `media_lock` so the object cannot be released as unreferenced meanwhile.
+    """
+    if 'file' in request.files:
+        file = request.files['file']
+        filename = secure_filename(file.filename)
+        tmp_path = config.UPLOAD_FOLDER / f"{prefix}_{filename}"
+        file_hash, _ = save_stream(file.stream, tmp_path)
+    else:
+        upload_id = request.form.get('upload_id')
+        if not upload_id:
+            raise UploadError("No file")
+        filename = secure_filename(uploads.status(upload_id)["filename"])
+        tmp_path = config.UPLOAD_FOLDER / f"{prefix}_{filename}"
+        _, file_hash = uploads.claim(upload_id, tmp_path)
+    with media_lock:
+        file_path, _ = media_store.ingest(tmp_path, file_hash)
+        yield filename, file_path, file_hash
+
+@uploads_bp.route('', methods=['POST'])
+def create_upload():
+    """
+    Opens a chunked upload. Body: `filename`, `size` in bytes and optionally
+    the expected `sha256`, checked when the upload is finalized.
+    """
+    data = request.get_json(silent=True) or {}
+    filename = secure_filename(data.get('filename') or '')
+    size = data.get('size')
+    if not filename or not isinstance(size, int):
+        return jsonify({"error": "filename and size are required"}), 400
+    try:
+        status = uploads.create(filename, size, data.get('sha256'))
+    except UploadError as e:
+        return _error(e)
+    status["chunk_size"] = config.UPLOAD_CHUNK_MB * 1024 * 1024
+    return jsonify(status), 201
+
+@uploads_bp.route('/<upload_id>', methods=['GET'])
+def upload_status(upload_id):
+    """Bytes received so far: a resuming client continues from `offset`."""
+    try:
+        return jsonify(uploads.status(upload_id))
+    except UploadError as e:
+        return _error(e)
+
+@uploads_bp.route('/<upload_id>', methods=['PUT'])
+def append_chunk(upload_id):
+    """
+    Appends the raw request body at the `Upload-Offset` header. The body is
+    streamed to disk, never buffered whole. A wrong offset returns 409 with
+    the offset expected by the server.
+    """
+    offset = request.headers.get('Upload-Offset', type=int)
+    if offset is None:
+        return jsonify({"error": "Missing Upload-Offset header"}), 400
+    try:
+        new_offset = uploads.append(upload_id, offset, request.stream)
+    except UploadError as e:
+        return _error(e)
+    return jsonify({"upload_id": upload_id, "offset": new_offset})
+
+@uploads_bp.route('/<upload_id>/finalize', methods=['POST'])
+def finalize_upload(upload_id):
+    """
+    Completes the upload and returns its `file_hash`. The `upload_id` can then
+    be passed instead of `file` to start a transcription or reupload media.
+    """
+    try:
+        return jsonify(uploads.finalize(upload_id))
+    except UploadError as e:
+        return _error(e)
+
+@uploads_bp.route('/<upload_id>', methods=['DELETE'])
+def cancel_upload(upload_id):
+    try:
+        uploads.discard(upload_id)
+    except UploadError as e:
+        return _error(e)
+    return jsonify({"success": True})
@@ -0,0 +1,78 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Optional
+from config import config
+from audio.processor import create_audio_proxy
+
+logger = logging.getLogger(__name__)
+
+
+class AudioProxyStore:
+    """
+    Audio-only playback copies of uploaded media, cached by content hash so
+    identical uploads share one proxy. Proxies are encoded in the background,
+    one at a time, to stay out of the way of transcription.
+    """
+
+    def __init__(self, folder: Path, bitrate: str, min_bytes: int):
+        self.folder = Path(folder)
+        self.bitrate = bitrate
+        self.min_bytes = min_bytes
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="audio-proxy")
+        self._pending = set()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.failed = 0
+
+    def path(self, file_hash: str) -> Path:
+        return self.folder / f"{file_hash}.m4a"
+
+    def get(self, file_hash: Optional[str]) -> Optional[Path]:
+        if not file_hash:
+            return None
+        path = self.path(file_hash)
+        return path if path.exists() else None
+
+    def schedule(self, media_path: str, file_hash: Optional[str]) -> bool:
+        """Queues the proxy of a media file unless it exists, is queued, or is not worth it"""
+        if not config.AUDIO_PROXY_ENABLED or not file_hash or self.get(file_hash):
+            return False
+        try:
+            if os.path.getsize(media_path) < self.min_bytes:
+                return False
+        except OSError:
+            return False
+        with self._lock:
+            if file_hash in self._pending:
+                return False
+            self._pending.add(file_hash)
+        self._executor.submit(self._build, media_path, file_hash)
+        return True
+
+    def _build(self, media_path: str, file_hash: str) -> None:
+        path = self.path(file_hash)
+        tmp_path = path.with_suffix(".tmp")
+        try:
+            self.folder.mkdir(parents=True, exist_ok=True)
+            create_audio_proxy(media_path, str(tmp_path), bitrate=self.bitrate)
+            os.replace(tmp_path, path)
+            self.created += 1
+        except Exception as e:
+            logger.warning("Audio proxy for %s failed: %s", media_path, e)
+            self.failed += 1
+            if tmp_path.exists():
+                tmp_path.unlink()
+        finally:
+            with self._lock:
+                self._pending.discard(file_hash)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = len(self._pending)
+        return {"pending": pending, "created": self.created, "failed": self.failed}
+
+
+audio_proxies = AudioProxyStore(config.PROXY_FOLDER, config.AUDIO_PROXY_BITRATE, config.AUDIO_PROXY_MIN_MB * 1024 * 1024)
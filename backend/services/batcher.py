@@ -0,0 +1,97 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ShortClipBatcher:
+    """
+    Groups short clips waiting for inference into batches.
+
+    `submit` is called by the job's own worker thread and blocks until the
+    clip's batch has run, so batched jobs keep their scheduler slot and count
+    as running. The first clip waiting for a model opens a collection window
+    of `window_seconds`; when the window closes or `max_batch_size` clips are
+    waiting, whichever comes first, that clip's thread runs the batch while
+    the others wait for it. Batches of different models (or successive
+    batches of one model) therefore run on different workers in parallel.
+    Clips are grouped by model because a batch runs on a single engine.
+    """
+
+    def __init__(self, run_batch: Callable[[str, List[Dict[str, Any]]], None], window_seconds: float, max_batch_size: int):
+        self._run_batch = run_batch
+        self.window_seconds = window_seconds
+        self.max_batch_size = max(1, max_batch_size)
+        self._pending: Dict[str, List[Dict[str, Any]]] = {}
+        self._cond = threading.Condition()
+        self.batches = 0
+        self.clips = 0
+        self.audio_seconds = 0.0
+        self.inference_seconds = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_batch_size > 1
+
+    def submit(self, model: str, item: Dict[str, Any]) -> None:
+        """Queues a clip and returns once the batch it ended up in has run"""
+        entry = {"item": item, "queued": time.monotonic(), "done": False}
+        with self._cond:
+            pending = self._pending.setdefault(model, [])
+            pending.append(entry)
+            self._cond.notify_all()
+            batch = self._wait_for_batch(model, entry)
+        if batch is None:
+            return
+        try:
+            self._run_batch(model, [e["item"] for e in batch])
+        except Exception:
+            logger.exception("Unhandled error in batch of %d clips (%s)", len(batch), model)
+        finally:
+            with self._cond:
+                for e in batch:
+                    e["done"] = True
+                self._cond.notify_all()
+
+    def record(self, clips: int, audio_seconds: float, inference_seconds: float) -> None:
+        with self._cond:
+            self.batches += 1
+            self.clips += clips
+            self.audio_seconds += audio_seconds
+            self.inference_seconds += inference_seconds
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "window_ms": int(self.window_seconds * 1000),
+                "max_batch_size": self.max_batch_size,
+                "pending": sum(len(items) for items in self._pending.values()),
+                "batches": self.batches,
+                "clips": self.clips,
+                "avg_batch_size": round(self.clips / self.batches, 2) if self.batches else 0.0,
+                "clips_per_second": round(self.clips / self.inference_seconds, 2) if self.inference_seconds else 0.0,
+                "audio_seconds": round(self.audio_seconds, 1),
+            }
+
+    def _wait_for_batch(self, model: str, entry: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Called with the condition held. Returns the batch to run when `entry`
+        is the oldest clip of its model and the batch is ready (full, or its
+        window has elapsed); None once another thread has run it.
+        """
+        pending = self._pending[model]
+        while not entry["done"]:
+            if pending and pending[0] is entry:
+                wait_for = entry["queued"] + self.window_seconds - time.monotonic()
+                if len(pending) >= self.max_batch_size or wait_for <= 0:
+                    batch = pending[:self.max_batch_size]
+                    del pending[:self.max_batch_size]
+                    # The next clip in line, if any, now leads the following batch
+                    self._cond.notify_all()
+                    return batch
+                self._cond.wait(timeout=wait_for)
+            else:
+                self._cond.wait()
+        return None
@@ -0,0 +1,236 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+import numpy as np
+from config import config
+from gpu.cuda_check import COMPUTE_TYPE_PREFERENCE, get_gpu_info, optimize_for_whisper, pick_compute_type, supported_compute_types
+
+SAMPLE_RATE = 16000
+
+
+def calibration_clip(seconds: float = 30.0) -> np.ndarray:
+    """
+    Deterministic speech-like signal for calibration: voiced harmonics with a
+    moving pitch, cut into syllables and phrases, over light noise. It needs
+    no bundled media and gives every candidate the same decoding work.
+    """
+    rng = np.random.default_rng(0)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    pitch = 140 + 40 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+    voice = sum(np.sin(k * phase) / k for k in range(1, 8))
+    syllables = np.clip(np.sin(2 * np.pi * 4 * t) + 0.3, 0, 1)
+    phrases = np.sin(2 * np.pi * 0.25 * t) > -0.7
+    clip = 0.1 * voice * syllables * phrases + 0.005 * rng.standard_normal(len(t))
+    return clip.astype(np.float32)
+
+
+def time_transcription(engine, clip: np.ndarray) -> float:
+    """Seconds to transcribe `clip`; no VAD and no fallback, so the whole clip is decoded once"""
+    start = time.perf_counter()
+    segments, _ = engine.model.transcribe(
+        clip, language="en", beam_size=5, vad_filter=False,
+        temperature=0.0, condition_on_previous_text=False
+    )
+    for _ in segments:
+        pass
+    return time.perf_counter() - start
+
+
+class ComputeProfiles:
+    """
+    Device, precision, CPU threads and worker count used to load each model.
+
+    Without calibration the profile follows the hardware: the GPU if the model
+    fits its memory, int8 on CPU, and the cores split between the parallel
+    transcriptions. `calibrate` times the supported precisions and thread
+    counts on a synthetic clip and saves the fastest per model; saved
+    profiles apply only on the host (GPU, core count, CTranslate2 version)
+    they were measured on. Explicit settings in the config always win.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.RLock()
+        self._hardware: Optional[Dict[str, Any]] = None
+        self._calibrated: Dict[str, Dict[str, Any]] = {}
+        self._loaded_mtime: Optional[float] = None
+        self._used = set()
+
+    def hardware(self) -> Dict[str, Any]:
+        """Detected once: it does not change while the server runs"""
+        with self._lock:
+            if self._hardware is None:
+                gpu_info = get_gpu_info()
+                try:
+                    import ctranslate2
+                    ct2_version = ctranslate2.__version__
+                except ImportError:
+                    ct2_version = None
+                self._hardware = {
+                    "gpu": gpu_info.get('device') if gpu_info.get('available') else None,
+                    "vram_gb": gpu_info.get('vram_total_gb', 0) if gpu_info.get('available') else 0,
+                    "cpu_count": os.cpu_count() or 1,
+                    "ctranslate2": ct2_version,
+                }
+            return self._hardware
+
+    def _fingerprint(self) -> str:
+        hardware = self.hardware()
+        return f"{hardware['gpu'] or 'cpu'}|{hardware['cpu_count']}|{hardware['ctranslate2']}"
+
+    def _load(self) -> None:
+        """(Re)reads the saved calibrations when the file changed, e.g. after the CLI ran"""
+        try:
+            mtime = self.path.stat().st_mtime
+        except OSError:
+            return
+        if mtime == self._loaded_mtime:
+            return
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            self._loaded_mtime = mtime
+            same_host = saved.get("fingerprint") == self._fingerprint()
+            self._calibrated = saved.get("profiles", {}) if same_host else {}
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"fingerprint": self._fingerprint(), "profiles": self._calibrated}, f, indent=2)
+        os.replace(tmp_path, self.path)
+        self._loaded_mtime = self.path.stat().st_mtime
+
+    def heuristic(self, model_name: str) -> Dict[str, Any]:
+        hardware = self.hardware()
+        cores = hardware["cpu_count"]
+        device, compute_type = optimize_for_whisper(model_name, hardware["vram_gb"] if hardware["gpu"] else 0)
+        if config.COMPUTE_DEVICE != "auto":
+            device = config.COMPUTE_DEVICE
+        if config.COMPUTE_TYPE != "auto":
+            compute_type = config.COMPUTE_TYPE
+        else:
+            compute_type = pick_compute_type(device, compute_type)
+
+        inferences = max(1, config.MAX_CONCURRENT_INFERENCES)
+        if device == "cuda":
+            num_workers = config.ENGINE_NUM_WORKERS or inferences
+            # Host threads only feed the GPU: CTranslate2's default is enough
+            cpu_threads = config.CPU_THREADS
+        else:
+            # Parallel transcriptions share the cores instead of oversubscribing them
+            num_workers = config.ENGINE_NUM_WORKERS or min(inferences, max(1, cores // 2))
+            cpu_threads = config.CPU_THREADS or max(1, cores // num_workers)
+        return {
+            "model": model_name,
+            "device": device,
+            "compute_type": compute_type,
+            "cpu_threads": cpu_threads,
+            "num_workers": num_workers,
+            "source": "hardware",
+        }
+
+    def get(self, model_name: str) -> Dict[str, Any]:
+        """The calibrated profile of the model if any, else the hardware heuristic"""
+        self._load()
+        profile = self.heuristic(model_name)
+        with self._lock:
+            self._used.add(model_name)
+            calibrated = self._calibrated.get(model_name)
+        if calibrated and calibrated["device"] == profile["device"]:
+            profile.update({
+                key: calibrated[key]
+                for key in ("compute_type", "cpu_threads", "num_workers")
+                if not self._overridden(key)
+            })
+            profile.update(
+                source="calibrated",
+                realtime_factor=calibrated.get("realtime_factor"),
+                calibrated_at=calibrated.get("calibrated_at")
+            )
+        return profile
+
+    @staticmethod
+    def _overridden(key: str) -> bool:
+        return {
+            "compute_type": config.COMPUTE_TYPE != "auto",
+            "cpu_threads": config.CPU_THREADS > 0,
+            "num_workers": config.ENGINE_NUM_WORKERS > 0,
+        }[key]
+
+    def candidates(self, model_name: str):
+        """(compute_type, cpu_threads) pairs worth timing on this host"""
+        base = self.heuristic(model_name)
+        device = base["device"]
+        if config.COMPUTE_TYPE != "auto":
+            compute_types = [config.COMPUTE_TYPE]
+        else:
+            supported = supported_compute_types(device)
+            compute_types = [ct for ct in COMPUTE_TYPE_PREFERENCE[device] if ct in supported]
+        if device == "cpu" and not config.CPU_THREADS:
+            per_worker = max(1, self.hardware()["cpu_count"] // base["num_workers"])
+            threads = sorted({per_worker, max(1, per_worker // 2)}, reverse=True)
+        else:
+            threads = [base["cpu_threads"]]
+        return [(ct, th) for ct in compute_types for th in threads]
+
+    def calibrate(self, model_name: str, factory: Callable[..., Any], clip_seconds: float = 30.0,
+                  log: Callable[[str], None] = print) -> Dict[str, Any]:
+        """
+        Loads the model with each candidate setting, times it on the synthetic
+        clip (after a short warm-up) and saves the fastest as the model's profile.
+        """
+        base = self.heuristic(model_name)
+        clip = calibration_clip(clip_seconds)
+        results = []
+        for compute_type, cpu_threads in self.candidates(model_name):
+            try:
+                engine = factory(model_name, base["device"], compute_type, None, base["num_workers"], cpu_threads)
+                time_transcription(engine, clip[:5 * SAMPLE_RATE])
+                seconds = time_transcription(engine, clip)
+            except Exception as e:
+                log(f"{compute_type}, {cpu_threads} threads: failed ({e})")
+                continue
+            # Released before the next candidate is loaded
+            engine = None
+            log(f"{compute_type}, {cpu_threads} threads: {seconds:.2f}s for {clip_seconds:.0f}s of audio")
+            results.append({"compute_type": compute_type, "cpu_threads": cpu_threads, "seconds": round(seconds, 3)})
+        if not results:
+            raise RuntimeError(f"No compute setting could run {model_name} on {base['device']}")
+
+        best = min(results, key=lambda result: result["seconds"])
+        profile = dict(
+            base,
+            compute_type=best["compute_type"],
+            cpu_threads=best["cpu_threads"],
+            source="calibrated",
+            realtime_factor=round(best["seconds"] / clip_seconds, 4),
+            calibrated_at=datetime.now().isoformat(),
+            candidates=results,
+        )
+        self._load()
+        with self._lock:
+            self._calibrated[model_name] = profile
+            self._save()
+        return profile
+
+    def stats(self) -> Dict[str, Any]:
+        """The hardware, and the profile of every model used or calibrated"""
+        self._load()
+        with self._lock:
+            models = sorted(self._used | set(self._calibrated))
+        return {
+            "hardware": self.hardware(),
+            "profiles": {name: self.get(name) for name in models},
+        }
+
+
+compute_profiles = ComputeProfiles(config.COMPUTE_PROFILES_PATH)
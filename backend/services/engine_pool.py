@@ -0,0 +1,161 @@
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+from models.memory import COMPUTE_TYPE_FACTOR, model_memory_mb
+
+EngineKey = Tuple[str, str, str]
+
+def estimate_engine_memory_mb(model_name: str, compute_type: str) -> int:
+    return int(model_memory_mb(model_name) * COMPUTE_TYPE_FACTOR.get(compute_type, 1.0))
+
+
+class _PoolEntry:
+    def __init__(self, engine: Any, memory_mb: int, num_workers: int):
+        self.engine = engine
+        self.memory_mb = memory_mb
+        self.refs = 0
+        # CTranslate2 can serve up to `num_workers` transcriptions in parallel
+        self.slots = threading.BoundedSemaphore(max(1, num_workers))
+
+
+class EnginePool:
+    """
+    Keeps several loaded engines keyed by (model, device, compute_type).
+
+    Idle engines are evicted in least-recently-used order when loading a new
+    one would exceed the memory budget. Engines in use are never evicted.
+    """
+
+    def __init__(self, factory: Callable[..., Any], memory_budget_mb: int, num_workers: int = 1):
+        self._factory = factory
+        self.memory_budget_mb = memory_budget_mb
+        self.num_workers = max(1, num_workers)
+        self._engines: "OrderedDict[EngineKey, _PoolEntry]" = OrderedDict()
+        self._loading: Dict[EngineKey, threading.Event] = {}
+        self._lock = threading.Lock()
+        # Memory of model copies loaded outside the pool (long-file worker processes)
+        self._reserved_mb = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load_count = 0
+        self.load_seconds_total = 0.0
+        self.last_load_seconds: Optional[float] = None
+
+    @contextmanager
+    def acquire(self, model_name: str, device: str, compute_type: str, log_callback: Optional[Callable[[str], None]] = None,
+                num_workers: Optional[int] = None, cpu_threads: int = 0) -> Iterator[Any]:
+        """
+        Yields a loaded engine, loading it (and evicting others) on a miss.
+        `num_workers` (default: the pool's) and `cpu_threads` apply when loading.
+        """
+        key = (model_name, device, compute_type)
+        entry = self._checkout(key, log_callback, max(1, num_workers or self.num_workers), cpu_threads)
+        entry.slots.acquire()
+        try:
+            yield entry.engine
+        finally:
+            entry.slots.release()
+            with self._lock:
+                entry.refs -= 1
+
+    @contextmanager
+    def reserve(self, model_name: str, compute_type: str, copies: int) -> Iterator[int]:
+        """
+        Accounts for up to `copies` instances of a model loaded outside the
+        pool, evicting idle engines to make room. Yields how many copies fit
+        the budget (at least one); they count as used memory until the block exits.
+        """
+        per_copy = estimate_engine_memory_mb(model_name, compute_type)
+        with self._lock:
+            self._evict_for(per_copy * copies)
+            free = self.memory_budget_mb - self._used_memory_mb()
+            granted = max(1, min(copies, free // per_copy))
+            self._reserved_mb += granted * per_copy
+        try:
+            yield granted
+        finally:
+            with self._lock:
+                self._reserved_mb -= granted * per_copy
+
+    def _checkout(self, key: EngineKey, log_callback: Optional[Callable[[str], None]], num_workers: int, cpu_threads: int) -> _PoolEntry:
+        while True:
+            with self._lock:
+                entry = self._engines.get(key)
+                if entry is not None:
+                    self._engines.move_to_end(key)
+                    entry.refs += 1
+                    self.hits += 1
+                    return entry
+                loading = self._loading.get(key)
+                is_loader = loading is None
+                if is_loader:
+                    self.misses += 1
+                    loading = threading.Event()
+                    self._loading[key] = loading
+            if not is_loader:
+                # Another job is loading the same model: wait and retry as a hit
+                loading.wait()
+                continue
+            try:
+                return self._load(key, log_callback, num_workers, cpu_threads)
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+                loading.set()
+
+    def _load(self, key: EngineKey, log_callback: Optional[Callable[[str], None]], num_workers: int, cpu_threads: int) -> _PoolEntry:
+        model_name, device, compute_type = key
+        memory_mb = estimate_engine_memory_mb(model_name, compute_type)
+        with self._lock:
+            self._evict_for(memory_mb)
+
+        start = time.perf_counter()
+        engine = self._factory(model_name, device, compute_type, log_callback, num_workers, cpu_threads)
+        elapsed = time.perf_counter() - start
+        # The loading job's logger must not leak into later jobs
+        engine.log_callback = None
+
+        entry = _PoolEntry(engine, memory_mb, num_workers)
+        with self._lock:
+            self.load_count += 1
+            self.load_seconds_total += elapsed
+            self.last_load_seconds = elapsed
+            entry.refs = 1
+            self._engines[key] = entry
+        return entry
+
+    def _evict_for(self, memory_mb: int) -> None:
+        """Drops idle engines, oldest first, until `memory_mb` fits the budget."""
+        for key in list(self._engines.keys()):
+            if self._used_memory_mb() + memory_mb <= self.memory_budget_mb:
+                return
+            if self._engines[key].refs == 0:
+                del self._engines[key]
+                self.evictions += 1
+
+    def _used_memory_mb(self) -> int:
+        return sum(entry.memory_mb for entry in self._engines.values()) + self._reserved_mb
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in [k for k, e in self._engines.items() if e.refs == 0]:
+                del self._engines[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "loaded": ["/".join(key) for key in self._engines.keys()],
+                "memory_mb_used": self._used_memory_mb(),
+                "memory_mb_budget": self.memory_budget_mb,
+                "memory_mb_reserved": self._reserved_mb,
+                "num_workers": self.num_workers,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "loads": self.load_count,
+                "load_seconds_total": round(self.load_seconds_total, 3),
+                "last_load_seconds": round(self.last_load_seconds, 3) if self.last_load_seconds is not None else None,
+            }
@@ -0,0 +1,92 @@
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Tuple
+
+Event = Tuple[int, str, Dict[str, Any]]
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+class _JobChannel:
+    def __init__(self, history: int):
+        self.events: deque = deque(maxlen=history)
+        self.last_id = 0
+        self.closed = False
+
+
+class JobEventBus:
+    """
+    Per-job stream of progress events with numbered ids.
+
+    Each job keeps a bounded history so a client reconnecting with
+    `Last-Event-ID` can resume; if it fell further behind than the history
+    it has to start again from a snapshot. The channels of finished jobs are
+    kept for a while and dropped oldest first.
+    """
+
+    def __init__(self, history: int = 500, max_jobs: int = 200):
+        self.history = history
+        self.max_jobs = max_jobs
+        self._channels: "OrderedDict[str, _JobChannel]" = OrderedDict()
+        self._cond = threading.Condition()
+
+    def publish(self, job_id: str, event_type: str, data: Dict[str, Any]) -> int:
+        with self._cond:
+            channel = self._channels.get(job_id)
+            if channel is None:
+                channel = self._channels[job_id] = _JobChannel(self.history)
+                self._trim()
+            channel.last_id += 1
+            channel.events.append((channel.last_id, event_type, data))
+            if event_type == "status" and data.get("status") in TERMINAL_STATUSES:
+                channel.closed = True
+            self._cond.notify_all()
+            return channel.last_id
+
+    def has_job(self, job_id: str) -> bool:
+        with self._cond:
+            return job_id in self._channels
+
+    def last_event_id(self, job_id: str) -> int:
+        with self._cond:
+            channel = self._channels.get(job_id)
+            return channel.last_id if channel else 0
+
+    def can_resume(self, job_id: str, last_id: int) -> bool:
+        """True if every event after `last_id` is still in the history."""
+        with self._cond:
+            channel = self._channels.get(job_id)
+            if channel is None or last_id > channel.last_id:
+                return False
+            oldest = channel.events[0][0] if channel.events else channel.last_id + 1
+            return last_id >= oldest - 1
+
+    def wait(self, job_id: str, last_id: int, timeout: float) -> Tuple[List[Event], bool]:
+        """
+        Returns the events newer than `last_id`, waiting up to `timeout` seconds
+        for one to arrive, and whether the job's stream is finished.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._newer(job_id, last_id) or self._is_closed(job_id), timeout=timeout)
+            channel = self._channels.get(job_id)
+            if channel is None:
+                return [], True
+            events = [event for event in channel.events if event[0] > last_id]
+            return events, channel.closed
+
+    def _newer(self, job_id: str, last_id: int) -> bool:
+        channel = self._channels.get(job_id)
+        return channel is not None and channel.last_id > last_id
+
+    def _is_closed(self, job_id: str) -> bool:
+        channel = self._channels.get(job_id)
+        return channel is None or channel.closed
+
+    def _trim(self) -> None:
+        while len(self._channels) > self.max_jobs:
+            for job_id, channel in self._channels.items():
+                if channel.closed:
+                    del self._channels[job_id]
+                    break
+            else:
+                return
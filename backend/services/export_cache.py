@@ -0,0 +1,99 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+from config import config
+
+# (project_id, revision, format, include_speakers, file_name)
+ExportKey = Tuple[str, int, str, bool, str]
+
+
+class ExportCache:
+    """
+    In-memory LRU of rendered exports, bounded by total size.
+
+    Entries are keyed by the project revision: any change to the segments
+    bumps the revision, so a stale render is never served. Older revisions of
+    a project are dropped as soon as a newer one is stored.
+    """
+
+    def __init__(self, max_bytes: int, max_entry_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes
+        # A single huge transcript should not flush everything else
+        self.max_entry_bytes = max_entry_bytes if max_entry_bytes is not None else max_bytes // 4
+        self._entries: "OrderedDict[ExportKey, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def etag(key: ExportKey) -> str:
+        """Derived from the key alone, so a 304 needs no render and no segment read"""
+        return hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+
+    def get(self, key: ExportKey) -> Optional[bytes]:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key: ExportKey, data: bytes) -> bool:
+        if len(data) > self.max_entry_bytes:
+            return False
+        with self._lock:
+            for stale in [k for k in self._entries if k[0] == key[0] and k[1] != key[1]]:
+                self._size -= len(self._entries.pop(stale))
+            if key in self._entries:
+                self._size -= len(self._entries.pop(key))
+            self._entries[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+        return True
+
+    def capture(self, key: ExportKey, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Passes a streamed render through, storing it once complete unless it
+        grows past the per-entry limit (then it is only streamed).
+        """
+        buffer = []
+        size = 0
+        for chunk in chunks:
+            if buffer is not None:
+                size += len(chunk)
+                if size > self.max_entry_bytes:
+                    buffer = None
+                else:
+                    buffer.append(chunk)
+            yield chunk
+        if buffer is not None:
+            self.put(key, b"".join(buffer))
+
+    def invalidate(self, project_id: str) -> None:
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == project_id]:
+                self._size -= len(self._entries.pop(key))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "size_mb": round(self._size / (1024 * 1024), 2),
+                "max_mb": round(self.max_bytes / (1024 * 1024), 2),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+export_cache = ExportCache(config.EXPORT_CACHE_MAX_MB * 1024 * 1024)
@@ -0,0 +1,153 @@
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Tuple
+from config import config
+from database import get_media_references, media_lock, relink_media
+
+# Unreferenced objects younger than this are not reclaimed: another process
+# (the server, for the CLI) may have just stored them for a project being created
+ORPHAN_GRACE_SECONDS = 3600
+
+
+class MediaStore:
+    """
+    Content-addressed storage of uploaded media: each distinct file is kept
+    once as `folder/<sha256>` and projects point at it through `file_path`.
+    The number of projects with that `file_path` is the reference count; the
+    database removes the object when the last one goes away. Ingestion,
+    releases and reclaims are serialized by `database.media_lock`.
+    """
+
+    def __init__(self, folder: Path):
+        self.folder = Path(folder)
+        self.deduplicated = 0
+        self.bytes_saved = 0
+
+    def path(self, file_hash: str) -> Path:
+        return self.folder / file_hash
+
+    def contains(self, file_path) -> bool:
+        return Path(file_path).parent == self.folder
+
+    def ingest(self, tmp_path, file_hash: str) -> Tuple[Path, bool]:
+        """
+        Moves a freshly written upload into the store, or drops it if the same
+        content is already there. Returns the object path and whether it was a duplicate.
+        The caller holds `media_lock` until a project references the object.
+        """
+        path = self.path(file_hash)
+        with media_lock:
+            self.folder.mkdir(parents=True, exist_ok=True)
+            if path.exists():
+                size = os.path.getsize(tmp_path)
+                os.remove(tmp_path)
+                # Restarts the reclaim grace period of an object that was unreferenced
+                os.utime(path)
+                self.deduplicated += 1
+                self.bytes_saved += size
+                return path, True
+            os.replace(tmp_path, path)
+            return path, False
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Space used by media files: `saved_bytes` is what the shared objects
+        avoid storing again; `reclaimable_bytes` is what `reclaim` would free
+        (duplicated files from before the store, and unreferenced objects past
+        their grace period).
+        """
+        referenced = set()
+        hashes: Dict[str, int] = {}
+        stored = logical = legacy_files = legacy_bytes = reclaimable = 0
+        references = get_media_references()
+        for ref in references:
+            path = ref['file_path']
+            referenced.add(os.path.abspath(path))
+            if not os.path.exists(path):
+                continue
+            size = os.path.getsize(path)
+            stored += size
+            logical += size * ref['refs']
+            if not self.contains(path):
+                legacy_files += 1
+                legacy_bytes += size
+            if ref['file_hash']:
+                # Every copy of the same content but one could go
+                if ref['file_hash'] in hashes:
+                    reclaimable += size
+                hashes[ref['file_hash']] = hashes.get(ref['file_hash'], 0) + 1
+
+        objects = orphaned = orphaned_bytes = 0
+        cutoff = time.time() - ORPHAN_GRACE_SECONDS
+        if self.folder.exists():
+            for item in self.folder.iterdir():
+                if not item.is_file():
+                    continue
+                objects += 1
+                if os.path.abspath(item) not in referenced and item.stat().st_mtime < cutoff:
+                    orphaned += 1
+                    orphaned_bytes += item.stat().st_size
+
+        return {
+            "objects": objects,
+            "references": sum(ref['refs'] for ref in references),
+            "stored_bytes": stored,
+            "logical_bytes": logical,
+            "saved_bytes": logical - stored,
+            "legacy_files": legacy_files,
+            "legacy_bytes": legacy_bytes,
+            "orphaned_objects": orphaned,
+            "reclaimable_bytes": reclaimable + orphaned_bytes,
+            "deduplicated_uploads": self.deduplicated,
+        }
+
+    def reclaim(self, dry_run: bool = False) -> Dict[str, Any]:
+        """
+        Moves media stored before the object store into it, merging duplicate
+        copies, and deletes unreferenced objects older than ORPHAN_GRACE_SECONDS.
+        Returns the bytes freed.
+        """
+        with media_lock:
+            return self._reclaim(dry_run)
+
+    def _reclaim(self, dry_run: bool) -> Dict[str, Any]:
+        moved = freed = removed = 0
+        referenced = set()
+        planned = set()
+        for ref in get_media_references():
+            path = ref['file_path']
+            referenced.add(os.path.abspath(path))
+            if self.contains(path) or not ref['file_hash'] or not os.path.exists(path):
+                continue
+            target = self.path(ref['file_hash'])
+            referenced.add(os.path.abspath(target))
+            moved += 1
+            if dry_run:
+                # Only the first copy of each content would be kept
+                if target.exists() or ref['file_hash'] in planned:
+                    freed += os.path.getsize(path)
+                planned.add(ref['file_hash'])
+                continue
+            self.folder.mkdir(parents=True, exist_ok=True)
+            if target.exists():
+                relink_media(path, str(target))
+                freed += os.path.getsize(path)
+                os.remove(path)
+            else:
+                os.replace(path, target)
+                relink_media(path, str(target))
+
+        cutoff = time.time() - ORPHAN_GRACE_SECONDS
+        if self.folder.exists():
+            for item in self.folder.iterdir():
+                if item.is_file() and os.path.abspath(item) not in referenced and item.stat().st_mtime < cutoff:
+                    removed += 1
+                    freed += item.stat().st_size
+                    if not dry_run:
+                        item.unlink()
+
+        return {"dry_run": dry_run, "moved": moved, "orphans_removed": removed, "freed_bytes": freed}
+
+
+media_store = MediaStore(config.MEDIA_FOLDER)
@@ -0,0 +1,191 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Pipeline stages, in the order a job goes through them
+STAGES = ("queue", "extraction_wait", "extraction", "batch_wait", "inference_wait", "model", "inference", "persist", "cleanup")
+
+# Upper bounds (seconds) of the stage histograms: from a fast DB write to an hour-long inference
+SECONDS_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+# Inference seconds per second of audio
+RTF_BUCKETS = (0.02, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 5)
+
+
+class Histogram:
+    """Cumulative-bucket histogram, as exposed by Prometheus"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self._counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        """(upper bound, observations <= bound) pairs, ending with +Inf"""
+        result, total = [], 0
+        for bound, count in zip(self.buckets + (float("inf"),), self._counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class JobTimings:
+    """
+    Wall time spent by one job in each pipeline stage, from its submission.
+    A stage entered several times (e.g. retries) accumulates.
+    """
+
+    def __init__(self):
+        self.submitted = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.audio_seconds: Optional[float] = None
+
+    def record(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def since_submitted(self) -> float:
+        return time.perf_counter() - self.submitted
+
+    def realtime_factor(self) -> Optional[float]:
+        if not self.audio_seconds or "inference" not in self.stages:
+            return None
+        return self.stages["inference"] / self.audio_seconds
+
+    def as_dict(self) -> Dict[str, Any]:
+        rtf = self.realtime_factor()
+        return {
+            "stages": {name: round(self.stages[name], 3) for name in STAGES if name in self.stages},
+            "total_seconds": round(self.since_submitted(), 3),
+            "audio_seconds": round(self.audio_seconds, 2) if self.audio_seconds is not None else None,
+            "realtime_factor": round(rtf, 4) if rtf is not None else None,
+        }
+
+    def summary(self) -> str:
+        parts = [f"{name} {self.stages[name]:.2f}s" for name in STAGES if name in self.stages]
+        rtf = self.realtime_factor()
+        if rtf is not None:
+            parts.append(f"RTF {rtf:.3f}")
+        return ", ".join(parts)
+
+
+class PipelineMetrics:
+    """
+    Aggregates the stage timings of finished jobs into histograms, per stage
+    and outcome, since the server started. The per-job figures are stored
+    with each project.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages: Dict[str, Histogram] = {}
+        self._totals: Dict[str, Histogram] = {}
+        self._rtf = Histogram(RTF_BUCKETS)
+        self.audio_seconds_total = 0.0
+
+    def observe(self, timings: JobTimings, status: str) -> None:
+        with self._lock:
+            for name, seconds in timings.stages.items():
+                self._stages.setdefault(name, Histogram(SECONDS_BUCKETS)).observe(seconds)
+            self._totals.setdefault(status, Histogram(SECONDS_BUCKETS)).observe(timings.since_submitted())
+            rtf = timings.realtime_factor()
+            if status == "completed" and rtf is not None:
+                self._rtf.observe(rtf)
+                self.audio_seconds_total += timings.audio_seconds
+
+    def histograms(self) -> Dict[str, Any]:
+        """Copies of the histograms, safe to read while jobs keep finishing"""
+        with self._lock:
+            return {
+                "stages": {name: _copy(h) for name, h in self._stages.items()},
+                "jobs": {status: _copy(h) for status, h in self._totals.items()},
+                "realtime_factor": _copy(self._rtf),
+                "audio_seconds_total": self.audio_seconds_total,
+            }
+
+    def stats(self) -> Dict[str, Any]:
+        histograms = self.histograms()
+        return {
+            "jobs": {status: h.count for status, h in histograms["jobs"].items()},
+            "stages": {
+                name: {"count": h.count, "avg_seconds": round(h.sum / h.count, 3)}
+                for name, h in histograms["stages"].items()
+            },
+            "audio_seconds_total": round(histograms["audio_seconds_total"], 1),
+        }
+
+
+def _copy(histogram: Histogram) -> Histogram:
+    clone = Histogram(histogram.buckets)
+    clone._counts = list(histogram._counts)
+    clone.sum, clone.count = histogram.sum, histogram.count
+    return clone
+
+
+def _labels(labels: Optional[Dict[str, Any]]) -> str:
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in labels.values())
+    return "{" + ",".join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class PrometheusText:
+    """Builds a response in the Prometheus text exposition format (version 0.0.4)"""
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self, namespace: str = "whisper"):
+        self.namespace = namespace
+        self._lines: List[str] = []
+        self._declared = set()
+
+    def _declare(self, name: str, kind: str, help_text: str) -> str:
+        name = f"{self.namespace}_{name}"
+        if name not in self._declared:
+            self._declared.add(name)
+            self._lines.append(f"# HELP {name} {help_text}")
+            self._lines.append(f"# TYPE {name} {kind}")
+        return name
+
+    def gauge(self, name: str, help_text: str, value: Optional[float], labels: Optional[Dict[str, Any]] = None) -> None:
+        name = self._declare(name, "gauge", help_text)
+        if value is not None:
+            self._lines.append(f"{name}{_labels(labels)} {_number(value)}")
+
+    def counter(self, name: str, help_text: str, value: float, labels: Optional[Dict[str, Any]] = None) -> None:
+        name = self._declare(f"{name}_total", "counter", help_text)
+        self._lines.append(f"{name}{_labels(labels)} {_number(value)}")
+
+    def histogram(self, name: str, help_text: str, histogram: Histogram, labels: Optional[Dict[str, Any]] = None) -> None:
+        name = self._declare(name, "histogram", help_text)
+        labels = labels or {}
+        for bound, count in histogram.cumulative():
+            self._lines.append(f"{name}_bucket{_labels({**labels, 'le': _number(bound)})} {count}")
+        self._lines.append(f"{name}_sum{_labels(labels)} {_number(float(histogram.sum))}")
+        self._lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+
+    def render(self) -> str:
+        return "\n".join(self._lines) + "\n"
+
+
+pipeline_metrics = PipelineMetrics()
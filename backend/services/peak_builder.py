@@ -0,0 +1,74 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Optional
+from audio.peaks import compute_peaks, write_peaks
+from audio.processor import decode_audio
+
+logger = logging.getLogger(__name__)
+
+
+class PeakBuilder:
+    """
+    Builds the waveform peaks of projects transcribed before peaks existed.
+    Decoding an hour-long recording takes a while, so it runs in the
+    background, one project at a time and at most once per project however
+    many requests ask for it; requests poll until the file is there.
+    """
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="peaks")
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._errors: Dict[str, str] = {}
+        # Bumped when a project's media changes: a build of the old media is discarded
+        self._generations: Dict[str, int] = {}
+        self.built = 0
+        self.failed = 0
+
+    def schedule(self, project_id: str, peaks_path: Path, media_path: str, normalize: bool = False) -> bool:
+        """Queues the build unless one is already queued or running for the project"""
+        with self._lock:
+            if project_id in self._pending:
+                return False
+            self._pending.add(project_id)
+            generation = self._generations.get(project_id, 0)
+        self._executor.submit(self._build, project_id, Path(peaks_path), media_path, normalize, generation)
+        return True
+
+    def pop_error(self, project_id: str) -> Optional[str]:
+        """The error of the last failed build, reported once: the next request retries"""
+        with self._lock:
+            return self._errors.pop(project_id, None)
+
+    def invalidate(self, project_id: str, peaks_path: Path) -> None:
+        """Drops the peaks of a project whose media was replaced, including a build in progress"""
+        with self._lock:
+            self._generations[project_id] = self._generations.get(project_id, 0) + 1
+            self._errors.pop(project_id, None)
+            Path(peaks_path).unlink(missing_ok=True)
+
+    def _build(self, project_id: str, peaks_path: Path, media_path: str, normalize: bool, generation: int) -> None:
+        try:
+            levels = compute_peaks(decode_audio(media_path, normalize=normalize))
+            with self._lock:
+                if self._generations.get(project_id, 0) == generation:
+                    write_peaks(peaks_path, levels)
+            self.built += 1
+        except Exception as e:
+            logger.warning("Waveform peaks of %s failed: %s", project_id, e)
+            self.failed += 1
+            with self._lock:
+                self._errors[project_id] = str(e)
+        finally:
+            with self._lock:
+                self._pending.discard(project_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = len(self._pending)
+        return {"pending": pending, "built": self.built, "failed": self.failed}
+
+
+peak_builder = PeakBuilder()
@@ -0,0 +1,116 @@
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from config import config
+from audio.processor import generate_preview_pair
+
+logger = logging.getLogger(__name__)
+
+
+class PreviewCache:
+    """
+    Normalization previews (raw and dynaudnorm) keyed by media hash. Both
+    variants are produced together, so toggling between them is free, and
+    files unused for `ttl_seconds` are removed by a periodic cleanup.
+    """
+
+    def __init__(self, folder: Path, seconds: int, ttl_seconds: float, cleanup_interval: float = 3600):
+        self.folder = Path(folder)
+        self.seconds = seconds
+        self.ttl_seconds = ttl_seconds
+        self.cleanup_interval = cleanup_interval
+        # Per-hash lock and the number of requests holding or waiting on it
+        self._locks: Dict[str, List] = {}
+        self._lock = threading.Lock()
+        self._cleaner = None
+
+    def path(self, file_hash: str, normalize: bool) -> Path:
+        return self.folder / f"{file_hash}_{'norm' if normalize else 'raw'}.wav"
+
+    def get(self, file_hash: str, normalize: bool) -> Optional[Path]:
+        path = self.path(file_hash, normalize)
+        if not path.exists():
+            return None
+        # Recently used previews survive the cleanup
+        os.utime(path)
+        return path
+
+    def get_or_create(self, file_hash: str, normalize: bool, media_path: Callable[[], Optional[str]]) -> Optional[Path]:
+        """
+        Returns the cached preview, generating both variants if needed from the
+        file returned by `media_path` (called only on a miss). None if no source.
+        """
+        cached = self.get(file_hash, normalize)
+        if cached:
+            return cached
+        with self._lock:
+            entry = self._locks.setdefault(file_hash, [threading.Lock(), 0])
+            entry[1] += 1
+        # Concurrent requests for the same media wait for a single ffmpeg run
+        try:
+            with entry[0]:
+                cached = self.get(file_hash, normalize)
+                if cached:
+                    return cached
+                source = media_path()
+                if not source:
+                    return None
+                self.folder.mkdir(parents=True, exist_ok=True)
+                raw, norm = self.path(file_hash, False), self.path(file_hash, True)
+                raw_tmp, norm_tmp = raw.with_suffix(".tmp.wav"), norm.with_suffix(".tmp.wav")
+                try:
+                    generate_preview_pair(source, str(raw_tmp), str(norm_tmp), seconds=self.seconds)
+                    os.replace(raw_tmp, raw)
+                    os.replace(norm_tmp, norm)
+                finally:
+                    for tmp in (raw_tmp, norm_tmp):
+                        if tmp.exists():
+                            tmp.unlink()
+        finally:
+            # The last request out drops the entry, also after a failure or an
+            # early return; earlier ones leave it to those still waiting on it
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._locks[file_hash]
+        return self.path(file_hash, normalize)
+
+    def cleanup(self, now: Optional[float] = None) -> int:
+        """Deletes previews not used within the TTL; returns how many were removed"""
+        now = now or time.time()
+        removed = 0
+        if not self.folder.exists():
+            return 0
+        for item in self.folder.iterdir():
+            try:
+                if now - item.stat().st_mtime > self.ttl_seconds:
+                    item.unlink()
+                    removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def start_cleanup(self) -> None:
+        """Starts the periodic cleanup thread (once)"""
+        with self._lock:
+            if self._cleaner is not None and self._cleaner.is_alive():
+                return
+            self._cleaner = threading.Thread(target=self._cleanup_loop, name="preview-cleanup")
+            self._cleaner.daemon = True
+            self._cleaner.start()
+
+    def _cleanup_loop(self) -> None:
+        while True:
+            try:
+                removed = self.cleanup()
+                if removed:
+                    logger.info("Preview cleanup: removed %d expired files.", removed)
+            except Exception as e:
+                logger.warning("Preview cleanup failed: %s", e)
+            time.sleep(self.cleanup_interval)
+
+
+preview_cache = PreviewCache(config.PREVIEW_FOLDER, config.PREVIEW_SECONDS, config.PREVIEW_TTL_HOURS * 3600)
@@ -0,0 +1,99 @@
+import logging
+import heapq
+import itertools
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class JobScheduler:
+    """
+    Bounded pool of worker threads fed by a priority queue.
+
+    Jobs with a higher priority run first; jobs with the same priority run in
+    FIFO order. Workers are started lazily on the first submission so that
+    importing the service does not spawn threads.
+    """
+
+    def __init__(self, handler: Callable[..., None], worker_count: int = 1):
+        self.worker_count = max(1, worker_count)
+        self._handler = handler
+        self._queue: List[Tuple[int, int, str, tuple]] = []
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+        self._running: set = set()
+        self._workers: List[threading.Thread] = []
+        # 1-based position of each waiting job, rebuilt on the first query after the queue changes
+        self._ranks: Optional[Dict[str, int]] = None
+
+    def submit(self, job_id: str, args: tuple = (), priority: int = 0) -> int:
+        """Enqueues a job and returns its 1-based position in the waiting queue."""
+        with self._cond:
+            heapq.heappush(self._queue, (-priority, next(self._sequence), job_id, args))
+            self._ranks = None
+            self._ensure_workers()
+            self._cond.notify()
+            return self._position_locked(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """Removes a job that is still waiting. Running jobs are not interrupted."""
+        with self._cond:
+            for i, entry in enumerate(self._queue):
+                if entry[2] == job_id:
+                    self._queue.pop(i)
+                    heapq.heapify(self._queue)
+                    self._ranks = None
+                    return True
+            return False
+
+    def position(self, job_id: str) -> Optional[int]:
+        """1-based position of a waiting job, or None if it is not waiting."""
+        with self._cond:
+            return self._position_locked(job_id)
+
+    def queued_count(self) -> int:
+        with self._cond:
+            return len(self._queue)
+
+    def running_count(self) -> int:
+        with self._cond:
+            return len(self._running)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "workers": self.worker_count,
+                "queued": len(self._queue),
+                "running": len(self._running),
+            }
+
+    def _position_locked(self, job_id: str) -> Optional[int]:
+        # Status polls far outnumber queue changes: sort once per change, not per query
+        if self._ranks is None:
+            self._ranks = {entry[2]: i + 1 for i, entry in enumerate(sorted(self._queue))}
+        return self._ranks.get(job_id)
+
+    def _ensure_workers(self) -> None:
+        self._workers = [w for w in self._workers if w.is_alive()]
+        while len(self._workers) < self.worker_count:
+            worker = threading.Thread(target=self._worker_loop, name=f"transcription-worker-{len(self._workers)}")
+            worker.daemon = True
+            worker.start()
+            self._workers.append(worker)
+
+    def _worker_loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                _, _, job_id, args = heapq.heappop(self._queue)
+                self._ranks = None
+                self._running.add(job_id)
+            try:
+                self._handler(job_id, *args)
+            except Exception:
+                logger.exception("Unhandled error in scheduled job %s", job_id)
+            finally:
+                with self._cond:
+                    self._running.discard(job_id)
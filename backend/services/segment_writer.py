@@ -0,0 +1,55 @@
+import time
+from typing import Any, Dict, List, Tuple
+from database import append_segments, save_segments, get_segments
+
+
+class SegmentWriter:
+    """
+    Persists segments while they are produced: new segments are buffered and
+    appended to the `segments` table in small committed batches, so a crash
+    late in a long transcription keeps everything written so far.
+    """
+
+    def __init__(self, project_id: str, batch_size: int = 20, flush_interval: float = 2.0):
+        self.project_id = project_id
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.count = 0
+        self._buffer: List[Dict[str, Any]] = []
+        self._last_flush = time.monotonic()
+
+    def reset(self) -> None:
+        """Drops segments left over from a previous run of the same project."""
+        save_segments(self.project_id, [])
+        self._buffer = []
+        self.count = 0
+
+    def add(self, segments: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Buffers new segments; returns the rows stored if this triggered a flush."""
+        self._buffer.extend(segments)
+        self.count += len(segments)
+        if len(self._buffer) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            return self.flush()
+        return []
+
+    def flush(self) -> List[Dict[str, Any]]:
+        stored = []
+        if self._buffer:
+            stored = append_segments(self.project_id, self._buffer)
+            self._buffer = []
+        self._last_flush = time.monotonic()
+        return stored
+
+    def finish(self, segments: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Writes the final result. When it matches what was streamed only the
+        buffered tail is flushed; otherwise (nothing streamed, or the engine
+        post-processed the list) the project's segments are replaced.
+        Returns the newly stored rows and whether the segments were replaced.
+        """
+        if self.count == len(segments):
+            return self.flush(), False
+        self._buffer = []
+        save_segments(self.project_id, segments)
+        self.count = len(segments)
+        return get_segments(self.project_id), True
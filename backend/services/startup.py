@@ -0,0 +1,39 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimings:
+    """
+    Durations of the startup phases (imports, database, blueprints, model
+    warm-up), logged as they complete and kept for the system status, so a
+    slow import or migration shows up at a glance.
+    """
+
+    def __init__(self):
+        self._phases: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self._phases[name] = round(seconds, 3)
+        logger.info("Startup: %s took %.0f ms", name, seconds * 1000)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._phases)
+
+
+startup_timings = StartupTimings()
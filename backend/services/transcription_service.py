@@ -1,75 +1,245 @@
+import logging
+import hashlib
+import json
+import os
 import threading
+import time
 import uuid
+import wave
+from contextlib import contextmanager
 from typing import Dict, Any, List, Optional
 from config import config
-from models.whisper_wrapper import WhisperInference
-from audio.processor import prepare_audio
-from database import update_project_status, save_segments, get_project, get_segments, update_project_metadata
-from gpu.cuda_check import get_gpu_info
+from models.whisper_wrapper import WhisperInference, ENGINE_VERSION
+from models.chunked import transcribe_parallel, SAMPLE_RATE
+from audio.processor import prepare_audio, decode_audio, RssSampler
+from audio.peaks import compute_peaks, compute_peaks_from_wav, write_peaks
+from database import update_project_status, save_segments, get_project, get_segments, update_project_metadata, get_cached_result, store_cached_result, update_project_timings
+from services.scheduler import JobScheduler
+from services.engine_pool import EnginePool
+from services.batcher import ShortClipBatcher
+from services.segment_writer import SegmentWriter
+from services.events import JobEventBus
+from services.compute_profiles import compute_profiles, calibration_clip, time_transcription
+from services.startup import startup_timings
+from services.metrics import JobTimings, pipeline_metrics
+
+logger = logging.getLogger(__name__)
 
 class TranscriptionService:
     def __init__(self):
         self.jobs: Dict[str, Dict[str, Any]] = {}
-        self.engine: Optional[WhisperInference] = None
-        self._lock = threading.Lock()
-
-    def get_engine(self, model_name: str = "medium") -> WhisperInference:
-        with self._lock:
-            if self.engine is None or self.engine.model_name != model_name:
-                gpu_info = get_gpu_info()
-                device = "cuda" if gpu_info['available'] else "cpu"
-                self.engine = WhisperInference(model_name=model_name, device=device)
-            return self.engine
-
-    def start_job(self, job_id: str, file_path: str, model: str, language: str, diarization: bool = False, normalized: bool = False) -> None:
-        self.jobs[job_id] = {"status": "queued", "progress": 0.0, "logs": [f"Job {job_id} queued for processing."]}
-        thread = threading.Thread(
-            target=self._process_task, 
-            args=(job_id, file_path, model, language, diarization, normalized)
+        self.events = JobEventBus()
+        self.engine_pool = EnginePool(
+            self._load_engine,
+            memory_budget_mb=config.ENGINE_POOL_MEMORY_MB,
+            num_workers=config.ENGINE_NUM_WORKERS
+        )
+        self.scheduler = JobScheduler(self._process_task, worker_count=config.MAX_CONCURRENT_JOBS)
+        # Stage caps: a running job still waits here before ffmpeg or inference
+        self.extraction_slots = threading.BoundedSemaphore(config.MAX_CONCURRENT_EXTRACTIONS)
+        self.inference_slots = threading.BoundedSemaphore(config.MAX_CONCURRENT_INFERENCES)
+        self.batcher = ShortClipBatcher(
+            self._run_batch,
+            window_seconds=config.BATCH_WINDOW_MS / 1000,
+            max_batch_size=config.BATCH_MAX_SIZE
         )
+        self.warmup: Optional[Dict[str, Any]] = None
+        # Stage timings of the jobs not finished yet
+        self.timings: Dict[str, JobTimings] = {}
+
+    @staticmethod
+    def _load_engine(model_name: str, device: str, compute_type: str, log_callback=None, num_workers: int = 1, cpu_threads: int = 0) -> WhisperInference:
+        return WhisperInference(
+            model_name=model_name,
+            device=device,
+            compute_type=compute_type,
+            log_callback=log_callback,
+            num_workers=num_workers,
+            cpu_threads=cpu_threads
+        )
+
+    def start_warmup(self, models: List[str]) -> bool:
+        """Loads `models` into the engine pool in a background thread (once)."""
+        if not models or self.warmup is not None:
+            return False
+        self.warmup = {"models": list(models), "loaded": [], "failed": [], "done": False}
+        thread = threading.Thread(target=self._warm_up, args=(list(models),), name="model-warmup")
         thread.daemon = True
         thread.start()
+        return True
+
+    def _warm_up(self, models: List[str]) -> None:
+        for model in models:
+            start = time.perf_counter()
+            try:
+                with self.inference_slots, self.get_engine(model) as engine:
+                    # A first short inference also initialises the device kernels and allocator
+                    time_transcription(engine, calibration_clip(2))
+            except Exception as e:
+                logger.warning("Warm-up of %s failed: %s", model, e)
+                self.warmup["failed"].append(model)
+                continue
+            startup_timings.record(f"warmup {model}", time.perf_counter() - start)
+            self.warmup["loaded"].append(model)
+        self.warmup["done"] = True
+
+    def get_engine(self, model_name: str = "medium", log_callback=None):
+        """Context manager yielding a pooled engine for `model_name`, loaded with its compute profile."""
+        profile = compute_profiles.get(model_name)
+        return self.engine_pool.acquire(
+            model_name, profile["device"], profile["compute_type"], log_callback=log_callback,
+            num_workers=profile["num_workers"], cpu_threads=profile["cpu_threads"]
+        )
+
+    def _transcribe(self, audio_input, model: str, language: str, progress_callback, log_callback, timings: JobTimings) -> Dict[str, Any]:
+        """
+        Runs inference, switching to parallel chunked mode for long in-memory
+        recordings on CPU. Engine acquisition (a load on a pool miss) and
+        inference are timed as separate stages.
+        """
+        language = None if language == 'auto' else language
+        profile = compute_profiles.get(model)
+        device, compute_type = profile["device"], profile["compute_type"]
+        is_long = not isinstance(audio_input, str) and len(audio_input) >= config.LONG_FILE_MIN_SECONDS * SAMPLE_RATE
+        if is_long and device == "cpu" and config.LONG_FILE_WORKERS > 1:
+            # Each chunk worker loads its own model copy: their memory is reserved in the
+            # engine pool, with fewer workers if the budget cannot hold them all
+            with self.engine_pool.reserve(model, compute_type, config.LONG_FILE_WORKERS) as workers, timings.stage("inference"):
+                if workers < config.LONG_FILE_WORKERS:
+                    log_callback(f"Memory budget allows {workers} of {config.LONG_FILE_WORKERS} long-file workers.")
+                return transcribe_parallel(
+                    audio_input,
+                    model,
+                    device,
+                    compute_type,
+                    str(config.MODELS_DIR),
+                    language=language,
+                    workers=workers,
+                    cpu_threads=max(1, (os.cpu_count() or 1) // workers),
+                    chunk_seconds=config.LONG_FILE_CHUNK_SECONDS,
+                    progress_callback=progress_callback,
+                    log_callback=log_callback
+                )
+
+        start = time.perf_counter()
+        with self.get_engine(model, log_callback) as engine:
+            timings.record("model", time.perf_counter() - start)
+            with timings.stage("inference"):
+                return engine.transcribe(
+                    audio_input,
+                    language=language,
+                    progress_callback=progress_callback,
+                    log_callback=log_callback
+                )
+
+    def start_job(self, job_id: str, file_path: str, model: str, language: str, diarization: bool = False, normalized: bool = False, priority: int = 0, file_hash: Optional[str] = None, use_cache: bool = True) -> str:
+        """Queues a job, or completes it immediately from the result cache. Returns the job status."""
+        self.jobs[job_id] = {"status": "queued", "progress": 0.0, "logs": [f"Job {job_id} queued for processing."]}
+        use_cache = use_cache and config.RESULT_CACHE_ENABLED and bool(file_hash)
+        if use_cache and self._complete_from_cache(job_id, file_hash, model, language, normalized):
+            return "completed"
+
+        self.timings[job_id] = JobTimings()
+        position = self.scheduler.submit(
+            job_id,
+            (file_path, model, language, diarization, normalized, file_hash if use_cache else None),
+            priority=priority
+        )
+        self._append_log(job_id, f"Queue position: {position}.")
+        return "queued"
+
+    def cancel_job(self, job_id: str) -> bool:
+        """
+        Withdraws a job still waiting for a worker, e.g. because its project is
+        being deleted. A running job is not interrupted. Open event streams are
+        told the job ended.
+        """
+        if not self.scheduler.cancel(job_id):
+            return False
+        self.timings.pop(job_id, None)
+        self.jobs.pop(job_id, None)
+        self.events.publish(job_id, "status", {"status": "failed", "progress": 0.0, "error": "Job cancelled", "segments_count": 0})
+        return True
+
+    @staticmethod
+    def result_cache_key(file_hash: str, model: str, language: str, normalized: bool) -> str:
+        raw = "|".join([file_hash, model, language or "auto", "1" if normalized else "0", ENGINE_VERSION])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _complete_from_cache(self, job_id: str, file_hash: str, model: str, language: str, normalized: bool) -> bool:
+        cached = get_cached_result(self.result_cache_key(file_hash, model, language, normalized))
+        if not cached:
+            return False
+        save_segments(job_id, cached['segments'])
+        update_project_metadata(job_id, cached['detected_language'], cached['language_probability'], cached['full_text'])
+        self._append_log(job_id, f"Identical media already transcribed with the same settings: reused {len(cached['segments'])} cached segments.")
+        self._update_status(job_id, "completed", 1.0)
+        return True
 
     def _append_log(self, job_id: str, message: str) -> None:
         if job_id in self.jobs:
             if "logs" not in self.jobs[job_id]:
                 self.jobs[job_id]["logs"] = []
             self.jobs[job_id]["logs"].append(message)
+            self.events.publish(job_id, "log", {"message": message})
             # Keep only the last 10 logs to avoid unbounded growth
             if len(self.jobs[job_id]["logs"]) > 10:
                 self.jobs[job_id]["logs"] = self.jobs[job_id]["logs"][-10:]
 
-    def _process_task(self, job_id: str, file_path: str, model: str, language: str, diarization: bool = False, normalized: bool = False) -> None:
+    def _process_task(self, job_id: str, file_path: str, model: str, language: str, diarization: bool = False, normalized: bool = False, file_hash: Optional[str] = None) -> None:
+        wav_path = config.UPLOAD_FOLDER / f"{job_id}.wav"
+        writer = SegmentWriter(job_id)
+        timings = self.timings.setdefault(job_id, JobTimings())
+        timings.record("queue", timings.since_submitted())
         try:
             self._update_status(job_id, "running", 0.1)
             self._append_log(job_id, f"Job {job_id} started processing.")
+            writer.reset()
             
             # 1. Audio Processing
             self._append_log(job_id, f"Extracting audio from input file (normalized={normalized})...")
-            wav_path = config.UPLOAD_FOLDER / f"{job_id}.wav"
-            prepare_audio(file_path, str(wav_path), normalize=normalized)
-            self._append_log(job_id, f"Audio extraction completed.")
+            with self._stage_slot(self.extraction_slots, timings, "extraction_wait"), timings.stage("extraction"):
+                audio_input = self._extract_audio(job_id, file_path, wav_path, normalized)
+            timings.audio_seconds = self._audio_seconds(audio_input)
             self._update_status(job_id, "running", 0.3)
             
-            # 2. Whisper Inference
-            engine = self.get_engine(model)
-            engine.log_callback = lambda msg: self._append_log(job_id, msg)
+            # Short clips are transcribed together with other running clips; this
+            # worker waits for (or runs) the batch, so the job keeps its slot
+            if self._is_batchable(audio_input):
+                self._append_log(job_id, "Short clip: waiting to be batched with other clips...")
+                self.batcher.submit(model, {
+                    "job_id": job_id, "audio": audio_input, "language": language,
+                    "normalized": normalized, "file_hash": file_hash, "wav_path": wav_path,
+                    "writer": writer, "timings": timings, "batched_at": time.perf_counter()
+                })
+                return
             
-            def on_progress(progress_val, current_segments):
-                self._update_status(job_id, "running", progress_val, segments=current_segments)
-                # Note: To also send segments in real-time, _update_status would need to support them
-                # But currently `update_project_status` only updates status & progress in DB.
-                # The segments are fetched from a separate file/DB typically.
+            # 2. Whisper Inference
+            self._transcribe_job(job_id, audio_input, model, language, normalized, file_hash, wav_path, writer, timings)
                 
-            result = engine.transcribe(
-                str(wav_path), 
-                language=None if language == 'auto' else language,
-                progress_callback=on_progress,
-                log_callback=lambda msg: self._append_log(job_id, msg)
-            )
-            segments = result.get('segments', [])
-            self._append_log(job_id, f"Transcription completed. {len(segments)} segments generated.")
+        except Exception as e:
+            writer.flush()
+            self._fail_job(job_id, e)
+
+    def _transcribe_job(self, job_id: str, audio_input, model: str, language: str, normalized: bool, file_hash: Optional[str],
+                        wav_path, writer: SegmentWriter, timings: JobTimings) -> None:
+        """Full-quality inference of one job (VAD, temperature fallback, streamed segments), then persistence."""
+        def on_progress(progress_val, new_segments):
+            # Segments go straight to SQLite in small batches; the status API
+            # reads them back from there with a cursor
+            stored = writer.add(new_segments)
+            self._update_status(job_id, "running", progress_val, segments_count=writer.count, new_segments=stored)
             
+        log_callback = lambda msg: self._append_log(job_id, msg)
+        with self._stage_slot(self.inference_slots, timings, "inference_wait"):
+            result = self._transcribe(audio_input, model, language, on_progress, log_callback, timings)
+        self._finalize_job(job_id, result, model, language, normalized, file_hash, wav_path, writer, timings)
+
+    def _finalize_job(self, job_id: str, result: Dict[str, Any], model: str, language: str, normalized: bool, file_hash: Optional[str], wav_path, writer: SegmentWriter, timings: JobTimings) -> None:
+        segments = result.get('segments', [])
+        self._append_log(job_id, f"Transcription completed. {len(segments)} segments generated.")
+        
+        with timings.stage("persist"):
             # Save Metadata
             update_project_metadata(
                 job_id, 
@@ -80,28 +250,185 @@ class TranscriptionService:
             
             self._update_status(job_id, "running", 0.9)
             
-            # 3. Save Results
-            save_segments(job_id, segments)
-            self._update_status(job_id, "completed", 1.0)
-            
-            # Cleanup
+            # 3. Save Results (only what was not already streamed to the DB)
+            stored, replaced = writer.finish(segments)
+            self._update_status(job_id, "completed", 1.0, segments_count=writer.count, new_segments=stored, replace_segments=replaced)
+            if file_hash:
+                store_cached_result(
+                    self.result_cache_key(file_hash, model, language, normalized),
+                    file_hash, model, language, normalized, ENGINE_VERSION,
+                    result.get('language'), result.get('language_probability'), result.get('text'),
+                    segments, max_bytes=config.RESULT_CACHE_MAX_MB * 1024 * 1024
+                )
+        
+        # Cleanup
+        with timings.stage("cleanup"):
             if wav_path.exists():
                 wav_path.unlink()
                 self._append_log(job_id, "Temporary audio file isolated and cleaned.")
-                
+        self._record_timings(job_id, "completed")
+
+    def _record_timings(self, job_id: str, status: str) -> None:
+        """Stores the stage timings of a finished job with its project and adds them to the histograms"""
+        timings = self.timings.pop(job_id, None)
+        if timings is None:
+            return
+        pipeline_metrics.observe(timings, status)
+        data = timings.as_dict()
+        if job_id in self.jobs:
+            self.jobs[job_id]["stage_timings"] = data
+        self._append_log(job_id, f"Stage timings: {timings.summary()} (total {data['total_seconds']:.2f}s).")
+        # One JSON record per job: the fields are also attached to the record for structured handlers
+        logger.info("Stage timings of job %s (%s): %s", job_id, status, json.dumps(data, sort_keys=True),
+                    extra={"job_id": job_id, "job_status": status, "stage_timings": data})
+        try:
+            update_project_timings(job_id, data)
+        except Exception as e:
+            # The job itself succeeded or failed already: only the report is lost
+            logger.warning("Stage timings of job %s not stored: %s", job_id, e)
+
+    @staticmethod
+    @contextmanager
+    def _stage_slot(slots: threading.BoundedSemaphore, timings: JobTimings, wait_stage: str):
+        """Holds one of the stage `slots`, the time spent waiting for it being recorded as `wait_stage`"""
+        with timings.stage(wait_stage):
+            slots.acquire()
+        try:
+            yield
+        finally:
+            slots.release()
+
+    @staticmethod
+    def _audio_seconds(audio_input) -> Optional[float]:
+        if not isinstance(audio_input, str):
+            return len(audio_input) / SAMPLE_RATE
+        try:
+            with wave.open(audio_input, "rb") as wav:
+                return wav.getnframes() / wav.getframerate()
+        except (OSError, wave.Error):
+            return None
+
+    def _fail_job(self, job_id: str, error: Exception) -> None:
+        logger.error("Error in job %s: %s", job_id, error)
+        self._append_log(job_id, f"ERROR: {str(error)}")
+        self._update_status(job_id, "failed", 0.0, str(error))
+        self._record_timings(job_id, "failed")
+
+    def _is_batchable(self, audio_input) -> bool:
+        # Clips are batched across running jobs: a single worker has nothing to batch with
+        return (
+            self.batcher.enabled
+            and self.scheduler.worker_count > 1
+            and not isinstance(audio_input, str)
+            and len(audio_input) <= config.BATCH_MAX_CLIP_SECONDS * SAMPLE_RATE
+        )
+
+    def _run_batch(self, model: str, items: List[Dict[str, Any]]) -> None:
+        """
+        Transcribes a batch of short clips with one engine call, then persists
+        each project. It runs on the worker of the batch's first clip while the
+        workers of the other clips wait. A clip left alone in its window gains
+        nothing from batching, which skips VAD and temperature fallback: it is
+        transcribed like any other job.
+        """
+        dispatched = time.perf_counter()
+        if len(items) == 1:
+            item = items[0]
+            item["timings"].record("batch_wait", dispatched - item["batched_at"])
+            try:
+                self._transcribe_job(item["job_id"], item["audio"], model, item["language"], item["normalized"],
+                                     item["file_hash"], item["wav_path"], item["writer"], item["timings"])
+            except Exception as e:
+                item["writer"].flush()
+                self._fail_job(item["job_id"], e)
+            return
+
+        try:
+            with self.inference_slots:
+                acquiring = time.perf_counter()
+                with self.get_engine(model) as engine:
+                    start = time.perf_counter()
+                    results = engine.transcribe_batch(
+                        [item["audio"] for item in items],
+                        [None if item["language"] == 'auto' else item["language"] for item in items]
+                    )
+                    elapsed = time.perf_counter() - start
+        except Exception as e:
+            for item in items:
+                item["writer"].flush()
+                self._fail_job(item["job_id"], e)
+            return
+
+        audio_seconds = sum(len(item["audio"]) for item in items) / SAMPLE_RATE
+        self.batcher.record(len(items), audio_seconds, elapsed)
+        for item, result in zip(items, results):
+            job_id = item["job_id"]
+            timings = item["timings"]
+            timings.record("batch_wait", dispatched - item["batched_at"])
+            timings.record("inference_wait", acquiring - dispatched)
+            timings.record("model", start - acquiring)
+            # The batch is one engine call: each clip is charged its share of the audio
+            timings.record("inference", elapsed * len(item["audio"]) / SAMPLE_RATE / max(audio_seconds, 1e-6))
+            self._append_log(job_id, f"Batched inference: {len(items)} clips in {elapsed:.2f}s ({len(items) / max(elapsed, 1e-6):.1f} clips/s).")
+            try:
+                self._finalize_job(job_id, result, model, item["language"], item["normalized"], item["file_hash"], item["wav_path"], item["writer"], timings)
+            except Exception as e:
+                self._fail_job(job_id, e)
+
+    def _extract_audio(self, job_id: str, file_path: str, wav_path, normalized: bool):
+        """
+        Returns the decoded samples (in-memory mode) or the path of a temporary
+        WAV. The temp-file path is used when configured or if decoding to memory fails.
+        """
+        start = time.perf_counter()
+        if config.AUDIO_DECODE_MODE == "memory":
+            try:
+                with RssSampler() as memory:
+                    audio = decode_audio(file_path, normalize=normalized)
+                self._append_log(job_id, f"Audio extraction completed in {time.perf_counter() - start:.2f}s (in-memory, {memory.summary()}).")
+                self._store_peaks(job_id, compute_peaks, audio)
+                return audio
+            except (RuntimeError, MemoryError) as e:
+                self._append_log(job_id, f"In-memory decoding failed ({e}), falling back to a temporary WAV file.")
+                start = time.perf_counter()
+
+        with RssSampler() as memory:
+            prepare_audio(file_path, str(wav_path), normalize=normalized)
+        self._append_log(job_id, f"Audio extraction completed in {time.perf_counter() - start:.2f}s (temp file, {memory.summary()}).")
+        self._store_peaks(job_id, compute_peaks_from_wav, wav_path)
+        return str(wav_path)
+
+    def _store_peaks(self, job_id: str, compute, source) -> None:
+        """Waveform peaks for the editor, computed from the audio already decoded for inference"""
+        try:
+            write_peaks(config.UPLOAD_FOLDER / f"{job_id}.peaks", compute(source))
         except Exception as e:
-            print(f"Error in job {job_id}: {str(e)}")
-            self._append_log(job_id, f"ERROR: {str(e)}")
-            self._update_status(job_id, "failed", 0.0, str(e))
+            # The editor can still compute them on demand
+            self._append_log(job_id, f"Waveform peaks not computed: {e}")
 
-    def _update_status(self, job_id: str, status: str, progress: float, error: Optional[str] = None, segments: Optional[List[Dict[str, Any]]] = None) -> None:
+    def _update_status(self, job_id: str, status: str, progress: float, error: Optional[str] = None, segments_count: Optional[int] = None,
+                       new_segments: Optional[List[Dict[str, Any]]] = None, replace_segments: bool = False) -> None:
         update_dict: Dict[str, Any] = {"status": status, "progress": progress, "error": error}
-        if segments is not None:
-            update_dict["segments"] = segments
+        if segments_count is not None:
+            update_dict["segments_count"] = segments_count
+        # Segments are published once they are stored, so they carry their database ids
+        if new_segments or replace_segments:
+            self.events.publish(job_id, "segments", {"segments": new_segments or [], "replace": replace_segments})
         self.jobs[job_id].update(update_dict)
         update_project_status(job_id, status, progress)
+        self.events.publish(job_id, "status", {
+            "status": status,
+            "progress": progress,
+            "error": error,
+            "segments_count": self.jobs[job_id].get("segments_count", 0)
+        })
 
     def get_job_status(self, job_id: str) -> Dict[str, Any]:
-        return self.jobs.get(job_id) or get_project(job_id)
+        job = self.jobs.get(job_id)
+        if job is None:
+            return get_project(job_id)
+        if job.get("status") == "queued":
+            return {**job, "queue_position": self.scheduler.position(job_id)}
+        return job
 
 transcription_service = TranscriptionService()
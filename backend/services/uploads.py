@@ -0,0 +1,227 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, Optional, Tuple
+from config import config
+
+READ_SIZE = 1024 * 1024
+
+
+def save_stream(stream: BinaryIO, path, hasher=None) -> Tuple[str, int]:
+    """
+    Writes `stream` to `path` while hashing it, so the file is never read
+    back. Returns the SHA-256 hex digest and the number of bytes written.
+    """
+    hasher = hasher or hashlib.sha256()
+    size = 0
+    with open(path, "wb") as f:
+        size = _copy(stream, f, hasher)
+    return hasher.hexdigest(), size
+
+
+def _copy(stream: BinaryIO, f: BinaryIO, hasher, limit: Optional[int] = None) -> int:
+    written = 0
+    while True:
+        chunk = stream.read(READ_SIZE)
+        if not chunk:
+            return written
+        if limit is not None and written + len(chunk) > limit:
+            raise UploadError("Chunk goes past the declared upload size", 413)
+        hasher.update(chunk)
+        f.write(chunk)
+        written += len(chunk)
+
+
+class UploadError(Exception):
+    def __init__(self, message: str, status: int = 400, offset: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+        self.offset = offset
+
+
+class ChunkedUploadStore:
+    """
+    Resumable uploads sent in chunks: each session has a partial file and a
+    small JSON sidecar in `folder`. A chunk is accepted only at the current
+    offset, so a client that lost its connection asks for the offset and
+    continues from there. The running SHA-256 is kept in memory and rebuilt
+    from the partial file after a restart. Sessions untouched for
+    `ttl_seconds` are removed.
+    """
+
+    def __init__(self, folder: Path, ttl_seconds: float):
+        self.folder = Path(folder)
+        self.ttl_seconds = ttl_seconds
+        self._hashers: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _data_path(self, upload_id: str) -> Path:
+        return self.folder / f"{upload_id}.part"
+
+    def _meta_path(self, upload_id: str) -> Path:
+        return self.folder / f"{upload_id}.json"
+
+    @contextmanager
+    def _upload_lock(self, upload_id: str) -> Iterator[None]:
+        """
+        Serializes the operations on one session. The entry of a session that
+        is gone once the lock is released (claimed, discarded, expired, or never
+        existing) is dropped, so the table only holds live sessions.
+        """
+        with self._lock:
+            lock = self._locks.setdefault(upload_id, threading.Lock())
+        try:
+            with lock:
+                yield
+        finally:
+            with self._lock:
+                if self._locks.get(upload_id) is lock and not self._meta_path(upload_id).exists():
+                    del self._locks[upload_id]
+
+    def _read_meta(self, upload_id: str) -> Dict[str, Any]:
+        try:
+            uuid.UUID(upload_id)
+            with open(self._meta_path(upload_id)) as f:
+                return json.load(f)
+        except (ValueError, OSError):
+            raise UploadError("Upload not found", 404)
+
+    def _write_meta(self, meta: Dict[str, Any]) -> None:
+        path = self._meta_path(meta["upload_id"])
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, path)
+
+    def create(self, filename: str, size: int, sha256: Optional[str] = None) -> Dict[str, Any]:
+        if size < 0:
+            raise UploadError("size must not be negative")
+        self.cleanup()
+        self.folder.mkdir(parents=True, exist_ok=True)
+        upload_id = str(uuid.uuid4())
+        meta = {
+            "upload_id": upload_id,
+            "filename": filename,
+            "size": size,
+            "sha256": sha256.lower() if sha256 else None,
+            "offset": 0,
+            "file_hash": None,
+            "created_at": time.time()
+        }
+        self._data_path(upload_id).touch()
+        self._write_meta(meta)
+        self._hashers[upload_id] = hashlib.sha256()
+        return self.status(upload_id)
+
+    def status(self, upload_id: str) -> Dict[str, Any]:
+        meta = self._read_meta(upload_id)
+        return {
+            "upload_id": upload_id,
+            "filename": meta["filename"],
+            "size": meta["size"],
+            "offset": meta["offset"],
+            "complete": meta["file_hash"] is not None,
+            "file_hash": meta["file_hash"]
+        }
+
+    def append(self, upload_id: str, offset: int, stream: BinaryIO) -> int:
+        """Appends a chunk written at `offset`; returns the new offset"""
+        with self._upload_lock(upload_id):
+            meta = self._read_meta(upload_id)
+            if meta["file_hash"] is not None:
+                raise UploadError("Upload already finalized", 409, meta["offset"])
+            if offset != meta["offset"]:
+                raise UploadError("Offset mismatch", 409, meta["offset"])
+            hasher = self._hasher(upload_id, meta["offset"])
+            data_path = self._data_path(upload_id)
+            with open(data_path, "r+b") as f:
+                # Drops bytes of a chunk interrupted before its offset was recorded
+                f.truncate(offset)
+                f.seek(offset)
+                try:
+                    written = _copy(stream, f, hasher, limit=meta["size"] - offset)
+                except Exception:
+                    # The hash now covers a partial chunk: rebuilt on the next append
+                    self._hashers.pop(upload_id, None)
+                    raise
+            meta["offset"] = offset + written
+            self._write_meta(meta)
+            return meta["offset"]
+
+    def _hasher(self, upload_id: str, offset: int):
+        hasher = self._hashers.get(upload_id)
+        if hasher is None:
+            hasher = hashlib.sha256()
+            with open(self._data_path(upload_id), "rb") as f:
+                remaining = offset
+                while remaining:
+                    chunk = f.read(min(READ_SIZE, remaining))
+                    if not chunk:
+                        break
+                    hasher.update(chunk)
+                    remaining -= len(chunk)
+            self._hashers[upload_id] = hasher
+        return hasher
+
+    def finalize(self, upload_id: str) -> Dict[str, Any]:
+        """Checks that every byte arrived and, if one was declared, the hash"""
+        with self._upload_lock(upload_id):
+            meta = self._read_meta(upload_id)
+            if meta["file_hash"] is None:
+                if meta["offset"] != meta["size"]:
+                    raise UploadError(f"Upload incomplete: {meta['offset']} of {meta['size']} bytes", 409, meta["offset"])
+                file_hash = self._hasher(upload_id, meta["offset"]).hexdigest()
+                if meta["sha256"] and meta["sha256"] != file_hash:
+                    self._discard(upload_id)
+                    raise UploadError("SHA-256 mismatch, upload discarded", 422)
+                meta["file_hash"] = file_hash
+                self._write_meta(meta)
+                self._hashers.pop(upload_id, None)
+        return self.status(upload_id)
+
+    def claim(self, upload_id: str, dest_path) -> Tuple[str, str]:
+        """Moves a finalized upload to `dest_path`; returns its filename and hash"""
+        with self._upload_lock(upload_id):
+            meta = self._read_meta(upload_id)
+            if meta["file_hash"] is None:
+                raise UploadError("Upload not finalized", 409, meta["offset"])
+            os.replace(self._data_path(upload_id), dest_path)
+            self._meta_path(upload_id).unlink()
+        return meta["filename"], meta["file_hash"]
+
+    def discard(self, upload_id: str) -> None:
+        with self._upload_lock(upload_id):
+            self._read_meta(upload_id)
+            self._discard(upload_id)
+
+    def _discard(self, upload_id: str) -> None:
+        self._hashers.pop(upload_id, None)
+        for path in (self._data_path(upload_id), self._meta_path(upload_id)):
+            if path.exists():
+                path.unlink()
+
+    def cleanup(self, now: Optional[float] = None) -> int:
+        """Removes sessions not written to within the TTL; returns how many"""
+        now = now or time.time()
+        removed = 0
+        if not self.folder.exists():
+            return 0
+        for meta_path in self.folder.glob("*.json"):
+            upload_id = meta_path.stem
+            try:
+                if now - os.path.getmtime(meta_path) > self.ttl_seconds:
+                    with self._upload_lock(upload_id):
+                        self._discard(upload_id)
+                    removed += 1
+            except OSError:
+                pass
+        return removed
+
+
+uploads = ChunkedUploadStore(config.UPLOAD_SESSION_FOLDER, config.UPLOAD_SESSION_TTL_HOURS * 3600)
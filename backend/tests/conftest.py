@@ -9,11 +9,16 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app import create_app
 import database
+from services.export_cache import export_cache
 
 @pytest.fixture
 def app():
     # Create a temporary file for the test database
     db_fd, db_path = tempfile.mkstemp()
+
+    # Overwrite the database path during testing, before create_app initializes it
+    original_db_path = database.DB_PATH
+    database.DB_PATH = db_path
     
     app = create_app()
     app.config.update({
@@ -21,16 +26,15 @@ def app():
         "UPLOAD_FOLDER": tempfile.mkdtemp()
     })
 
-    # Overwrite the database path during testing
-    original_db_path = database.DB_PATH
-    database.DB_PATH = db_path
-    
     # Initialize the empty test database
     database.init_db()
+    # Rendered exports are keyed by project id and revision, which repeat across test databases
+    export_cache.clear()
 
     yield app
 
     # Cleanup
+    database.close_db()
     os.close(db_fd)
     try:
         os.unlink(db_path)
@@ -1,4 +1,5 @@
 import json
+import database
 import pytest
 
 def test_system_status(client):
@@ -25,6 +26,39 @@ def test_list_projects_with_data(client, sample_project):
     assert len(data) == 1
     assert data[0]['id'] == sample_project
 
+def test_list_projects_pagination(client):
+    """Pages follow X-Next-Cursor, omit full_text by default, and filter by status"""
+    for i in range(5):
+        database.create_project(f"p{i}", f"{i}.mp3", f"/tmp/{i}.mp3", f"{i}.mp3", "tiny", "it")
+        database.update_project_metadata(f"p{i}", "it", 0.9, "long text")
+    database.update_project_status("p0", "completed")
+
+    first = client.get('/api/projects?limit=3')
+    page = json.loads(first.data)
+    assert len(page) == 3
+    assert 'full_text' not in page[0]
+    cursor = first.headers['X-Next-Cursor']
+
+    second = client.get(f'/api/projects?limit=3&cursor={cursor}&include=full_text')
+    rest = json.loads(second.data)
+    assert 'X-Next-Cursor' not in second.headers
+    assert rest[0]['full_text'] == "long text"
+    assert {p['id'] for p in page + rest} == {f"p{i}" for i in range(5)}
+
+    assert json.loads(client.get('/api/projects/count').data)['count'] == 5
+    assert json.loads(client.get('/api/projects/count?status=completed').data)['count'] == 1
+    assert client.get('/api/projects?cursor=garbage').status_code == 400
+
+def test_list_projects_date_range_is_inclusive(client):
+    """A date-only `to` keeps the projects created during that day"""
+    database.create_project("today", "a.mp3", "/tmp/a.mp3", "a.mp3", "tiny", "it")
+    created = database.get_project("today")["created_at"]
+    day = created[:10]
+
+    assert [p['id'] for p in json.loads(client.get(f'/api/projects?from={day}&to={day}').data)] == ["today"]
+    assert json.loads(client.get(f'/api/projects/count?to={created}').data)['count'] == 1
+    assert json.loads(client.get('/api/projects/count?to=2000-01-01').data)['count'] == 0
+
 def test_get_project_details(client, sample_project):
     """Verify the details of a specific project"""
     response = client.get(f'/api/projects/{sample_project}')
@@ -59,6 +93,42 @@ def test_update_segments(client, sample_project):
     assert len(data['segments']) == 2
     assert data['segments'][0]['text'] == "Test 1"
 
+def test_patch_segments(client, sample_project):
+    """Only the changed segments are written and the revision advances"""
+    project = json.loads(client.get(f'/api/projects/{sample_project}').data)
+    original = project['segments'][0]
+
+    response = client.patch(f'/api/projects/{sample_project}/segments', json={
+        "revision": project['revision'],
+        "ops": [
+            {"op": "update", "id": original['id'], "text": "Corrected"},
+            {"op": "insert", "client_id": "new-1", "segment": {"start": 5.0, "end": 6.0, "text": "Added"}}
+        ]
+    })
+    assert response.status_code == 200
+    result = json.loads(response.data)
+    assert result['revision'] == project['revision'] + 1
+
+    data = json.loads(client.get(f'/api/projects/{sample_project}').data)
+    assert [seg['text'] for seg in data['segments']] == ["Corrected", "Added"]
+    # Untouched segments keep their ids
+    assert data['segments'][0]['id'] == original['id']
+    assert data['segments'][1]['id'] == result['inserted']['new-1']
+
+def test_patch_segments_conflict(client, sample_project):
+    """A stale revision is rejected without applying anything"""
+    project = json.loads(client.get(f'/api/projects/{sample_project}').data)
+    segment_id = project['segments'][0]['id']
+    ops = [{"op": "delete", "id": segment_id}]
+
+    first = client.patch(f'/api/projects/{sample_project}/segments', json={"revision": project['revision'], "ops": ops})
+    assert first.status_code == 200
+    second = client.patch(f'/api/projects/{sample_project}/segments', json={"revision": project['revision'], "ops": [
+        {"op": "update", "id": segment_id, "text": "Lost update"}
+    ]})
+    assert second.status_code == 409
+    assert json.loads(second.data)['revision'] == project['revision'] + 1
+
 def test_export_api(client, sample_project):
     """Verify the format export functionality"""
     for format in ['srt', 'vtt', 'txt', 'csv', 'json', 'mcp']:
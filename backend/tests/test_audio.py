@@ -0,0 +1,61 @@
+import io
+import time
+import numpy as np
+import pytest
+from audio import processor
+
+class FakePopen:
+    """Stands in for ffmpeg: `pcm` comes out of stdout, `stderr` is written to the given file"""
+    calls = []
+
+    def __init__(self, pcm, returncode=0, stderr=b""):
+        self.pcm, self.returncode, self.error = pcm, returncode, stderr
+
+    def __call__(self, cmd, stdout=None, stderr=None):
+        FakePopen.calls.append(cmd)
+        self.stdout = io.BufferedReader(io.BytesIO(self.pcm), buffer_size=1000)
+        stderr.write(self.error)
+        return self
+
+    def wait(self):
+        return self.returncode
+
+def test_decode_audio_pipes_pcm_into_float32(monkeypatch):
+    """ffmpeg s16le output on stdout becomes a float32 array in [-1, 1]"""
+    pcm = np.array([0, 16384, -32768, 32767], dtype=np.int16).tobytes()
+    FakePopen.calls = []
+    monkeypatch.setattr(processor.subprocess, "Popen", FakePopen(pcm))
+    audio = processor.decode_audio("input.mp4", normalize=True)
+
+    assert audio.dtype == np.float32
+    assert audio.tolist() == pytest.approx([0.0, 0.5, -1.0, 32767 / 32768])
+    cmd = FakePopen.calls[0]
+    assert cmd[-1] == "pipe:1"
+    assert cmd[cmd.index("-f") + 1] == "s16le"
+    assert "dynaudnorm" in cmd
+
+def test_decode_audio_reads_in_chunks(monkeypatch):
+    """Output longer than a chunk, read from a pipe in short reads, comes back whole and in order"""
+    monkeypatch.setattr(processor, "DECODE_CHUNK_SAMPLES", 1000)
+    samples = (np.arange(2500) - 1250).astype(np.int16)
+    monkeypatch.setattr(processor.subprocess, "Popen", FakePopen(samples.tobytes() + b"\x01"))
+    audio = processor.decode_audio("input.mp4")
+    assert len(audio) == 2500
+    assert np.allclose(audio, samples / 32768.0)
+
+def test_decode_audio_reports_ffmpeg_failure(monkeypatch):
+    monkeypatch.setattr(processor.subprocess, "Popen", FakePopen(b"", returncode=1, stderr=b"boom"))
+    with pytest.raises(RuntimeError):
+        processor.decode_audio("broken.mp4")
+
+def test_rss_sampler_reports_the_peak_of_the_block():
+    """Memory allocated and released inside the block shows in the peak, not in the retained delta"""
+    with processor.RssSampler(interval=0.005) as memory:
+        block = np.ones(64 * 1024 * 1024 // 8)
+        time.sleep(0.05)
+        del block
+    if memory.start_mb is None:
+        pytest.skip("RSS not available on this platform")
+    assert memory.peak_delta_mb >= 50
+    assert memory.retained_delta_mb < memory.peak_delta_mb
+    assert "RSS peak +" in memory.summary()
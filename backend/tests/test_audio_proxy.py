@@ -0,0 +1,25 @@
+import json
+import pytest
+import database
+from services.audio_proxy import AudioProxyStore, audio_proxies
+
+def test_proxy_served_with_range_support(client, sample_project, tmp_path, monkeypatch):
+    """An existing proxy is shared by hash and honours Range requests"""
+    monkeypatch.setattr(audio_proxies, "folder", tmp_path)
+    database.update_project_file(sample_project, "/tmp/test.mp3", "test.mp3", "abc123")
+    (tmp_path / "abc123.m4a").write_bytes(bytes(range(256)) * 4)
+
+    response = client.get(f'/api/projects/{sample_project}/proxy', headers={"Range": "bytes=100-199"})
+    assert response.status_code == 206
+    assert response.mimetype == "audio/mp4"
+    assert response.data == (bytes(range(256)) * 4)[100:200]
+    assert json.loads(client.get(f'/api/projects/{sample_project}').data)['audio_proxy'] is True
+
+def test_proxy_missing_and_small_files_skipped(client, sample_project, tmp_path):
+    assert client.get(f'/api/projects/{sample_project}/proxy').status_code == 404
+
+    store = AudioProxyStore(tmp_path, "64k", min_bytes=1024)
+    small = tmp_path / "small.mp3"
+    small.write_bytes(b"x" * 10)
+    assert not store.schedule(str(small), "hash")
+    assert store.stats()["pending"] == 0
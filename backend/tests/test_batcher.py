@@ -0,0 +1,120 @@
+import threading
+import time
+import numpy as np
+import pytest
+import database
+from config import config
+from services.engine_pool import EnginePool
+from services.metrics import JobTimings
+from services.segment_writer import SegmentWriter
+from services.transcription_service import TranscriptionService
+from services.batcher import ShortClipBatcher
+from models.whisper_wrapper import _split_by_timestamps
+
+def _collecting_batcher(window_seconds, max_batch_size):
+    batches = []
+
+    def run_batch(model, items):
+        batches.append((model, [item["id"] for item in items], threading.current_thread().name))
+
+    return ShortClipBatcher(run_batch, window_seconds, max_batch_size), batches
+
+def _submit_all(batcher, clips):
+    """Submits each (model, id) from its own thread, as scheduler workers do"""
+    threads = [threading.Thread(target=batcher.submit, args=(model, {"id": clip_id}), name=f"worker-{clip_id}")
+               for model, clip_id in clips]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.01)
+    for thread in threads:
+        thread.join(timeout=5)
+    assert not any(thread.is_alive() for thread in threads)
+
+def test_clips_within_window_share_a_batch():
+    """Clips submitted inside the window are dispatched together, grouped by model"""
+    batcher, batches = _collecting_batcher(0.3, 8)
+    _submit_all(batcher, [("tiny", 1), ("tiny", 2), ("small", 3)])
+    assert sorted(batch[:2] for batch in batches) == [("small", [3]), ("tiny", [1, 2])]
+    # Each batch runs on the worker of its first clip
+    assert sorted(batch[2] for batch in batches) == ["worker-1", "worker-3"]
+
+def test_full_batch_is_dispatched_without_waiting():
+    """Reaching max_batch_size closes the batch early; the next clip leads the following batch"""
+    batcher, batches = _collecting_batcher(60, 2)
+    start = time.monotonic()
+    _submit_all(batcher, [("tiny", 1), ("tiny", 2)])
+    assert time.monotonic() - start < 5
+    assert batches == [("tiny", [1, 2], "worker-1")]
+
+    batcher.window_seconds = 0.1
+    _submit_all(batcher, [("tiny", 3), ("tiny", 4), ("tiny", 5)])
+    assert [batch[:2] for batch in batches[1:]] == [("tiny", [3, 4]), ("tiny", [5])]
+    assert batcher.stats()["pending"] == 0
+
+def test_split_by_timestamps():
+    """Timestamp tokens delimit segments; trailing text ends at the clip duration"""
+    tb = 1000
+    tokens = [tb + 0, 1, 2, tb + 120, tb + 120, 3, tb + 250, tb + 260, 4]
+    assert _split_by_timestamps(tokens, tb, 0.02, duration=6.0) == [
+        (0.0, 2.4, [1, 2]),
+        (2.4, 5.0, [3]),
+        (5.2, 6.0, [4]),
+    ]
+
+class RecordingEngine:
+    """Fake engine noting which entry point each clip went through"""
+    calls = []
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def transcribe(self, audio, language=None, progress_callback=None, log_callback=None):
+        self.calls.append(("transcribe", 1))
+        return {"text": "Hi", "segments": [{"start": 0.0, "end": 1.0, "text": "Hi", "speaker": "Speaker 1"}], "language": "en", "language_probability": 0.9}
+
+    def transcribe_batch(self, audios, languages=None, beam_size=5):
+        self.calls.append(("transcribe_batch", len(audios)))
+        return [{"text": "Hi", "segments": [{"start": 0.0, "end": 1.0, "text": "Hi"}], "language": "en", "language_probability": 0.9} for _ in audios]
+
+def _batch_item(service, job_id, tmp_path):
+    database.create_project(job_id, "clip.wav", None, "clip.wav", "tiny", "en")
+    service.jobs[job_id] = {"status": "running", "progress": 0.3}
+    return {
+        "job_id": job_id, "audio": np.zeros(16000 * 5, dtype=np.float32), "language": "en",
+        "normalized": False, "file_hash": None, "wav_path": tmp_path / f"{job_id}.wav",
+        "writer": SegmentWriter(job_id), "timings": JobTimings(), "batched_at": time.perf_counter()
+    }
+
+def test_lone_clip_skips_batched_decoding(app, tmp_path, monkeypatch):
+    """Only real batches use transcribe_batch: a single clip keeps VAD and fallback"""
+    monkeypatch.setattr(config, "UPLOAD_FOLDER", tmp_path)
+    service = TranscriptionService()
+    service.engine_pool = EnginePool(RecordingEngine, memory_budget_mb=10_000)
+    RecordingEngine.calls = []
+
+    service._run_batch("tiny", [_batch_item(service, "solo", tmp_path)])
+    service._run_batch("tiny", [_batch_item(service, "pair-1", tmp_path), _batch_item(service, "pair-2", tmp_path)])
+
+    assert RecordingEngine.calls == [("transcribe", 1), ("transcribe_batch", 2)]
+    assert all(service.jobs[job]["status"] == "completed" for job in ("solo", "pair-1", "pair-2"))
+
+def test_batched_jobs_keep_their_worker(app, tmp_path, monkeypatch):
+    """A clip waiting for its batch still counts as a running job"""
+    monkeypatch.setattr(config, "UPLOAD_FOLDER", tmp_path)
+    service = TranscriptionService()
+    service.scheduler.worker_count = 2
+    service.engine_pool = EnginePool(RecordingEngine, memory_budget_mb=10_000)
+    service.batcher.max_batch_size, service.batcher.window_seconds = 4, 0.5
+    monkeypatch.setattr(service, "_extract_audio", lambda *args: np.zeros(16000 * 5, dtype=np.float32))
+    RecordingEngine.calls = []
+    database.create_project("clip", "clip.wav", None, "clip.wav", "tiny", "en")
+
+    service.start_job("clip", "/tmp/clip.wav", "tiny", "en")
+    deadline = time.monotonic() + 5
+    while service.batcher.stats()["pending"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert service.scheduler.running_count() == 1
+    while service.scheduler.running_count() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert service.jobs["clip"]["status"] == "completed"
+    assert RecordingEngine.calls == [("transcribe", 1)]
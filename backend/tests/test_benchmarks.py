@@ -0,0 +1,24 @@
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from common import compare
+from engines import StubEngine
+import run
+
+def test_export_stage_and_regression_check(tmp_path):
+    """The suite's JSON can be compared with a previous run"""
+    stage = run.bench_export(SimpleNamespace(segments=200), str(tmp_path))
+    assert stage["srt"]["output_mb"] > 0 and stage["mcp"]["segments_per_second"] > 0
+
+    baseline = {"stages": {"export": {"srt": {"elapsed_seconds": 1.0, "segments_per_second": 1000}}}}
+    slower = {"stages": {"export": {"srt": {"elapsed_seconds": 1.5, "segments_per_second": 700}}}}
+    assert [r[0] for r in compare(slower, baseline, 0.15)] == ["export.srt.elapsed_seconds", "export.srt.segments_per_second"]
+    assert compare(baseline, slower, 0.15) == []
+
+def test_stub_engine_reports_progress():
+    progress = []
+    result = StubEngine(rtf=0, segment_seconds=4).transcribe([0.0] * 16000 * 10, progress_callback=lambda p, segs: progress.append(len(segs)))
+    assert len(result["segments"]) == 3 and progress == [1, 1, 1]
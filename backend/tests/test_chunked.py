@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+from concurrent.futures import Future
+import models.chunked as chunked
+from models.chunked import find_split_points, merge_chunk_segments, plan_chunks, SAMPLE_RATE
+
+def test_split_points_prefer_silence_gaps():
+    """Cuts land in the middle of the silence closest to each target"""
+    speech = [
+        {"start": 0, "end": 90},
+        {"start": 110, "end": 210},   # gap 90-110 -> midpoint 100
+        {"start": 230, "end": 300},   # gap 210-230 -> midpoint 220
+    ]
+    assert find_split_points(speech, 300, target_samples=100, search_samples=25) == [100, 220]
+
+def test_split_points_fall_back_to_hard_cut():
+    """Continuous speech is cut exactly at the target length"""
+    speech = [{"start": 0, "end": 1000}]
+    assert find_split_points(speech, 1000, target_samples=400, search_samples=10) == [400, 800]
+
+def test_merge_deduplicates_overlap():
+    """Segments in the overlap are kept only by the chunk owning their midpoint"""
+    first = [
+        {"start": 0.0, "end": 4.0, "text": "one"},
+        {"start": 9.0, "end": 11.5, "text": "seam"},
+    ]
+    second = [
+        {"start": 9.1, "end": 11.4, "text": "seam"},
+        {"start": 12.0, "end": 15.0, "text": "two"},
+    ]
+    merged = merge_chunk_segments([(0.0, 10.0, first), (10.0, 20.0, second)])
+    assert [s["text"] for s in merged] == ["one", "seam", "two"]
+    assert [s["id"] for s in merged] == ["0", "1", "2"]
+
+def test_merge_deduplicates_by_time_overlap():
+    """The same words heard on both sides of a seam are dropped even when worded differently"""
+    first = [{"start": 0.0, "end": 4.0, "text": "one"}, {"start": 8.5, "end": 11.0, "text": "across the seam"}]
+    second = [
+        {"start": 9.0, "end": 11.2, "text": "across the scene"},
+        {"start": 11.2, "end": 12.0, "text": "next"},
+        {"start": 12.0, "end": 15.0, "text": "two"},
+    ]
+    merged = merge_chunk_segments([(0.0, 10.0, first), (10.0, 20.0, second)])
+    assert [s["text"] for s in merged] == ["one", "across the seam", "next", "two"]
+
+class _InlineExecutor:
+    """Runs the chunk jobs at once; `as_completed` below hands them back last chunk first"""
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def submit(self, func, *args):
+        future = Future()
+        future.set_result(func(*args))
+        return future
+
+def test_parallel_chunks_stream_in_time_order(monkeypatch):
+    """Chunks finishing out of order are persisted in timeline order, once"""
+    chunks = [{"start_sample": i * 10 * SAMPLE_RATE, "end_sample": (i + 1) * 10 * SAMPLE_RATE,
+               "owned_start": i * 10.0, "owned_end": (i + 1) * 10.0} for i in range(3)]
+    monkeypatch.setattr(chunked, "plan_chunks", lambda audio, chunk_seconds: chunks)
+    monkeypatch.setattr(chunked, "ProcessPoolExecutor", _InlineExecutor)
+    monkeypatch.setattr(chunked, "as_completed", lambda futures: list(reversed(futures)))
+    monkeypatch.setattr(chunked, "_transcribe_chunk", lambda index, audio, offset, language: (
+        index, [{"start": offset + 1, "end": offset + 2, "text": f"chunk {index}", "speaker": "Speaker 1"}], "en", 0.9
+    ))
+    streamed = []
+    result = chunked.transcribe_parallel(np.zeros(30 * SAMPLE_RATE, dtype=np.float32), "tiny", "cpu", "int8", "/tmp",
+                                         progress_callback=lambda progress, segments: streamed.append([s["text"] for s in segments]))
+    assert streamed == [[], [], ["chunk 0", "chunk 1", "chunk 2"]]
+    assert [s["text"] for s in result["segments"]] == ["chunk 0", "chunk 1", "chunk 2"]
+
+def test_plan_chunks_covers_whole_recording():
+    """Chunks tile the recording and are padded by the overlap"""
+    audio = np.zeros(SAMPLE_RATE * 100, dtype=np.float32)
+    chunks = plan_chunks(audio, chunk_seconds=30, overlap_seconds=1.0, search_seconds=5)
+    assert chunks[0]["owned_start"] == 0.0
+    assert chunks[-1]["owned_end"] == 100.0
+    for previous, current in zip(chunks, chunks[1:]):
+        assert previous["owned_end"] == current["owned_start"]
+        assert current["start_sample"] == int(current["owned_start"] * SAMPLE_RATE) - SAMPLE_RATE
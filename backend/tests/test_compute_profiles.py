@@ -0,0 +1,77 @@
+import json
+import pytest
+import services.compute_profiles as profiles_module
+from config import config
+from services.compute_profiles import ComputeProfiles, calibration_clip
+
+CPU_HOST = {"available": False, "device": None}
+
+@pytest.fixture
+def profiles(tmp_path, monkeypatch):
+    """Profiles of an 8-core CPU host with automatic settings"""
+    monkeypatch.setattr(profiles_module, "get_gpu_info", lambda: CPU_HOST)
+    monkeypatch.setattr(profiles_module.os, "cpu_count", lambda: 8)
+    monkeypatch.setattr(profiles_module, "supported_compute_types", lambda device: {"float32", "int8", "int8_float32"})
+    monkeypatch.setattr(config, "COMPUTE_DEVICE", "auto")
+    monkeypatch.setattr(config, "COMPUTE_TYPE", "auto")
+    monkeypatch.setattr(config, "CPU_THREADS", 0)
+    monkeypatch.setattr(config, "ENGINE_NUM_WORKERS", 0)
+    monkeypatch.setattr(config, "MAX_CONCURRENT_INFERENCES", 2)
+    return ComputeProfiles(tmp_path / "profiles.json")
+
+def test_cpu_host_gets_int8_and_split_cores(profiles):
+    """Without a GPU the model runs int8, with the cores shared by the parallel inferences"""
+    profile = profiles.get("medium")
+    assert profile["device"] == "cpu" and profile["compute_type"] == "int8"
+    assert profile["num_workers"] == 2 and profile["cpu_threads"] == 4
+    assert profile["source"] == "hardware"
+
+def test_gpu_precision_follows_memory(profiles, monkeypatch):
+    monkeypatch.setattr(profiles, "_hardware", {"gpu": "Small GPU", "vram_gb": 4, "cpu_count": 8, "ctranslate2": "x"})
+    monkeypatch.setattr(profiles_module, "pick_compute_type", lambda device, preferred: preferred)
+    assert profiles.get("large-v3")["device"] == "cpu"
+    assert (profiles.get("medium")["device"], profiles.get("medium")["compute_type"]) == ("cuda", "int8")
+    assert profiles.get("small")["compute_type"] == "float16"
+
+def test_calibration_saves_fastest_profile(profiles, monkeypatch):
+    """The fastest candidate is persisted per model and survives a restart on the same host"""
+    speed = {("int8", 4): 3.0, ("int8", 2): 4.0, ("int8_float32", 4): 2.0, ("int8_float32", 2): 5.0, ("float32", 4): 9.0, ("float32", 2): 9.0}
+    loaded = []
+
+    def fake_factory(model_name, device, compute_type, log_callback, num_workers, cpu_threads):
+        loaded.append((compute_type, cpu_threads))
+        return (compute_type, cpu_threads)
+
+    monkeypatch.setattr(profiles_module, "time_transcription", lambda engine, clip: speed[engine])
+    profile = profiles.calibrate("small", fake_factory, clip_seconds=10, log=lambda msg: None)
+    assert len(loaded) == len(speed)
+    assert (profile["compute_type"], profile["cpu_threads"]) == ("int8_float32", 4)
+    assert profile["realtime_factor"] == 0.2
+
+    reloaded = ComputeProfiles(profiles.path)
+    reloaded._hardware = profiles.hardware()
+    assert reloaded.get("small")["compute_type"] == "int8_float32"
+    assert reloaded.get("small")["source"] == "calibrated"
+    assert reloaded.get("medium")["source"] == "hardware"
+
+    # Measured elsewhere: ignored
+    other_host = ComputeProfiles(profiles.path)
+    other_host._hardware = dict(profiles.hardware(), cpu_count=64)
+    assert other_host.get("small")["source"] == "hardware"
+
+def test_explicit_settings_win(profiles, monkeypatch):
+    monkeypatch.setattr(config, "COMPUTE_TYPE", "float32")
+    monkeypatch.setattr(config, "CPU_THREADS", 3)
+    profile = profiles.get("tiny")
+    assert profile["compute_type"] == "float32" and profile["cpu_threads"] == 3
+    assert profiles.candidates("tiny") == [("float32", 3)]
+
+def test_calibration_clip_is_deterministic():
+    clip = calibration_clip(2)
+    assert clip.dtype.name == "float32" and len(clip) == 32000
+    assert (clip == calibration_clip(2)).all()
+
+def test_status_lists_profiles(client):
+    data = json.loads(client.get('/api/system/status').data)
+    assert "hardware" in data["compute_profiles"]
+    assert "profiles" in data["compute_profiles"]
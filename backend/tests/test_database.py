@@ -0,0 +1,89 @@
+import sqlite3
+import threading
+import pytest
+import database
+
+def test_connection_reused_per_thread(app):
+    """Each thread keeps its own connection across calls"""
+    assert database.get_db() is database.get_db()
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(database.get_db()))
+    thread.start()
+    thread.join()
+    assert other[0] is not database.get_db()
+
+def test_request_threads_share_pooled_connections(client, sample_project):
+    """Each request runs on a new thread; its connection goes back to the pool at teardown"""
+    database.close_db()
+    before = database.get_query_stats()
+
+    def request():
+        assert client.get(f'/api/projects/{sample_project}').status_code == 200
+
+    for _ in range(5):
+        thread = threading.Thread(target=request)
+        thread.start()
+        thread.join()
+
+    stats = database.get_query_stats()
+    assert stats["connections_opened"] - before["connections_opened"] == 1
+    assert stats["connections_reused"] - before["connections_reused"] == 4
+    assert 0 < stats["connection_reuse_rate"] <= 1
+
+def test_released_connection_is_clean(app, sample_project):
+    """A connection left inside a transaction is rolled back before another thread reuses it"""
+    conn = database.get_db()
+    conn.execute("BEGIN")
+    conn.execute("UPDATE projects SET name = 'uncommitted' WHERE id = ?", (sample_project,))
+    database.release_db()
+    assert database.get_db() is conn and not conn.in_transaction
+    assert database.get_project(sample_project)['name'] == "test.mp3"
+
+def test_transaction_rolls_back_on_error(app, sample_project):
+    """A failing transaction leaves no partial writes behind"""
+    with pytest.raises(RuntimeError):
+        with database.transaction() as conn:
+            conn.execute("UPDATE projects SET name = 'renamed' WHERE id = ?", (sample_project,))
+            raise RuntimeError("boom")
+    assert database.get_project(sample_project)['name'] == "test.mp3"
+
+def test_bulk_save_and_query_stats(app, sample_project):
+    """save_segments stores every row and its latency is recorded"""
+    database.reset_query_stats()
+    segments = [{'start': i, 'end': i + 1, 'text': f"seg {i}", 'speaker': 'A'} for i in range(500)]
+    database.save_segments(sample_project, segments)
+
+    assert len(database.get_segments(sample_project)) == 500
+    stats = database.get_query_stats()["queries"]
+    assert stats["save_segments"]["calls"] == 1
+    assert stats["get_segments"]["calls"] == 1
+
+def test_migrations_upgrade_legacy_database(app, tmp_path, monkeypatch):
+    """An unversioned database gets the missing columns and the indexes"""
+    legacy = tmp_path / "legacy.db"
+    conn = sqlite3.connect(legacy)
+    conn.execute("CREATE TABLE projects (id TEXT PRIMARY KEY, name TEXT, created_at TEXT, status TEXT)")
+    conn.execute("INSERT INTO projects (id, name) VALUES ('old', 'old.mp3')")
+    conn.commit()
+    conn.close()
+
+    monkeypatch.setattr(database, "DB_PATH", str(legacy))
+    database.init_db()
+    conn = database.get_db()
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == len(database.MIGRATIONS)
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(projects)")]
+    assert "file_hash" in columns and "revision" in columns
+    assert database.get_project("old")["name"] == "old.mp3"
+    database.close_db()
+
+def test_segments_lookup_uses_index_and_cascades(app, sample_project):
+    """get_segments is served by the index; deleting a project removes its segments"""
+    plan = database.get_db().execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM segments WHERE project_id = ? ORDER BY start ASC", (sample_project,)
+    ).fetchall()
+    assert any("idx_segments_project_start" in row[3] for row in plan)
+
+    database.delete_project(sample_project)
+    count = database.get_db().execute("SELECT COUNT(*) FROM segments WHERE project_id = ?", (sample_project,)).fetchone()[0]
+    assert count == 0
@@ -0,0 +1,63 @@
+import pytest
+from services.engine_pool import EnginePool, estimate_engine_memory_mb
+
+class FakeEngine:
+    def __init__(self, model_name, device, compute_type, log_callback=None, num_workers=1, cpu_threads=0):
+        self.model_name = model_name
+        self.log_callback = log_callback
+
+def test_pool_hits_and_misses():
+    """A second acquire of the same key reuses the loaded engine"""
+    pool = EnginePool(FakeEngine, memory_budget_mb=10_000)
+    with pool.acquire("small", "cpu", "int8") as first:
+        pass
+    with pool.acquire("small", "cpu", "int8") as second:
+        pass
+    assert first is second
+    stats = pool.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["loads"] == 1
+
+def test_pool_lru_eviction():
+    """Loading past the memory budget evicts the least recently used idle engine"""
+    budget = estimate_engine_memory_mb("small", "float16") * 2
+    pool = EnginePool(FakeEngine, memory_budget_mb=budget)
+    with pool.acquire("small", "cpu", "float16"):
+        pass
+    with pool.acquire("base", "cpu", "float16"):
+        pass
+    # Touch "small" so that "base" becomes the LRU entry
+    with pool.acquire("small", "cpu", "float16"):
+        pass
+    with pool.acquire("small", "cuda", "float16"):
+        pass
+
+    loaded = pool.stats()["loaded"]
+    assert "small/cpu/float16" in loaded
+    assert "base/cpu/float16" not in loaded
+    assert pool.stats()["evictions"] == 1
+
+def test_pool_never_evicts_engines_in_use():
+    """An engine held by a running job survives eviction"""
+    pool = EnginePool(FakeEngine, memory_budget_mb=1)
+    with pool.acquire("tiny", "cpu", "int8") as busy:
+        with pool.acquire("base", "cpu", "int8"):
+            pass
+        assert "tiny/cpu/int8" in pool.stats()["loaded"]
+        assert busy.model_name == "tiny"
+
+def test_reserve_caps_copies_loaded_outside_the_pool():
+    """Long-file workers get the memory of idle engines, and no more copies than the budget holds"""
+    per_copy = estimate_engine_memory_mb("small", "int8")
+    pool = EnginePool(FakeEngine, memory_budget_mb=per_copy * 3)
+    with pool.acquire("small", "cpu", "int8"):
+        pass
+    with pool.acquire("small", "cpu", "int8"):
+        with pool.reserve("small", "int8", 4) as workers:
+            # The engine in use stays loaded: two copies fit next to it
+            assert workers == 2
+            assert pool.stats()["memory_mb_reserved"] == per_copy * 2
+    with pool.reserve("small", "int8", 4) as workers:
+        assert workers == 3 and pool.stats()["loaded"] == []
+    assert pool.stats()["memory_mb_reserved"] == 0
@@ -0,0 +1,45 @@
+import pytest
+from services.events import JobEventBus
+from services.transcription_service import transcription_service
+
+def test_bus_resume_and_close():
+    """Events after Last-Event-ID are replayed; a terminal status closes the stream"""
+    bus = JobEventBus(history=3)
+    for i in range(4):
+        bus.publish("job", "log", {"message": str(i)})
+    assert not bus.can_resume("job", 0)
+    assert bus.can_resume("job", 1)
+
+    bus.publish("job", "status", {"status": "completed", "progress": 1.0})
+    events, closed = bus.wait("job", 3, timeout=0)
+    assert [event[0] for event in events] == [4, 5]
+    assert closed
+
+def test_events_endpoint_resumes_from_last_event_id(client, sample_project):
+    """A reconnect with Last-Event-ID only receives the newer events"""
+    job_id = sample_project
+    bus = transcription_service.events
+    transcription_service.jobs[job_id] = {"id": job_id, "status": "processing", "progress": 0.5, "logs": []}
+    try:
+        first = bus.publish(job_id, "log", {"message": "already seen"})
+        bus.publish(job_id, "segments", {"segments": [{"id": "1", "text": "Ciao"}], "replace": False})
+        bus.publish(job_id, "status", {"status": "completed", "progress": 1.0, "error": None, "segments_count": 1})
+
+        response = client.get(f'/api/transcribe/{job_id}/events', headers={"Last-Event-ID": str(first)})
+        assert response.status_code == 200
+        assert response.mimetype == "text/event-stream"
+        body = response.get_data(as_text=True)
+        assert "already seen" not in body
+        assert "event: snapshot" not in body
+        assert f"id: {first + 1}\nevent: segments" in body
+        assert "event: status" in body
+    finally:
+        transcription_service.jobs.pop(job_id, None)
+
+def test_events_endpoint_snapshot_for_finished_project(client, sample_project, monkeypatch):
+    """A project finished before this server run gets a single snapshot"""
+    monkeypatch.setattr(transcription_service, "events", JobEventBus())
+    response = client.get(f'/api/transcribe/{sample_project}/events')
+    body = response.get_data(as_text=True)
+    assert body.startswith("id: 0\nevent: snapshot")
+    assert body.count("event:") == 1
@@ -30,3 +30,79 @@ def test_generate_mcp_structure():
     assert "segments" not in data
     assert "content" not in data
     assert "full_text" not in data
+
+@pytest.mark.parametrize("fmt", ["srt", "vtt", "txt", "csv", "mcp"])
+def test_download_matches_post_export(client, sample_project, fmt):
+    """The streamed download has the same content as the JSON-wrapped export"""
+    posted = client.post('/api/export', json={"job_id": sample_project, "format": fmt, "include_speakers": True})
+    response = client.get(f'/api/export/{sample_project}/download?format={fmt}')
+    assert response.status_code == 200
+    assert response.get_data(as_text=True) == json.loads(posted.data)['content']
+    assert response.headers['Content-Disposition'].startswith(f'attachment; filename="test.{fmt}"')
+
+def test_download_json_is_valid(client, sample_project):
+    response = client.get(f'/api/export/{sample_project}/download?format=json')
+    assert response.mimetype == "application/json"
+    assert json.loads(response.data)['segments'][0]['text'] == "Hello world"
+
+def test_download_etag_and_revision_invalidation(client, sample_project):
+    """An unchanged transcript costs a 304; an edit changes the ETag"""
+    url = f'/api/export/{sample_project}/download?format=srt'
+    first = client.get(url)
+    etag = first.headers['ETag']
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    client.post(f'/api/projects/{sample_project}/segments', json={"segments": [{"start": 0.0, "end": 1.0, "text": "Edited"}]})
+    second = client.get(url, headers={"If-None-Match": etag})
+    assert second.status_code == 200
+    assert "Edited" in second.get_data(as_text=True)
+    assert second.headers['ETag'] != etag
+
+def test_project_details_etag(client, sample_project):
+    first = client.get(f'/api/projects/{sample_project}')
+    assert client.get(f'/api/projects/{sample_project}', headers={"If-None-Match": first.headers['ETag']}).status_code == 304
+
+def test_bulk_export_zip(client, sample_project):
+    """Every project/format pair becomes an entry; failures go to errors.txt"""
+    import io
+    import zipfile
+    import database
+    database.create_project("empty-1", "empty.mp3", "/tmp/empty.mp3", "empty.mp3", "tiny", "it")
+
+    response = client.post('/api/export/bulk', json={
+        "project_ids": [sample_project, "empty-1", "missing"],
+        "formats": ["srt", "txt"]
+    })
+    assert response.status_code == 200
+    assert response.mimetype == "application/zip"
+    archive = zipfile.ZipFile(io.BytesIO(response.data))
+    assert sorted(archive.namelist()) == ["errors.txt", "test.srt", "test.txt"]
+    assert "Hello world" in archive.read("test.txt").decode("utf-8")
+    errors = archive.read("errors.txt").decode("utf-8")
+    assert "missing: Project not found" in errors
+    assert "empty-1 (srt): No segments found" in errors
+
+def test_bulk_export_requires_formats(client, sample_project):
+    response = client.post('/api/export/bulk', json={"project_ids": [sample_project], "formats": ["doc"]})
+    assert response.status_code == 400
+
+@pytest.mark.parametrize("body", [
+    {"project_ids": "abc", "formats": ["txt"]},
+    {"project_ids": [1, 2], "formats": ["txt"]},
+    {"project_ids": 7, "formats": ["txt"]},
+    {"filter": "completed", "formats": ["txt"]},
+    {"project_ids": [], "formats": "txt"},
+    ["not", "an", "object"],
+])
+def test_bulk_export_rejects_malformed_bodies(client, body):
+    response = client.post('/api/export/bulk', json=body)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+def test_bulk_export_reads_include_speakers_as_bool(client, sample_project):
+    import io
+    import zipfile
+    response = client.post('/api/export/bulk', json={"project_ids": [sample_project], "formats": ["txt"], "include_speakers": "false"})
+    with zipfile.ZipFile(io.BytesIO(response.data)) as archive:
+        content = archive.read(archive.namelist()[0]).decode('utf-8')
+    assert "Hello world" in content and "Speaker 1" not in content
@@ -0,0 +1,25 @@
+from services.export_cache import ExportCache
+
+def test_cache_bounded_and_revision_scoped():
+    """Size limit evicts LRU entries; a new revision replaces the old ones"""
+    cache = ExportCache(max_bytes=10, max_entry_bytes=6)
+    cache.put(("a", 1, "srt", True, "a.mp3"), b"12345")
+    cache.put(("b", 1, "srt", True, "b.mp3"), b"12345")
+    cache.get(("a", 1, "srt", True, "a.mp3"))
+    cache.put(("c", 1, "srt", True, "c.mp3"), b"123")
+    assert cache.get(("b", 1, "srt", True, "b.mp3")) is None
+    assert cache.get(("a", 1, "srt", True, "a.mp3")) == b"12345"
+
+    cache.put(("a", 2, "srt", True, "a.mp3"), b"1")
+    assert cache.get(("a", 1, "srt", True, "a.mp3")) is None
+    assert not cache.put(("d", 1, "srt", True, "d.mp3"), b"1234567")
+
+def test_capture_streams_and_stores():
+    cache = ExportCache(max_bytes=100, max_entry_bytes=4)
+    key = ("a", 1, "txt", False, "a.mp3")
+    assert b"".join(cache.capture(key, [b"ab", b"cd"])) == b"abcd"
+    assert cache.get(key) == b"abcd"
+
+    big = ("b", 1, "txt", False, "b.mp3")
+    assert b"".join(cache.capture(big, [b"abc", b"def"])) == b"abcdef"
+    assert cache.get(big) is None
@@ -0,0 +1,91 @@
+import io
+import json
+import hashlib
+import os
+import threading
+import time
+import pytest
+import database
+from config import config
+from services.media_store import ORPHAN_GRACE_SECONDS, media_store
+from routes.uploads import receive_media
+from services.transcription_service import transcription_service
+
+MEDIA = b"conference recording" * 100
+MEDIA_HASH = hashlib.sha256(MEDIA).hexdigest()
+
+@pytest.fixture
+def store_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "UPLOAD_FOLDER", tmp_path)
+    monkeypatch.setattr(media_store, "folder", tmp_path / "objects")
+    monkeypatch.setattr(transcription_service.scheduler, "submit", lambda *args, **kwargs: 1)
+    return tmp_path
+
+def _upload(client, name):
+    response = client.post('/api/transcribe', data={
+        "file": (io.BytesIO(MEDIA), name), "use_cache": "false"
+    }, content_type='multipart/form-data')
+    return json.loads(response.data)["job_id"]
+
+def test_identical_uploads_share_one_object(client, store_dir):
+    """The object is removed only with the last project referencing it"""
+    first, second = _upload(client, "a.mp4"), _upload(client, "b.mp4")
+    obj = store_dir / "objects" / MEDIA_HASH
+    assert database.get_project(first)["file_path"] == database.get_project(second)["file_path"] == str(obj)
+    assert [p.name for p in store_dir.iterdir() if p.is_file()] == []
+
+    report = json.loads(client.get('/api/system/storage').data)
+    assert report["objects"] == 1 and report["references"] == 2
+    assert report["saved_bytes"] == len(MEDIA)
+
+    client.delete(f'/api/projects/{first}')
+    assert obj.exists()
+    media = client.get(f'/api/projects/{second}/media')
+    assert media.data == MEDIA and media.mimetype == "video/mp4"
+    client.delete(f'/api/projects/{second}')
+    assert not obj.exists()
+
+def test_reclaim_moves_legacy_duplicates(app, store_dir):
+    for project_id in ("old-1", "old-2"):
+        legacy = store_dir / f"{project_id}_talk.mp4"
+        legacy.write_bytes(MEDIA)
+        database.create_project(project_id, "talk.mp4", str(legacy), "talk.mp4", "tiny", "it", file_hash=MEDIA_HASH)
+    (store_dir / "objects").mkdir()
+    (store_dir / "objects" / "orphan").write_bytes(b"x" * 10)
+    stale = time.time() - ORPHAN_GRACE_SECONDS - 60
+    os.utime(store_dir / "objects" / "orphan", (stale, stale))
+    # Possibly stored for a project still being created
+    (store_dir / "objects" / "fresh").write_bytes(b"y" * 10)
+
+    assert media_store.report()["reclaimable_bytes"] == len(MEDIA) + 10
+    assert media_store.reclaim(dry_run=True)["freed_bytes"] == len(MEDIA) + 10
+    assert (store_dir / "old-1_talk.mp4").exists()
+
+    result = media_store.reclaim()
+    assert result["moved"] == 2 and result["orphans_removed"] == 1
+    assert not (store_dir / "old-1_talk.mp4").exists() and not (store_dir / "old-2_talk.mp4").exists()
+    assert database.get_project("old-2")["file_path"] == str(store_dir / "objects" / MEDIA_HASH)
+    assert media_store.report()["saved_bytes"] == len(MEDIA)
+    assert (store_dir / "objects" / "fresh").exists()
+
+def test_ingest_is_not_lost_to_a_concurrent_release(app, client, store_dir):
+    """Deleting the last project of an object waits until a new upload deduplicated onto it is referenced"""
+    first = _upload(client, "a.mp4")
+    obj = store_dir / "objects" / MEDIA_HASH
+    deleted = threading.Event()
+
+    def delete_first():
+        database.delete_project(first)
+        database.close_db()
+        deleted.set()
+
+    with app.test_request_context('/api/transcribe', method='POST', data={"file": (io.BytesIO(MEDIA), "b.mp4")}):
+        with receive_media("second") as (filename, file_path, file_hash):
+            assert file_path == obj
+            deleter = threading.Thread(target=delete_first)
+            deleter.start()
+            time.sleep(0.2)
+            database.create_project("second", filename, str(file_path), filename, "tiny", "it", file_hash=file_hash)
+    deleter.join(timeout=5)
+    assert deleted.is_set() and obj.exists()
+    assert database.get_project("second")["file_path"] == str(obj)
@@ -0,0 +1,113 @@
+import json
+import logging
+import numpy as np
+import pytest
+import database
+from config import config
+from services.engine_pool import EnginePool
+from services.metrics import Histogram, JobTimings, PipelineMetrics, PrometheusText, pipeline_metrics
+from services.transcription_service import TranscriptionService
+
+class FakeEngine:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def transcribe(self, audio, language=None, progress_callback=None, log_callback=None):
+        segments = [{"start": 0.0, "end": 2.0, "text": "Hello", "speaker": "Speaker 1"}]
+        progress_callback(0.5, segments)
+        return {"text": "Hello", "segments": segments, "language": "en", "language_probability": 0.9}
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "UPLOAD_FOLDER", tmp_path)
+    service = TranscriptionService()
+    service.engine_pool = EnginePool(FakeEngine, memory_budget_mb=10_000)
+    service.batcher.max_batch_size = 1
+    # 45 s of silence instead of an ffmpeg extraction
+    monkeypatch.setattr(service, "_extract_audio", lambda *args: np.zeros(45 * 16000, dtype=np.float32))
+    return service
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram((1, 5))
+    for value in (0.5, 1, 3, 10):
+        histogram.observe(value)
+    assert histogram.cumulative() == [(1, 2), (5, 3), (float("inf"), 4)]
+    assert histogram.sum == 14.5 and histogram.count == 4
+
+def test_prometheus_text_format():
+    out = PrometheusText()
+    histogram = Histogram((0.5,))
+    histogram.observe(0.2)
+    out.histogram("stage_duration_seconds", "Stage time.", histogram, {"stage": "inference"})
+    out.counter("db_query_calls", "Calls.", 3, {"function": 'say "hi"'})
+    out.gauge("jobs_queued", "Queued.", 0)
+    assert out.render().splitlines() == [
+        "# HELP whisper_stage_duration_seconds Stage time.",
+        "# TYPE whisper_stage_duration_seconds histogram",
+        'whisper_stage_duration_seconds_bucket{stage="inference",le="0.5"} 1',
+        'whisper_stage_duration_seconds_bucket{stage="inference",le="+Inf"} 1',
+        'whisper_stage_duration_seconds_sum{stage="inference"} 0.2',
+        'whisper_stage_duration_seconds_count{stage="inference"} 1',
+        "# HELP whisper_db_query_calls_total Calls.",
+        "# TYPE whisper_db_query_calls_total counter",
+        'whisper_db_query_calls_total{function="say \\"hi\\""} 3',
+        "# HELP whisper_jobs_queued Queued.",
+        "# TYPE whisper_jobs_queued gauge",
+        "whisper_jobs_queued 0",
+    ]
+
+def test_job_timings_realtime_factor():
+    timings = JobTimings()
+    timings.record("inference", 3.0)
+    timings.record("inference", 1.5)
+    timings.audio_seconds = 90.0
+    metrics = PipelineMetrics()
+    metrics.observe(timings, "completed")
+    assert timings.as_dict()["stages"] == {"inference": 4.5}
+    assert timings.as_dict()["realtime_factor"] == 0.05
+    assert metrics.stats()["stages"]["inference"] == {"count": 1, "avg_seconds": 4.5}
+    assert metrics.stats()["audio_seconds_total"] == 90.0
+
+def test_job_stage_timings_stored_with_project(app, sample_project, service):
+    """A processed job reports each stage, in memory and on the project row"""
+    before = pipeline_metrics.histograms()["stages"].get("inference")
+    service.timings[sample_project] = JobTimings()
+    service.jobs[sample_project] = {"status": "queued", "progress": 0.0}
+    service._process_task(sample_project, "/tmp/test.mp3", "tiny", "en")
+
+    assert service.jobs[sample_project]["status"] == "completed"
+    stored = database.get_project(sample_project)["stage_timings"]
+    assert stored == service.jobs[sample_project]["stage_timings"]
+    assert {"queue", "extraction_wait", "extraction", "inference_wait", "model", "inference", "persist", "cleanup"} <= set(stored["stages"])
+    assert stored["audio_seconds"] == 45.0 and stored["realtime_factor"] is not None
+    assert sample_project not in service.timings
+    after = pipeline_metrics.histograms()["stages"]["inference"]
+    assert after.count == (before.count if before else 0) + 1
+
+def test_stage_timings_logged_as_json(app, sample_project, service, caplog):
+    service.jobs[sample_project] = {"status": "queued", "progress": 0.0}
+    with caplog.at_level(logging.INFO, logger="services.transcription_service"):
+        service._process_task(sample_project, "/tmp/test.mp3", "tiny", "en")
+    record = next(r for r in caplog.records if r.getMessage().startswith(f"Stage timings of job {sample_project}"))
+    assert record.stage_timings == service.jobs[sample_project]["stage_timings"]
+    assert json.loads(record.getMessage().split(": ", 1)[1]) == record.stage_timings
+
+def test_failed_job_keeps_partial_timings(app, sample_project, service, monkeypatch):
+    def broken(*args):
+        raise RuntimeError("ffmpeg exploded")
+
+    monkeypatch.setattr(service, "_extract_audio", broken)
+    service.jobs[sample_project] = {"status": "queued", "progress": 0.0}
+    service._process_task(sample_project, "/tmp/test.mp3", "tiny", "en")
+    stored = database.get_project(sample_project)["stage_timings"]
+    assert "extraction" in stored["stages"] and "inference" not in stored["stages"]
+
+def test_metrics_endpoint(client, sample_project):
+    database.get_project(sample_project)
+    response = client.get('/api/system/metrics')
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain; version=0.0.4")
+    text = response.get_data(as_text=True)
+    assert "# TYPE whisper_inference_realtime_factor histogram" in text
+    assert 'whisper_db_query_calls_total{function="get_project"}' in text
+    assert "whisper_engine_pool_misses_total" in text and "whisper_jobs_queued 0" in text
@@ -0,0 +1,111 @@
+import json
+import threading
+import time
+import wave
+import numpy as np
+import pytest
+from audio.peaks import compute_peaks, compute_peaks_from_wav, write_peaks, read_peaks_window, BASE_SAMPLES_PER_PEAK
+from config import config
+import database
+import services.peak_builder as peak_builder_module
+from services.peak_builder import peak_builder
+
+def _tone(seconds, sample_rate=16000):
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    # Silence for the first second, then a half-scale tone
+    return (np.where(t >= 1.0, 0.5, 0.0) * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+
+def test_pyramid_levels_and_window(tmp_path):
+    """Coarser levels keep the extremes; a window read returns only its peaks"""
+    levels = compute_peaks(_tone(60))
+    assert len(levels[0][0]) == 6000
+    assert len(levels[1][0]) == 1500
+    assert levels[-1][1].max() == levels[0][1].max()
+
+    path = tmp_path / "p.peaks"
+    write_peaks(path, levels)
+    window = read_peaks_window(path, level=0, start=0.5, end=1.5)
+    assert window["from"] == 0.5 and window["to"] == 1.5
+    peaks = np.array(window["peaks"]).reshape(-1, 2)
+    assert len(peaks) == 100
+    assert peaks[:50].max() == 0 and peaks[50:, 1].max() >= 63
+
+    # Without a level, the finest one fitting in `points` is chosen
+    assert read_peaks_window(path, max_points=400)["level"] == 2
+
+def test_partial_last_block_is_not_padded():
+    """The last, shorter block reports its own extremes, not the zero padding"""
+    audio = np.full(BASE_SAMPLES_PER_PEAK * 2 + 10, 0.5, dtype=np.float32)
+    mins, maxs = compute_peaks(audio)[0]
+    assert len(mins) == 3
+    assert mins.tolist() == [64, 64, 64] and maxs.tolist() == [64, 64, 64]
+
+def test_wav_and_memory_peaks_match(tmp_path):
+    audio = _tone(5)
+    wav_path = tmp_path / "a.wav"
+    with wave.open(str(wav_path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(16000)
+        wav.writeframes((audio * 32768).astype(np.int16).tobytes())
+    from_wav = compute_peaks_from_wav(wav_path, frames_per_read=BASE_SAMPLES_PER_PEAK * 7)
+    in_memory = compute_peaks(audio)
+    assert all(np.array_equal(a[0], b[0]) and np.array_equal(a[1], b[1]) for a, b in zip(from_wav, in_memory))
+
+def test_peaks_endpoint(client, sample_project, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "UPLOAD_FOLDER", tmp_path)
+    write_peaks(tmp_path / f"{sample_project}.peaks", compute_peaks(_tone(10)))
+    response = client.get(f'/api/projects/{sample_project}/peaks?from=2&to=4&level=0')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert len(data["peaks"]) == 400
+    assert data["duration"] == 10
+    assert client.get(f'/api/projects/{sample_project}/peaks?level=9').status_code == 400
+
+def _legacy_project(tmp_path, project_id):
+    media = tmp_path / "old.wav"
+    media.write_bytes(b"RIFF")
+    database.create_project(project_id, "old.wav", str(media), "old.wav", "tiny", "it")
+
+def _wait_for_builder():
+    for _ in range(500):
+        if not peak_builder.stats()["pending"]:
+            return
+        time.sleep(0.01)
+
+def test_missing_peaks_built_once_in_background(client, tmp_path, monkeypatch):
+    """Concurrent requests for a project without peaks get 202 and trigger a single decode"""
+    monkeypatch.setattr(config, "UPLOAD_FOLDER", tmp_path)
+    _legacy_project(tmp_path, "legacy")
+    release, decodes = threading.Event(), []
+
+    def slow_decode(path, normalize=False):
+        decodes.append(path)
+        release.wait(5)
+        return _tone(10)
+
+    monkeypatch.setattr(peak_builder_module, "decode_audio", slow_decode)
+    for _ in range(3):
+        response = client.get('/api/projects/legacy/peaks')
+        assert response.status_code == 202 and response.headers['Retry-After']
+    release.set()
+    _wait_for_builder()
+
+    assert len(decodes) == 1
+    response = client.get('/api/projects/legacy/peaks?level=0')
+    assert response.status_code == 200 and json.loads(response.data)["duration"] == 10
+
+def test_failed_peaks_build_is_reported_then_retried(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "UPLOAD_FOLDER", tmp_path)
+    _legacy_project(tmp_path, "broken")
+
+    def failing_decode(path, normalize=False):
+        raise RuntimeError("no audio stream")
+
+    monkeypatch.setattr(peak_builder_module, "decode_audio", failing_decode)
+    assert client.get('/api/projects/broken/peaks').status_code == 202
+    _wait_for_builder()
+    response = client.get('/api/projects/broken/peaks')
+    assert response.status_code == 500 and "no audio stream" in json.loads(response.data)["error"]
+    assert client.get('/api/projects/broken/peaks').status_code == 202
+    _wait_for_builder()
@@ -0,0 +1,134 @@
+import io
+import os
+import threading
+import time
+import pytest
+import database
+import services.preview_cache as preview_module
+from services.preview_cache import PreviewCache
+
+@pytest.fixture
+def previews(tmp_path, monkeypatch):
+    """Route previews to a temporary cache and count ffmpeg runs"""
+    calls = []
+
+    def fake_pair(video_file, raw_wav, normalized_wav, seconds=30):
+        calls.append(video_file)
+        with open(raw_wav, "wb") as f:
+            f.write(b"RAW")
+        with open(normalized_wav, "wb") as f:
+            f.write(b"NORM")
+
+    monkeypatch.setattr(preview_module, "generate_preview_pair", fake_pair)
+    monkeypatch.setattr(preview_module.preview_cache, "folder", tmp_path / "previews")
+    monkeypatch.setattr(preview_module.config, "UPLOAD_FOLDER", tmp_path)
+    return calls
+
+def test_both_variants_from_one_upload(client, previews, tmp_path):
+    response = client.post('/api/transcribe/preview', data={
+        'file': (io.BytesIO(b"media bytes"), 'clip.mp4'),
+        'normalize': 'true'
+    })
+    assert response.status_code == 200
+    assert response.data == b"NORM"
+    file_hash = response.headers['X-File-Hash']
+
+    # The other variant is served by hash, without upload or a second ffmpeg run
+    response = client.get(f'/api/transcribe/preview?file_hash={file_hash}&normalize=false')
+    assert response.status_code == 200
+    assert response.data == b"RAW"
+    assert len(previews) == 1
+    # The uploaded copy is not kept
+    assert not list(tmp_path.glob("preview_in_*"))
+
+def test_preview_from_project_media(client, sample_project, previews, tmp_path):
+    media = tmp_path / "media.mp4"
+    media.write_bytes(b"stored media")
+    database.update_project_file(sample_project, str(media), "media.mp4", "hash-1")
+
+    response = client.get(f'/api/transcribe/preview?project_id={sample_project}&normalize=true')
+    assert response.status_code == 200
+    assert previews == [str(media)]
+
+    # Unknown hash with no stored media: the client has to upload
+    assert client.get('/api/transcribe/preview?file_hash=unknown').status_code == 404
+
+def test_cleanup_removes_expired_previews(tmp_path):
+    cache = PreviewCache(tmp_path, seconds=30, ttl_seconds=3600)
+    old, recent = tmp_path / "a_raw.wav", tmp_path / "b_raw.wav"
+    old.write_bytes(b"x")
+    recent.write_bytes(b"x")
+    past = time.time() - 7200
+    os.utime(old, (past, past))
+
+    assert cache.cleanup() == 1
+    assert not old.exists() and recent.exists()
+
+def test_failed_generation_releases_its_lock(tmp_path, monkeypatch):
+    """A failing ffmpeg run leaves no per-hash lock or temporary file behind"""
+    def failing_pair(video_file, raw_wav, normalized_wav, seconds=30):
+        with open(raw_wav, "wb") as f:
+            f.write(b"partial")
+        raise RuntimeError("ffmpeg failed")
+
+    monkeypatch.setattr(preview_module, "generate_preview_pair", failing_pair)
+    cache = PreviewCache(tmp_path, seconds=30, ttl_seconds=3600)
+    with pytest.raises(RuntimeError):
+        cache.get_or_create("abc", False, lambda: "/tmp/source.mp4")
+    assert cache._locks == {}
+    assert list(tmp_path.iterdir()) == []
+    assert cache.get_or_create("abc", False, lambda: None) is None and cache._locks == {}
+
+def test_waiters_after_a_failure_stay_single_flight(tmp_path, monkeypatch):
+    """After a failed run, a waiting request and a new arrival share one lock"""
+    started, release = threading.Event(), threading.Event()
+    state = {"running": 0, "overlap": False, "calls": 0}
+    state_lock = threading.Lock()
+
+    def flaky_pair(video_file, raw_wav, normalized_wav, seconds=30):
+        with state_lock:
+            state["calls"] += 1
+            first = state["calls"] == 1
+            state["running"] += 1
+            state["overlap"] |= state["running"] > 1
+        try:
+            if first:
+                started.set()
+                release.wait(5)
+                raise RuntimeError("ffmpeg failed")
+            time.sleep(0.05)
+            for path in (raw_wav, normalized_wav):
+                with open(path, "wb") as f:
+                    f.write(b"wav")
+        finally:
+            with state_lock:
+                state["running"] -= 1
+
+    monkeypatch.setattr(preview_module, "generate_preview_pair", flaky_pair)
+    cache = PreviewCache(tmp_path, seconds=30, ttl_seconds=3600)
+    results = []
+
+    def request():
+        try:
+            results.append(cache.get_or_create("abc", False, lambda: "/tmp/source.mp4"))
+        except RuntimeError as e:
+            results.append(e)
+
+    first = threading.Thread(target=request)
+    first.start()
+    started.wait(5)
+    waiting = threading.Thread(target=request)
+    waiting.start()
+    time.sleep(0.05)
+    release.set()
+    first.join(5)
+    # Arrives after the failure, while the waiting request may be generating
+    late = threading.Thread(target=request)
+    late.start()
+    waiting.join(5)
+    late.join(5)
+
+    assert not state["overlap"]
+    assert state["calls"] == 2
+    assert sum(isinstance(r, RuntimeError) for r in results) == 1
+    assert (tmp_path / "abc_raw.wav").exists() and cache._locks == {}
@@ -0,0 +1,64 @@
+import io
+import json
+import hashlib
+import pytest
+import database
+from config import config
+from services.transcription_service import transcription_service, TranscriptionService
+from services.media_store import media_store
+from models.whisper_wrapper import ENGINE_VERSION
+
+MEDIA = b"fake media bytes"
+MEDIA_HASH = hashlib.sha256(MEDIA).hexdigest()
+
+def _store(model="tiny", language="it", normalized=False, max_bytes=1024 * 1024):
+    return database.store_cached_result(
+        TranscriptionService.result_cache_key(MEDIA_HASH, model, language, normalized),
+        MEDIA_HASH, model, language, normalized, ENGINE_VERSION,
+        "it", 0.98, "Ciao mondo",
+        [{"start": 0.0, "end": 1.5, "text": "Ciao mondo", "speaker": "Speaker 1"}],
+        max_bytes=max_bytes
+    )
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "UPLOAD_FOLDER", tmp_path)
+    monkeypatch.setattr(media_store, "folder", tmp_path / "objects")
+    return tmp_path
+
+def test_cache_hit_clones_project(client, upload_dir):
+    """Re-submitting identical media with the same settings completes instantly"""
+    assert _store()
+    response = client.post('/api/transcribe', data={
+        "file": (io.BytesIO(MEDIA), "clip.mp3"),
+        "model": "tiny",
+        "language": "it",
+    }, content_type='multipart/form-data')
+    assert response.status_code == 202
+    data = json.loads(response.data)
+    assert data["status"] == "completed"
+
+    project = json.loads(client.get(f'/api/projects/{data["job_id"]}').data)
+    assert project["full_text"] == "Ciao mondo"
+    assert project["detected_language"] == "it"
+    assert [s["text"] for s in project["segments"]] == ["Ciao mondo"]
+
+def test_cache_respects_parameters_and_opt_out(client, upload_dir, monkeypatch):
+    """A different model or use_cache=false bypasses the cache"""
+    assert _store()
+    monkeypatch.setattr(transcription_service.scheduler, "submit", lambda *args, **kwargs: 1)
+    for form in ({"model": "small", "language": "it"},
+                 {"model": "tiny", "language": "it", "use_cache": "false"}):
+        response = client.post('/api/transcribe', data={
+            "file": (io.BytesIO(MEDIA), "clip.mp3"), **form
+        }, content_type='multipart/form-data')
+        assert json.loads(response.data)["status"] == "queued"
+
+def test_cache_eviction_is_size_bounded(app):
+    """Entries beyond the byte budget are evicted least recently used first"""
+    assert _store(model="tiny", max_bytes=200)
+    assert _store(model="base", max_bytes=200)
+    assert _store(model="small", max_bytes=200)
+    key = lambda model: TranscriptionService.result_cache_key(MEDIA_HASH, model, "it", False)
+    assert database.get_cached_result(key("tiny")) is None
+    assert database.get_cached_result(key("small")) is not None
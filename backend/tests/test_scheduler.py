@@ -0,0 +1,75 @@
+import threading
+import pytest
+from services.scheduler import JobScheduler
+
+def _blocking_scheduler():
+    """Scheduler with one worker that blocks on the first job until released"""
+    release = threading.Event()
+    started = threading.Event()
+    done = threading.Event()
+    order = []
+
+    def handler(job_id, expected_total):
+        if job_id == "blocker":
+            started.set()
+            release.wait(timeout=5)
+            return
+        order.append(job_id)
+        if len(order) == expected_total:
+            done.set()
+
+    return JobScheduler(handler, worker_count=1), release, started, done, order
+
+def test_queue_positions_and_priority_order():
+    """Higher priority jobs run first, equal priorities keep FIFO order"""
+    scheduler, release, started, done, order = _blocking_scheduler()
+    scheduler.submit("blocker", (0,))
+    assert started.wait(timeout=5)
+
+    scheduler.submit("a", (3,))
+    scheduler.submit("b", (3,))
+    scheduler.submit("urgent", (3,), priority=10)
+
+    assert scheduler.queued_count() == 3
+    assert scheduler.running_count() == 1
+    assert scheduler.position("urgent") == 1
+    assert scheduler.position("a") == 2
+    assert scheduler.position("b") == 3
+    assert scheduler.position("blocker") is None
+
+    release.set()
+    assert done.wait(timeout=5)
+    assert order == ["urgent", "a", "b"]
+
+def test_cancel_waiting_job():
+    """A waiting job can be removed from the queue"""
+    scheduler, release, started, done, order = _blocking_scheduler()
+    scheduler.submit("blocker", (0,))
+    assert started.wait(timeout=5)
+
+    scheduler.submit("a", (1,))
+    scheduler.submit("b", (1,))
+    assert scheduler.cancel("a") is True
+    assert scheduler.cancel("missing") is False
+    assert scheduler.position("b") == 1
+
+    release.set()
+    assert done.wait(timeout=5)
+    assert order == ["b"]
+
+def test_deleting_a_queued_project_cancels_its_job(client, sample_project, monkeypatch):
+    """A project deleted while its job waits is withdrawn from the queue"""
+    from services.transcription_service import transcription_service
+    scheduler, release, started, done, order = _blocking_scheduler()
+    monkeypatch.setattr(transcription_service, "scheduler", scheduler)
+    scheduler.submit("blocker", (0,))
+    assert started.wait(timeout=5)
+
+    transcription_service.start_job(sample_project, "/tmp/test.mp3", "tiny", "en", use_cache=False)
+    assert scheduler.position(sample_project) == 1
+    assert client.delete(f'/api/projects/{sample_project}').status_code == 200
+    assert scheduler.queued_count() == 0
+    assert sample_project not in transcription_service.jobs and sample_project not in transcription_service.timings
+    events, closed = transcription_service.events.wait(sample_project, 0, timeout=0)
+    assert closed and events[-1][2]["error"] == "Job cancelled"
+    release.set()
@@ -0,0 +1,44 @@
+import json
+import pytest
+import database
+
+def test_search_ranks_hits_with_timecodes(client, sample_project):
+    """Hits carry the project, the timecodes and a highlighted snippet"""
+    database.save_segments(sample_project, [
+        {"start": 0.0, "end": 2.0, "text": "Buongiorno a tutti", "speaker": "A"},
+        {"start": 2.0, "end": 4.5, "text": "Parliamo della città di Perugia", "speaker": "A"}
+    ])
+    response = client.get('/api/search?q=citta perug')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert len(data['results']) == 1
+    hit = data['results'][0]
+    assert hit['project_id'] == sample_project
+    assert (hit['start'], hit['end']) == (2.0, 4.5)
+    assert "<mark>Perugia</mark>" in hit['snippet']
+    assert data['next_offset'] is None
+
+def test_search_snippet_escapes_transcript_markup(client, sample_project):
+    """Only the match highlighting is markup: transcript text comes back escaped"""
+    database.save_segments(sample_project, [
+        {"start": 0.0, "end": 2.0, "text": 'He said <script>alert("x")</script> & left', "speaker": "A"}
+    ])
+    hit = json.loads(client.get('/api/search?q=alert').data)['results'][0]
+    assert "<script>" not in hit['snippet']
+    assert hit['snippet'] == 'He said &lt;script&gt;<mark>alert</mark>(&quot;x&quot;)&lt;/script&gt; &amp; left'
+
+def test_search_follows_edits_and_deletes(client, sample_project):
+    """Segment edits and project deletion keep the index in sync"""
+    segment = database.get_segments(sample_project)[0]
+    revision = database.get_project(sample_project)['revision']
+    database.apply_segment_ops(sample_project, revision, [{"op": "update", "id": segment['id'], "text": "Testo corretto"}])
+
+    assert json.loads(client.get('/api/search?q=corretto').data)['results'][0]['id'] == segment['id']
+    database.delete_project(sample_project)
+    assert json.loads(client.get('/api/search?q=corretto').data)['results'] == []
+
+def test_rebuild_index_command(runner, sample_project):
+    """The CLI command re-indexes every stored segment"""
+    result = runner.invoke(args=['search', 'rebuild-index'])
+    assert result.exit_code == 0
+    assert "1 segments indexed" in result.output
@@ -0,0 +1,60 @@
+import json
+import pytest
+import database
+from services.segment_writer import SegmentWriter
+
+def _seg(i):
+    return {"start": float(i), "end": float(i) + 1, "text": f"segment {i}", "speaker": "Speaker 1"}
+
+def test_writer_appends_in_batches(app, sample_project):
+    """Segments are committed every `batch_size` segments, not at the end"""
+    writer = SegmentWriter(sample_project, batch_size=3, flush_interval=3600)
+    writer.reset()
+    writer.add([_seg(0)])
+    writer.add([_seg(1)])
+    assert database.get_segments(sample_project) == []
+    writer.add([_seg(2)])
+    assert len(database.get_segments(sample_project)) == 3
+
+    writer.add([_seg(3)])
+    writer.finish([_seg(i) for i in range(4)])
+    assert [s["text"] for s in database.get_segments(sample_project)] == [f"segment {i}" for i in range(4)]
+
+def test_writer_replaces_when_final_result_differs(app, sample_project):
+    """A post-processed final list replaces what was streamed"""
+    writer = SegmentWriter(sample_project, batch_size=1)
+    writer.reset()
+    writer.add([_seg(0), _seg(1)])
+    writer.finish([_seg(0)])
+    assert len(database.get_segments(sample_project)) == 1
+
+def test_status_returns_segments_after_cursor(client, sample_project):
+    """The status API only returns segments stored after the given cursor"""
+    data = json.loads(client.get(f'/api/transcribe/{sample_project}').data)
+    assert len(data["segments"]) == 1
+    cursor = data["cursor"]
+
+    database.append_segments(sample_project, [_seg(5), _seg(6)])
+    data = json.loads(client.get(f'/api/transcribe/{sample_project}?since={cursor}').data)
+    assert [s["text"] for s in data["segments"]] == ["segment 5", "segment 6"]
+    assert data["cursor"] > cursor
+
+    data = json.loads(client.get(f'/api/transcribe/{sample_project}?since={data["cursor"]}').data)
+    assert data["segments"] == [] and not data["reset"]
+
+def test_status_signals_replaced_segments(client, sample_project):
+    """When the final result replaces the streamed rows, pollers get the full list once with `reset`"""
+    writer = SegmentWriter(sample_project, batch_size=1)
+    writer.reset()
+    writer.add([_seg(0)])
+    writer.add([_seg(1)])
+    cursor = json.loads(client.get(f'/api/transcribe/{sample_project}').data)["cursor"]
+
+    _, replaced = writer.finish([_seg(0), _seg(1), _seg(2)])
+    assert replaced
+    data = json.loads(client.get(f'/api/transcribe/{sample_project}?since={cursor}').data)
+    assert data["reset"]
+    assert [s["text"] for s in data["segments"]] == ["segment 0", "segment 1", "segment 2"]
+
+    data = json.loads(client.get(f'/api/transcribe/{sample_project}?since={data["cursor"]}').data)
+    assert data["segments"] == [] and not data["reset"]
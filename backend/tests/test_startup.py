@@ -0,0 +1,56 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+import pytest
+import gpu.cuda_check as cuda_check
+from services.transcription_service import TranscriptionService
+from services.startup import startup_timings
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_app_import_skips_inference_stack():
+    """Starting the server imports neither torch nor faster-whisper/CTranslate2"""
+    code = (
+        "import sys, app; "
+        "print(sorted(m for m in ('torch', 'faster_whisper', 'ctranslate2') if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND, capture_output=True, text=True, check=True)
+    assert result.stdout.strip().splitlines()[-1] == "[]"
+
+def test_gpu_info_without_torch(monkeypatch):
+    monkeypatch.setattr(cuda_check, "cuda_device_count", lambda: 0)
+    assert cuda_check.get_gpu_info() == {'available': False, 'device': None}
+
+    monkeypatch.setattr(cuda_check, "cuda_device_count", lambda: 1)
+    monkeypatch.setattr(cuda_check, "_query_nvidia_smi", lambda: {
+        "name": "RTX 4090", "total_mb": 24564.0, "free_mb": 20480.0, "capability": (8, 9)
+    })
+    info = cuda_check.get_gpu_info()
+    assert info["device"] == "RTX 4090" and info["vram_total_gb"] == 23.99 and info["vram_free_gb"] == 20.0
+
+def test_warmup_loads_models_in_background(monkeypatch):
+    service = TranscriptionService()
+    loaded = []
+
+    @contextmanager
+    def fake_engine(model):
+        loaded.append(model)
+        yield model
+
+    monkeypatch.setattr(service, "get_engine", fake_engine)
+    monkeypatch.setattr("services.transcription_service.time_transcription", lambda engine, clip: 0.0)
+    assert service.start_warmup(["tiny", "base"])
+    assert not service.start_warmup(["tiny"])
+    for _ in range(200):
+        if service.warmup["done"]:
+            break
+        time.sleep(0.01)
+    assert loaded == ["tiny", "base"] and service.warmup["loaded"] == ["tiny", "base"]
+    assert "warmup base" in startup_timings.stats()
+
+def test_status_reports_startup_phases(client):
+    startup = json.loads(client.get('/api/system/status').data)["startup"]
+    assert "database" in startup["phases"] and "create_app" in startup["phases"]
@@ -0,0 +1,104 @@
+import io
+import json
+import hashlib
+import os
+import time
+import uuid
+import pytest
+import database
+from config import config
+from services.media_store import media_store
+from services.uploads import ChunkedUploadStore, UploadError, uploads
+from services.transcription_service import TranscriptionService
+from models.whisper_wrapper import ENGINE_VERSION
+
+MEDIA = bytes(range(256)) * 40
+MEDIA_HASH = hashlib.sha256(MEDIA).hexdigest()
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "UPLOAD_FOLDER", tmp_path)
+    monkeypatch.setattr(uploads, "folder", tmp_path / "uploads")
+    monkeypatch.setattr(media_store, "folder", tmp_path / "objects")
+    return tmp_path
+
+def _open(client, **extra):
+    response = client.post('/api/uploads', json={"filename": "clip.mp3", "size": len(MEDIA), **extra})
+    assert response.status_code == 201
+    return json.loads(response.data)["upload_id"]
+
+def _put(client, upload_id, offset, data):
+    return client.put(f'/api/uploads/{upload_id}', data=data, headers={"Upload-Offset": str(offset)})
+
+def test_chunked_upload_resumes_and_starts_transcription(client, upload_dir):
+    """A chunk at the wrong offset is refused with the offset to resume from"""
+    upload_id = _open(client, sha256=MEDIA_HASH)
+    assert json.loads(_put(client, upload_id, 0, MEDIA[:4000]).data)["offset"] == 4000
+
+    response = _put(client, upload_id, 0, MEDIA[:4000])
+    assert response.status_code == 409
+    assert json.loads(response.data)["offset"] == 4000
+    assert client.post(f'/api/uploads/{upload_id}/finalize').status_code == 409
+
+    assert json.loads(client.get(f'/api/uploads/{upload_id}').data)["offset"] == 4000
+    _put(client, upload_id, 4000, MEDIA[4000:])
+    finalized = json.loads(client.post(f'/api/uploads/{upload_id}/finalize').data)
+    assert finalized["complete"] and finalized["file_hash"] == MEDIA_HASH
+
+    # The finalized upload replaces the multipart file (served here by the result cache)
+    database.store_cached_result(
+        TranscriptionService.result_cache_key(MEDIA_HASH, "tiny", "it", False),
+        MEDIA_HASH, "tiny", "it", False, ENGINE_VERSION, "it", 0.9, "Ciao",
+        [{"start": 0.0, "end": 1.0, "text": "Ciao", "speaker": "Speaker 1"}], max_bytes=1024 * 1024
+    )
+    response = client.post('/api/transcribe', data={"upload_id": upload_id, "model": "tiny", "language": "it"})
+    assert response.status_code == 202
+    project = database.get_project(json.loads(response.data)["job_id"])
+    assert project["file_hash"] == MEDIA_HASH
+    with open(project["file_path"], "rb") as f:
+        assert f.read() == MEDIA
+    assert client.get(f'/api/uploads/{upload_id}').status_code == 404
+
+def test_hash_mismatch_and_oversized_chunk(client, upload_dir):
+    upload_id = _open(client, sha256="0" * 64)
+    assert _put(client, upload_id, 0, MEDIA + b"extra").status_code == 413
+    _put(client, upload_id, 0, MEDIA)
+    assert client.post(f'/api/uploads/{upload_id}/finalize').status_code == 422
+    assert client.get(f'/api/uploads/{upload_id}').status_code == 404
+
+def test_reupload_hashes_while_writing(client, sample_project, upload_dir):
+    response = client.post(f'/api/projects/{sample_project}/reupload', data={
+        "file": (io.BytesIO(MEDIA), "new.mp4")
+    }, content_type='multipart/form-data')
+    assert json.loads(response.data)["file_hash"] == MEDIA_HASH
+    assert (upload_dir / "objects" / MEDIA_HASH).read_bytes() == MEDIA
+
+def test_hash_rebuilt_after_restart(tmp_path):
+    """A new store (server restart) resumes from the partial file on disk"""
+    store = ChunkedUploadStore(tmp_path, ttl_seconds=3600)
+    upload_id = store.create("clip.mp3", len(MEDIA))["upload_id"]
+    store.append(upload_id, 0, io.BytesIO(MEDIA[:1000]))
+
+    restarted = ChunkedUploadStore(tmp_path, ttl_seconds=3600)
+    restarted.append(upload_id, 1000, io.BytesIO(MEDIA[1000:]))
+    assert restarted.finalize(upload_id)["file_hash"] == MEDIA_HASH
+    assert restarted.cleanup(now=10 ** 12) == 1
+
+def test_finished_sessions_drop_their_locks(tmp_path):
+    """Discarded, expired, claimed and unknown uploads leave no lock entry behind"""
+    store = ChunkedUploadStore(tmp_path, ttl_seconds=3600)
+    discarded, expired, claimed, live = (store.create("clip.mp3", len(MEDIA))["upload_id"] for _ in range(4))
+    for upload_id in (discarded, expired, claimed, live):
+        store.append(upload_id, 0, io.BytesIO(MEDIA[:10]))
+
+    store.discard(discarded)
+    old = time.time() - 7200
+    os.utime(tmp_path / f"{expired}.json", (old, old))
+    assert store.cleanup() == 1
+    store.append(claimed, 10, io.BytesIO(MEDIA[10:]))
+    store.finalize(claimed)
+    store.claim(claimed, tmp_path / "claimed.mp3")
+    with pytest.raises(UploadError):
+        store.append(str(uuid.uuid4()), 0, io.BytesIO(b"x"))
+
+    assert set(store._locks) == {live}
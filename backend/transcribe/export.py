@@ -30,10 +30,25 @@ def format_timecode(ms, mode='standard'):
         ms_rem = ms % 1_000
         return f"{h:02d}:{m:02d}:{s:02d},{ms_rem:03d}"
 
-def generate_srt(segments, speaker_labels=True, timecode_mode='standard'):
-    """Generates the SRT (SubRip) file"""
-    lines = []
-    
+def _stripped(chunks):
+    """Streams `"".join(chunks).strip()` without building the whole string"""
+    started = False
+    pending = ''
+    for chunk in chunks:
+        if not started:
+            chunk = chunk.lstrip()
+            if not chunk:
+                continue
+            started = True
+        pending += chunk
+        body = pending.rstrip()
+        if body:
+            yield body
+            # Trailing whitespace is only emitted if more text follows
+            pending = pending[len(body):]
+
+def iter_srt(segments, speaker_labels=True, timecode_mode='standard'):
+    """Yields the SRT (SubRip) file one cue at a time"""
     for idx, seg in enumerate(segments, 1):
         start_ms = int(seg['start'] * 1000)
         end_ms = int(seg['end'] * 1000)
@@ -44,15 +59,15 @@ def generate_srt(segments, speaker_labels=True, timecode_mode='standard'):
         speaker_prefix = f"[{seg.get('speaker', 'Speaker 1')}]: " if speaker_labels and seg.get('speaker') else ""
         text = f"{speaker_prefix}{seg['text'].strip()}"
         
-        lines.append(f"{idx}\n{start_time} --> {end_time}\n{text}\n")
-        
-    return "\n".join(lines)
+        # Cues are separated by a blank line
+        separator = "" if idx == 1 else "\n"
+        yield f"{separator}{idx}\n{start_time} --> {end_time}\n{text}\n"
 
-def generate_vtt(segments, speaker_labels=True):
-    """Generates the WebVTT file"""
-    lines = ["WEBVTT\n"]
+def iter_vtt(segments, speaker_labels=True):
+    """Yields the WebVTT file one cue at a time"""
+    yield "WEBVTT\n"
     
-    for idx, seg in enumerate(segments, 1):
+    for seg in segments:
         start_ms = int(seg['start'] * 1000)
         end_ms = int(seg['end'] * 1000)
         
@@ -62,36 +77,43 @@ def generate_vtt(segments, speaker_labels=True):
         speaker_prefix = f"<{seg.get('speaker', 'Speaker 1')}> " if speaker_labels and seg.get('speaker') else ""
         text = f"{speaker_prefix}{seg['text'].strip()}"
         
-        lines.append(f"{start_time} --> {end_time}\n{text}\n")
-        
-    return "\n".join(lines)
+        yield f"\n{start_time} --> {end_time}\n{text}\n"
 
-def generate_txt(segments, speaker_labels=True):
-    """Generates a plain text file"""
-    lines = []
-    current_speaker = None
-    
-    for seg in segments:
-        speaker = seg.get('speaker', 'Speaker 1')
-        text = seg['text'].strip()
-        
-        if speaker_labels and speaker != current_speaker:
-            lines.append(f"\n[{speaker}]:")
-            current_speaker = speaker
+def iter_txt(segments, speaker_labels=True):
+    """Yields a plain text file"""
+    def lines():
+        current_speaker = None
+        separator = ""
+        for seg in segments:
+            speaker = seg.get('speaker', 'Speaker 1')
+            text = seg['text'].strip()
             
-        lines.append(text)
-        
-    return "\n".join(lines).strip()
+            if speaker_labels and speaker != current_speaker:
+                yield f"{separator}\n[{speaker}]:"
+                current_speaker = speaker
+                separator = "\n"
+                
+            yield f"{separator}{text}"
+            separator = "\n"
+    
+    return _stripped(lines())
 
-def generate_csv(segments, speaker_labels=True):
-    """Generates a CSV file"""
+def iter_csv(segments, speaker_labels=True):
+    """Yields a CSV file one row at a time"""
     output = io.StringIO()
     writer = csv.writer(output)
     
+    def flush():
+        row = output.getvalue()
+        output.seek(0)
+        output.truncate()
+        return row
+    
     if speaker_labels:
         writer.writerow(['Start', 'End', 'Speaker', 'Text'])
     else:
         writer.writerow(['Start', 'End', 'Text'])
+    yield flush()
         
     for seg in segments:
         start_time = format_timecode(int(seg['start'] * 1000), 'vtt')
@@ -103,24 +125,62 @@ def generate_csv(segments, speaker_labels=True):
             writer.writerow([start_time, end_time, speaker, text])
         else:
             writer.writerow([start_time, end_time, text])
-            
-    return output.getvalue()
+        yield flush()
 
-def generate_json(segments):
-    """Generates a structured JSON output"""
-    return json.dumps({"segments": segments}, indent=2, ensure_ascii=False)
+def iter_json(segments):
+    """Yields a structured JSON output, one segment per line"""
+    yield '{"segments": ['
+    for idx, seg in enumerate(segments):
+        yield f"{',' if idx else ''}\n  {json.dumps(seg, ensure_ascii=False)}"
+    yield "\n]}"
 
-def generate_mcp(segments, filename=""):
-    """Generates an MCP (Model Context Protocol) format output for AI services"""
-    full_text = " ".join([seg['text'].strip() for seg in segments])
+def iter_mcp(segments, filename="", segments_count=None, total_characters=None):
+    """
+    Yields an MCP (Model Context Protocol) format output for AI services.
+    The metadata comes before the text: pass the counts to stream `segments`
+    in one pass, otherwise they are computed from a materialized list.
+    """
+    if segments_count is None or total_characters is None:
+        segments = list(segments)
+        segments_count = len(segments)
+        total_characters = len(" ".join([seg['text'].strip() for seg in segments]))
     
-    return json.dumps({
+    header = json.dumps({
         "mcp_version": "1.0",
         "metadata": {
             "source": filename,
             "type": "transcription",
-            "segments_count": len(segments),
-            "total_characters": len(full_text)
-        },
-        "text": full_text
+            "segments_count": segments_count,
+            "total_characters": total_characters
+        }
     }, indent=2, ensure_ascii=False)
+    # Reopen the object to append the text field, streamed piece by piece
+    yield header[:-2] + ',\n  "text": "'
+    for idx, seg in enumerate(segments):
+        piece = seg['text'].strip() if idx == 0 else " " + seg['text'].strip()
+        yield json.dumps(piece, ensure_ascii=False)[1:-1]
+    yield '"\n}'
+
+def generate_srt(segments, speaker_labels=True, timecode_mode='standard'):
+    """Generates the SRT (SubRip) file"""
+    return "".join(iter_srt(segments, speaker_labels, timecode_mode))
+
+def generate_vtt(segments, speaker_labels=True):
+    """Generates the WebVTT file"""
+    return "".join(iter_vtt(segments, speaker_labels))
+
+def generate_txt(segments, speaker_labels=True):
+    """Generates a plain text file"""
+    return "".join(iter_txt(segments, speaker_labels))
+
+def generate_csv(segments, speaker_labels=True):
+    """Generates a CSV file"""
+    return "".join(iter_csv(segments, speaker_labels))
+
+def generate_json(segments):
+    """Generates a structured JSON output"""
+    return "".join(iter_json(segments))
+
+def generate_mcp(segments, filename=""):
+    """Generates an MCP (Model Context Protocol) format output for AI services"""
+    return "".join(iter_mcp(segments, filename))
@@ -1,8 +1,59 @@
+import { Segment } from './types';
+
 export const API_BASE = 'http://localhost:5000/api';
 
+// Larger files are sent in resumable chunks instead of a single multipart request
+const CHUNKED_UPLOAD_MIN_BYTES = 64 * 1024 * 1024;
+const CHUNK_RETRIES = 5;
+
+async function uploadInChunks(file: File): Promise<string> {
+  const res = await fetch(`${API_BASE}/uploads`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ filename: file.name, size: file.size }),
+  });
+  const upload = await res.json();
+  if (!res.ok) throw new Error(upload.error || 'Failed to start upload');
+
+  let offset = 0;
+  let failures = 0;
+  while (offset < file.size) {
+    try {
+      const chunkRes = await fetch(`${API_BASE}/uploads/${upload.upload_id}`, {
+        method: 'PUT',
+        headers: { 'Upload-Offset': String(offset) },
+        body: file.slice(offset, offset + upload.chunk_size),
+      });
+      const data = await chunkRes.json();
+      // 409 carries the offset the server expects: continue from there
+      if (!chunkRes.ok && chunkRes.status !== 409) throw new Error(data.error || 'Chunk upload failed');
+      offset = data.offset;
+      failures = 0;
+    } catch (err) {
+      if (++failures > CHUNK_RETRIES) throw err;
+      await new Promise(resolve => setTimeout(resolve, 1000 * failures));
+      const statusRes = await fetch(`${API_BASE}/uploads/${upload.upload_id}`).catch(() => null);
+      if (statusRes?.ok) offset = (await statusRes.json()).offset;
+    }
+  }
+
+  const finalRes = await fetch(`${API_BASE}/uploads/${upload.upload_id}/finalize`, { method: 'POST' });
+  const finalized = await finalRes.json();
+  if (!finalRes.ok) throw new Error(finalized.error || 'Failed to finalize upload');
+  return upload.upload_id;
+}
+
+async function appendMedia(formData: FormData, file: File) {
+  if (file.size >= CHUNKED_UPLOAD_MIN_BYTES) {
+    formData.append('upload_id', await uploadInChunks(file));
+  } else {
+    formData.append('file', file);
+  }
+}
+
 export async function startTranscription(file: File, model: string, language: string, normalize: boolean = false) {
   const formData = new FormData();
-  formData.append('file', file);
+  await appendMedia(formData, file);
   formData.append('model', model);
   formData.append('language', language);
   formData.append('normalize', normalize ? 'true' : 'false');
@@ -20,12 +71,24 @@ export async function startTranscription(file: File, model: string, language: st
   return res.json();
 }
 
-export async function getJobStatus(jobId: string) {
-  const res = await fetch(`${API_BASE}/transcribe/${jobId}`);
+// `since` is the cursor returned by the previous call: only newer segments are sent back.
+// With `reset: true` the segments were rewritten and the list replaces those received so far
+export async function getJobStatus(jobId: string, since: number = 0) {
+  const res = await fetch(`${API_BASE}/transcribe/${jobId}?since=${since}`);
   if (!res.ok) throw new Error('Failed to get status');
   return res.json();
 }
 
+export function jobEventsUrl(jobId: string) {
+  return `${API_BASE}/transcribe/${jobId}/events`;
+}
+
+// Streamed file download; the server sets the file name
+export function exportDownloadUrl(projectId: string, format: string, includeSpeakers: boolean = false) {
+  const params = new URLSearchParams({ format, include_speakers: String(includeSpeakers) });
+  return `${API_BASE}/export/${projectId}/download?${params}`;
+}
+
 export async function exportTranscription(jobId: string, format: string) {
   const res = await fetch(`${API_BASE}/export`, {
     method: 'POST',
@@ -42,10 +105,16 @@ export async function getSystemStatus() {
   return res.json();
 }
 
-export async function getProjects() {
-  const res = await fetch(`${API_BASE}/projects`);
+// One page of projects, newest first; pass `nextCursor` back to get the following page
+export async function getProjects(cursor?: string | null, limit: number = 30) {
+  const params = new URLSearchParams({ limit: String(limit) });
+  if (cursor) params.set('cursor', cursor);
+  const res = await fetch(`${API_BASE}/projects?${params}`);
   if (!res.ok) throw new Error('Failed to get projects');
-  return res.json();
+  return {
+    projects: await res.json(),
+    nextCursor: res.headers.get('X-Next-Cursor')
+  };
 }
 
 export async function getProjectDetails(jobId: string) {
@@ -72,7 +141,7 @@ export async function clearCache() {
 
 export async function reuploadMedia(projectId: string, file: File) {
   const formData = new FormData();
-  formData.append('file', file);
+  await appendMedia(formData, file);
 
   const res = await fetch(`${API_BASE}/projects/${projectId}/reupload`, {
     method: 'POST',
@@ -98,21 +167,98 @@ export async function saveProjectSegments(projectId: string, segments: any[]) {
   return res.json();
 }
 
-export async function getAudioPreview(file: File, normalize: boolean): Promise<string> {
-  const formData = new FormData();
-  formData.append('file', file);
-  formData.append('normalize', normalize ? 'true' : 'false');
+export type SegmentOp =
+  | { op: 'insert'; client_id: string; segment: Omit<Segment, 'id'> }
+  | { op: 'update'; id: string; start?: number; end?: number; text?: string; speaker?: string }
+  | { op: 'delete'; id: string };
 
-  const res = await fetch(`${API_BASE}/transcribe/preview`, {
-    method: 'POST',
-    body: formData,
+export class RevisionConflictError extends Error {
+  constructor(public revision: number) {
+    super('Project was modified by another editor');
+  }
+}
+
+// Sends only the changed segments; fails with RevisionConflictError if `revision` is stale
+export async function patchProjectSegments(projectId: string, revision: number, ops: SegmentOp[]) {
+  const res = await fetch(`${API_BASE}/projects/${projectId}/segments`, {
+    method: 'PATCH',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ revision, ops })
   });
 
+  const data = await res.json();
+  if (res.status === 409) throw new RevisionConflictError(data.revision);
+  if (!res.ok) throw new Error(data.error || 'Failed to save segments');
+  return data as { revision: number; inserted: Record<string, string> };
+}
+
+export interface PeaksWindow {
+  level: number;
+  levels: number;
+  peaks_per_second: number;
+  from: number;
+  to: number;
+  duration: number;
+  peaks: number[]; // [min, max, min, max, ...] in -127..127
+}
+
+// Waveform peaks of a time window; without `level` the server picks one fitting `points`.
+// Older projects get their peaks built in the background: 202 means retry later
+export async function getProjectPeaks(
+  projectId: string,
+  options: { level?: number; from?: number; to?: number; points?: number } = {},
+  maxAttempts: number = 60
+): Promise<PeaksWindow> {
+  const params = new URLSearchParams();
+  Object.entries(options).forEach(([key, value]) => {
+    if (value !== undefined) params.set(key, String(value));
+  });
+  for (let attempt = 1; ; attempt++) {
+    const res = await fetch(`${API_BASE}/projects/${projectId}/peaks?${params}`);
+    if (res.status === 202 && attempt < maxAttempts) {
+      const seconds = Number(res.headers.get('Retry-After')) || 2;
+      await new Promise(resolve => setTimeout(resolve, seconds * 1000));
+      continue;
+    }
+    if (!res.ok || res.status === 202) throw new Error('Failed to get waveform peaks');
+    return res.json();
+  }
+}
+
+// Server-side hash of files already sent for a preview, so toggling reuses its cache
+const previewHashes = new WeakMap<File, string>();
+
+export async function getAudioPreview(file: File, normalize: boolean): Promise<string> {
+  const normalizeParam = normalize ? 'true' : 'false';
+  const knownHash = previewHashes.get(file);
+  let res: Response | null = null;
+
+  if (knownHash) {
+    const params = new URLSearchParams({ file_hash: knownHash, normalize: normalizeParam });
+    res = await fetch(`${API_BASE}/transcribe/preview?${params}`);
+    // Expired and no stored copy on the server: upload again
+    if (res.status === 404) res = null;
+  }
+
+  if (!res) {
+    const formData = new FormData();
+    formData.append('file', file);
+    formData.append('normalize', normalizeParam);
+
+    res = await fetch(`${API_BASE}/transcribe/preview`, {
+      method: 'POST',
+      body: formData,
+    });
+  }
+
   if (!res.ok) {
     const errorData = await res.json().catch(() => ({}));
     throw new Error(errorData.error || 'Failed to generate audio preview');
   }
 
+  const fileHash = res.headers.get('X-File-Hash');
+  if (fileHash) previewHashes.set(file, fileHash);
+
   const blob = await res.blob();
   return URL.createObjectURL(blob);
 }
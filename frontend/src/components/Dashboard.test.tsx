@@ -1,41 +1,64 @@
-import { render, screen } from '@testing-library/react';
-import { describe, it, expect, vi } from 'vitest';
+import { render, screen, fireEvent } from '@testing-library/react';
+import { describe, it, expect, vi, beforeEach } from 'vitest';
 // Ora puntiamo alla cartella Dashboard (che contiene index.tsx)
 import Dashboard from './Dashboard';
+import { getProjects } from '../api';
 
 // Mock delle traduzioni
 const mockT = (key: string) => key;
 
-// Mock delle API
+// Mock delle API: getProjects restituisce una pagina e il cursore della successiva
 vi.mock('../api', () => ({
-  getProjects: vi.fn(() => Promise.resolve([])),
+  getProjects: vi.fn(() => Promise.resolve({ projects: [], nextCursor: null })),
   deleteProject: vi.fn(() => Promise.resolve({ success: true })),
   getProjectDetails: vi.fn(() => Promise.resolve({ segments: [] })),
 }));
 
+const project = (id: string, name: string) => ({
+  id, name, status: 'completed', model: 'tiny', language: 'it', normalized: 0
+});
+
+const renderDashboard = () => render(
+  <Dashboard
+    onNewProject={() => {}}
+    onResumeProject={() => {}}
+    t={mockT}
+  />
+);
+
 describe('Dashboard Component', () => {
+  beforeEach(() => {
+    vi.mocked(getProjects).mockClear();
+  });
+
   it('renders the dashboard with empty state', async () => {
-    render(
-      <Dashboard 
-        onNewProject={() => {}} 
-        onResumeProject={() => {}} 
-        t={mockT} 
-      />
-    );
-    
+    renderDashboard();
+
     // Il Dashboard ora cerca "dashboard.recentProjects" come titolo
     expect(screen.getByText('dashboard.recentProjects')).toBeDefined();
+    expect(await screen.findByText('dashboard.noProjects')).toBeDefined();
+    expect(screen.queryByText('dashboard.loadMore')).toBeNull();
   });
 
   it('shows the new project button', () => {
-    render(
-      <Dashboard 
-        onNewProject={() => {}} 
-        onResumeProject={() => {}} 
-        t={mockT} 
-      />
-    );
-    
+    renderDashboard();
+
     expect(screen.getByText('dashboard.newProject')).toBeDefined();
   });
+
+  it('loads the next page with the cursor', async () => {
+    vi.mocked(getProjects)
+      .mockResolvedValueOnce({ projects: [project('1', 'first.mp3')], nextCursor: 'cursor-1' })
+      .mockResolvedValueOnce({ projects: [project('2', 'second.mp3')], nextCursor: null });
+    renderDashboard();
+
+    expect(await screen.findByText('first.mp3')).toBeDefined();
+    fireEvent.click(screen.getByText('dashboard.loadMore'));
+
+    // La seconda pagina si aggiunge alla prima
+    expect(await screen.findByText('second.mp3')).toBeDefined();
+    expect(screen.getByText('first.mp3')).toBeDefined();
+    expect(vi.mocked(getProjects)).toHaveBeenLastCalledWith('cursor-1');
+    expect(screen.queryByText('dashboard.loadMore')).toBeNull();
+  });
 });
@@ -14,11 +14,13 @@ interface DashboardProps {
 export default function Dashboard({ onNewProject, onResumeProject, t }: DashboardProps) {
   const [projects, setProjects] = useState<any[]>([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
 
-  const fetchProjects = async () => {
+  const fetchProjects = async (cursor: string | null = null) => {
     try {
-      const data = await getProjects();
-      setProjects(data);
+      const data = await getProjects(cursor);
+      setProjects(prev => cursor ? [...prev, ...data.projects] : data.projects);
+      setNextCursor(data.nextCursor);
     } catch (e) {
       console.error("Failed to fetch projects", e);
     } finally {
@@ -82,6 +84,14 @@ export default function Dashboard({ onNewProject, onResumeProject, t }: Dashboar
                 t={t}
               />
             ))}
+            {nextCursor && (
+              <button
+                onClick={() => fetchProjects(nextCursor)}
+                className="col-span-full py-3 text-sm text-gray-400 hover:text-white transition-colors"
+              >
+                {t('dashboard.loadMore')}
+              </button>
+            )}
           </div>
         ) : (
           <EmptyState onNewProject={onNewProject} t={t} />
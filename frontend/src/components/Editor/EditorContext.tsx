@@ -1,6 +1,6 @@
 import React, { createContext, useContext, useState, useRef, useEffect, useCallback } from 'react';
 import { Segment, TranscriptionJob, Project } from '../../types';
-import { getProjectDetails } from '../../api';
+import { getProjectDetails, SegmentOp, RevisionConflictError } from '../../api';
 
 interface EditorContextType {
   // State
@@ -37,6 +37,26 @@ interface EditorContextType {
   reuploadMediaFile: (file: File) => Promise<void>;
 }
 
+// Per-segment operations that turn the last saved state into the current one
+function diffSegments(saved: Map<string, Segment>, current: Segment[]): SegmentOp[] {
+  const ops: SegmentOp[] = [];
+  const seen = new Set<string>();
+  for (const seg of current) {
+    seen.add(seg.id);
+    const before = saved.get(seg.id);
+    if (!before) {
+      const { id, ...fields } = seg;
+      ops.push({ op: 'insert', client_id: id, segment: fields });
+    } else if (before.text !== seg.text || before.start !== seg.start || before.end !== seg.end || before.speaker !== seg.speaker) {
+      ops.push({ op: 'update', id: seg.id, start: seg.start, end: seg.end, text: seg.text, speaker: seg.speaker });
+    }
+  }
+  saved.forEach((_, id) => {
+    if (!seen.has(id)) ops.push({ op: 'delete', id });
+  });
+  return ops;
+}
+
 const EditorContext = createContext<EditorContextType | undefined>(undefined);
 
 export function EditorProvider({
@@ -65,12 +85,16 @@ export function EditorProvider({
   const [seekRequest, setSeekRequest] = useState<{ time: number; timestamp: number } | null>(null);
 
   const videoRef = useRef<HTMLVideoElement | null>(null);
+  const savedRef = useRef<Map<string, Segment>>(new Map(initialSegments.map(s => [s.id, s])));
+  const revisionRef = useRef(0);
 
   useEffect(() => {
     if (job.id) {
       import('../../api').then(({ getProjectDetails }) => {
         getProjectDetails(job.id!).then(data => {
           setProject(data);
+          revisionRef.current = data.revision || 0;
+          savedRef.current = new Map((data.segments || []).map((s: Segment) => [s.id, s]));
           if (initialSegments.length === 0) {
             setSegmentsState(data.segments || []);
           }
@@ -104,13 +128,25 @@ export function EditorProvider({
     if (!job.id) return;
     setIsSaving(true);
     try {
-      const { saveProjectSegments } = await import('../../api');
-      await saveProjectSegments(job.id, segments);
+      const ops = diffSegments(savedRef.current, segments);
+      if (ops.length > 0) {
+        const { patchProjectSegments } = await import('../../api');
+        const result = await patchProjectSegments(job.id, revisionRef.current, ops);
+        revisionRef.current = result.revision;
+        // New segments receive their database ids
+        const stored = segments.map(s => result.inserted[s.id] ? { ...s, id: result.inserted[s.id] } : s);
+        if (Object.keys(result.inserted).length > 0) setSegmentsState(stored);
+        savedRef.current = new Map(stored.map(s => [s.id, s]));
+      }
       setModifiedIds(new Set()); // Reset labels modificato
       alert("Progetto salvato con successo!");
     } catch (e) {
       console.error(e);
-      alert("Errore durante il salvataggio.");
+      if (e instanceof RevisionConflictError) {
+        alert("Il progetto è stato modificato in un'altra finestra. Ricarica per vedere le modifiche.");
+      } else {
+        alert("Errore durante il salvataggio.");
+      }
     } finally {
       setIsSaving(false);
     }
@@ -1,7 +1,7 @@
 import React, { useState } from 'react';
 import { Search, Copy, Download, Save, Loader2, Volume2 } from 'lucide-react';
 import { useEditor } from './EditorContext';
-import { exportTranscription } from '../../api';
+import { exportDownloadUrl } from '../../api';
 
 interface ToolbarProps {
   onBack: () => void;
@@ -39,18 +39,10 @@ export default function Toolbar({ onBack, t }: ToolbarProps) {
     if (!job.id) return;
     setIsExporting(true);
     try {
-      const data = await exportTranscription(job.id, exportFormat);
-      const blob = new Blob([data.content], { type: 'text/plain' });
-      const url = window.URL.createObjectURL(blob);
+      // The browser streams the file straight to disk (Content-Disposition: attachment)
       const a = document.createElement('a');
-      a.href = url;
-
-      let originalName = project?.file_name || job.file?.name || 'transcription';
-      originalName = originalName.replace(/\.[^/.]+$/, ""); // Rimuove l'estensione originale
-
-      a.download = `${originalName}.${exportFormat}`;
+      a.href = exportDownloadUrl(job.id, exportFormat);
       a.click();
-      window.URL.revokeObjectURL(url);
     } catch (e) {
       alert("Errore durante l'esportazione.");
     } finally {
@@ -10,6 +10,7 @@ interface VideoPlayerProps {
 export default function VideoPlayer({ t }: VideoPlayerProps) {
   const {
     job,
+    project,
     isPlaying,
     currentTime,
     duration,
@@ -34,6 +35,9 @@ export default function VideoPlayer({ t }: VideoPlayerProps) {
   const fileInputRef = useRef<HTMLInputElement>(null);
   const isSeekingRef = useRef<boolean>(false);
   const [videoSrc, setVideoSrc] = useState<string>('');
+  // The light audio-only proxy is played by default; the original is loaded on request
+  const [showVideo, setShowVideo] = useState(false);
+  const useProxy = !!project?.audio_proxy && !showVideo;
 
   useEffect(() => {
     if (job.file instanceof File) {
@@ -41,9 +45,19 @@ export default function VideoPlayer({ t }: VideoPlayerProps) {
       setVideoSrc(url);
       return () => URL.revokeObjectURL(url);
     } else if (job.id) {
-      setVideoSrc(`${API_BASE}/projects/${job.id}/media?t=${mediaUpdated}`);
+      const endpoint = useProxy ? 'proxy' : 'media';
+      setVideoSrc(`${API_BASE}/projects/${job.id}/${endpoint}?t=${mediaUpdated}`);
     }
-  }, [job.file, job.id, mediaUpdated]);
+  }, [job.file, job.id, mediaUpdated, useProxy]);
+
+  // Switching source reloads the element: resume from the same position
+  useEffect(() => {
+    const video = videoRef.current;
+    if (!video || !currentTime) return;
+    const restore = () => { video.currentTime = currentTime; };
+    video.addEventListener('loadedmetadata', restore, { once: true });
+    return () => video.removeEventListener('loadedmetadata', restore);
+  }, [useProxy]);
 
   const handleReupload = async (e: React.ChangeEvent<HTMLInputElement>) => {
     const file = e.target.files?.[0];
@@ -155,6 +169,15 @@ export default function VideoPlayer({ t }: VideoPlayerProps) {
         />
       )}
 
+      {!mediaError && project?.audio_proxy && !(job.file instanceof File) && (
+        <button
+          onClick={() => setShowVideo(!showVideo)}
+          className="absolute top-3 right-3 z-10 text-[10px] font-mono tracking-widest text-gray-400 hover:text-white bg-black/60 px-2 py-1 rounded"
+        >
+          {showVideo ? t('editor.audioOnly') : t('editor.showVideo')}
+        </button>
+      )}
+
       {!mediaError && (
         <div className="absolute inset-0 bg-gradient-to-t from-black/90 via-transparent flex flex-col justify-end p-4 opacity-0 group-hover:opacity-100 transition-opacity">
           <div className="flex items-center justify-center gap-6 text-white mb-2">
@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { useEditor } from './EditorContext';
-import { API_BASE } from '../../api';
+import { getProjectPeaks } from '../../api';
 
 interface WaveformProps {
   t: (key: string) => string;
@@ -16,41 +16,27 @@ export default function Waveform({ t }: WaveformProps) {
       return;
     }
 
-    const generateRealWaveform = async () => {
-      try {
-        const url = job.file instanceof File
-          ? URL.createObjectURL(job.file)
-          : `${API_BASE}/projects/${job.id}/media?t=${mediaUpdated}`;
-
-        const response = await fetch(url);
-        const arrayBuffer = await response.arrayBuffer();
-        const audioContext = new (window.AudioContext || (window as any).webkitAudioContext)();
-        const audioBuffer = await audioContext.decodeAudioData(arrayBuffer);
+    if (!job.id) return;
 
-        const rawData = audioBuffer.getChannelData(0);
-        const samples = 100;
-        const blockSize = Math.floor(rawData.length / samples);
-        const filteredData = [];
-
-        for (let i = 0; i < samples; i++) {
-          let blockStart = blockSize * i;
-          let sum = 0;
-          for (let j = 0; j < blockSize; j++) {
-            sum += Math.abs(rawData[blockStart + j]);
-          }
-          filteredData.push(sum / blockSize);
+    const loadPeaks = async () => {
+      try {
+        // Peaks are precomputed by the backend: no need to download and decode the media
+        const data = await getProjectPeaks(job.id!, { points: 100 });
+        const bars: number[] = [];
+        for (let i = 0; i < data.peaks.length; i += 2) {
+          bars.push(Math.max(Math.abs(data.peaks[i]), Math.abs(data.peaks[i + 1])));
         }
 
-        const max = Math.max(...filteredData);
-        setWaveform(filteredData.map(n => Math.max(0.1, n / max)));
+        const max = Math.max(...bars, 1);
+        setWaveform(bars.map(n => Math.max(0.1, n / max)));
       } catch (e) {
         console.error("Waveform error:", e);
         setWaveform(Array(100).fill(0.2));
       }
     };
 
-    generateRealWaveform();
-  }, [job.id, job.file, mediaUpdated, isUploading, mediaError]);
+    loadPeaks();
+  }, [job.id, mediaUpdated, isUploading, mediaError]);
 
   return (
     <div
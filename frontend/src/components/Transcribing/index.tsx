@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { TranscriptionJob, Segment } from '../../types';
-import { getJobStatus } from '../../api';
+import { jobEventsUrl } from '../../api';
 import SidebarInfo from './SidebarInfo';
 import ProgressSection from './ProgressSection';
 import TimelineSection from './TimelineSection';
@@ -26,42 +26,58 @@ export default function Transcribing({ job, onComplete, onCancel, t }: Transcrib
     }
 
     let isMounted = true;
-    const interval = setInterval(async () => {
-      try {
-        const data = await getJobStatus(job.id!);
-        if (!isMounted) return;
+    // EventSource reconnects on its own and resumes from the last event id
+    const source = new EventSource(jobEventsUrl(job.id));
 
-        const currentProgress = (data.progress || 0) * 100;
-        setProgress(currentProgress);
-
-        if (data.segments && data.segments.length > 0) {
-          setLiveSegments(data.segments);
-        }
-
-        if (data.logs && Array.isArray(data.logs)) {
-          setLogs(data.logs);
-        }
+    const mergeSegments = (incoming: Segment[], replace: boolean) => {
+      setLiveSegments(prev => {
+        if (replace) return incoming;
+        // After a reconnect the snapshot may overlap with the first deltas
+        const known = new Set(prev.map(seg => seg.id));
+        return [...prev, ...incoming.filter(seg => !known.has(seg.id))];
+      });
+    };
 
-        if (data.status === 'completed') {
-          clearInterval(interval);
-          // Passiamo i segmenti finali (che potrebbero essere più di quelli live)
-          setTimeout(() => {
-            if (isMounted) onComplete(data.segments || liveSegments);
-          }, 1500);
-        } else if (data.status === 'failed') {
-          clearInterval(interval);
-          setError(data.error || t('transcribing.unknownError'));
-        }
-      } catch (e) {
-        console.warn("Polling error:", e);
+    const applyStatus = (data: any) => {
+      setProgress((data.progress || 0) * 100);
+      if (data.status === 'completed') {
+        source.close();
+        // L'editor ricarica i segmenti definitivi dal database
+        setTimeout(() => {
+          if (isMounted) onComplete([]);
+        }, 1500);
+      } else if (data.status === 'failed') {
+        source.close();
+        setError(data.error || t('transcribing.unknownError'));
       }
-    }, 2000);
+    };
+
+    source.addEventListener('snapshot', (e: MessageEvent) => {
+      const data = JSON.parse(e.data);
+      mergeSegments(data.segments || [], true);
+      if (Array.isArray(data.logs)) setLogs(data.logs);
+      applyStatus(data);
+    });
+    source.addEventListener('segments', (e: MessageEvent) => {
+      const data = JSON.parse(e.data);
+      mergeSegments(data.segments || [], data.replace);
+    });
+    source.addEventListener('log', (e: MessageEvent) => {
+      const data = JSON.parse(e.data);
+      setLogs(prev => [...prev, data.message].slice(-10));
+    });
+    source.addEventListener('status', (e: MessageEvent) => {
+      applyStatus(JSON.parse(e.data));
+    });
+    source.onerror = () => {
+      console.warn("Event stream interrupted, reconnecting...");
+    };
 
     return () => {
       isMounted = false;
-      clearInterval(interval);
+      source.close();
     };
-  }, [job.id, onComplete, t, liveSegments]);
+  }, [job.id, onComplete, t]);
 
   return (
     <div className="flex-1 flex overflow-hidden bg-[#141414]">
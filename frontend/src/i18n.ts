@@ -23,6 +23,7 @@ export const translations = {
       noProjects: 'Nessun progetto',
       startFirst: 'Inizia creando la tua prima trascrizione.',
       createProject: 'Crea Progetto',
+      loadMore: 'Carica altri',
       segments: 'segmenti',
       unnamed: 'Progetto Senza Nome'
     },
@@ -75,6 +76,8 @@ export const translations = {
       mediaUnavailable: 'MEDIA NON DISPONIBILE',
       mediaUnavailableDesc: 'Il file originale non è disponibile dopo il ricaricamento della pagina.',
       reupload: 'Ricarica File Originale',
+      showVideo: 'MOSTRA VIDEO',
+      audioOnly: 'SOLO AUDIO',
       uploading: 'Caricamento...',
       waveform: 'Waveform',
       segmentDetails: 'Dettagli Segmento',
@@ -160,6 +163,7 @@ export const translations = {
       noProjects: 'No projects',
       startFirst: 'Start by creating your first transcription.',
       createProject: 'Create Project',
+      loadMore: 'Load more',
       segments: 'segments',
       unnamed: 'Unnamed Project'
     },
@@ -212,6 +216,8 @@ export const translations = {
       mediaUnavailable: 'MEDIA UNAVAILABLE',
       mediaUnavailableDesc: 'The original file is not available after page reload.',
       reupload: 'Re-upload Original File',
+      showVideo: 'SHOW VIDEO',
+      audioOnly: 'AUDIO ONLY',
       uploading: 'Uploading...',
       waveform: 'Waveform',
       segmentDetails: 'Segment Details',
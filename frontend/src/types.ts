@@ -13,6 +13,8 @@ export interface Project {
   speakers: number;
   thumbnail?: string;
   normalized?: boolean;
+  revision?: number;
+  audio_proxy?: boolean;
 }
 
 export interface Segment {